@@ -1,20 +1,68 @@
+import os
 from flask import Flask
-from routes.auth import auth
-from routes.crop_classification import crop_classify
 from flask_cors import CORS
-from routes.weather_routes import weather_bp
-from routes.market_routes import market_bp
-from routes.farmer_routes import farmer_bp
-from routes.chatbot_routes import chatbot_bp
-from routes.soil_routes import soil_bp
-app = Flask(__name__)
-CORS(app)
-app.register_blueprint(chatbot_bp)
-app.register_blueprint(weather_bp)
-app.register_blueprint(market_bp)
-app.register_blueprint(auth)
-app.register_blueprint(crop_classify)
-app.register_blueprint(farmer_bp)
-app.register_blueprint(soil_bp)
+
+from services import admission, model_registry, metrics
+
+DEFAULT_CONFIG = {
+    # Skip model warmup entirely; every model loads on its first request
+    "FAST_START": os.getenv("KRISHI_FAST_START") == "1",
+    # Load models in a background thread right after startup
+    "WARMUP_MODELS": True,
+    # Restrict warmup to these registry names (None = all)
+    "WARMUP_ONLY": None,
+}
+
+
+def register_blueprints(app):
+    # Route modules only define blueprints and register lazy models, so
+    # importing them no longer pulls in torch/ultralytics/openai.
+    from routes.auth import auth
+    from routes.crop_classification import crop_classify
+    from routes.crop_routes import crop
+    from routes.market_routes import market_bp
+    from routes.alert_routes import alerts_bp
+    from routes.farmer_routes import farmer_bp
+    from routes.chatbot_routes import chatbot_bp
+    from routes.soil_routes import soil_bp
+    from routes.wildlife_routes import wildlife_bp
+    from routes.health_routes import health_bp
+    from routes.metrics_routes import metrics_bp
+    from routes.upload_routes import uploads_bp
+
+    app.register_blueprint(chatbot_bp)
+    app.register_blueprint(market_bp)
+    app.register_blueprint(alerts_bp)
+    app.register_blueprint(auth)
+    app.register_blueprint(crop_classify)
+    app.register_blueprint(crop)
+    app.register_blueprint(farmer_bp)
+    app.register_blueprint(soil_bp)
+    app.register_blueprint(wildlife_bp)
+    app.register_blueprint(health_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(uploads_bp)
+
+
+def create_app(config=None):
+    app = Flask(__name__)
+    app.config.from_mapping(DEFAULT_CONFIG)
+    if config:
+        app.config.from_mapping(config)
+
+    CORS(app)
+    metrics.init_app(app)
+    admission.init_app(app)
+    register_blueprints(app)
+
+    if app.config["WARMUP_MODELS"] and not app.config["FAST_START"]:
+        model_registry.warmup_in_background(app.config["WARMUP_ONLY"])
+
+    return app
+
+
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    # The debug reloader runs this file twice; only the serving child warms up
+    create_app({
+        "WARMUP_MODELS": os.environ.get("WERKZEUG_RUN_MAIN") == "true"
+    }).run(debug=True)
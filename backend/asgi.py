@@ -0,0 +1,84 @@
+# backend/asgi.py
+#
+# ASGI entry point. The I/O-bound routes (market, chatbot, auth, farmer)
+# are async views on a Quart app, so a request waiting on data.gov.in,
+# OpenAI or MySQL holds a socket, not a thread. Every other path (models,
+# uploads, alerts, health, /metrics) falls through to the Flask app from
+# wsgi.py on a small thread pool.
+#
+#   cd backend && KRISHI_SERVER=asgi gunicorn -c gunicorn.conf.py
+#   cd backend && uvicorn asgi:app --port 5000          # dev
+#
+# Needs quart, quart-cors, a2wsgi and uvicorn, plus httpx, aiomysql (or
+# aiosqlite with KRISHI_DB_BACKEND=sqlite) and openai>=1.x for the routes.
+import os
+
+from a2wsgi import WSGIMiddleware
+from quart import Quart
+from quart_cors import cors
+from werkzeug.exceptions import HTTPException
+
+from routes import market_routes
+from services import aio_clients, metrics
+from wsgi import app as flask_app
+
+# Threads for the Flask fallback (model routes); same knob as gthread
+WSGI_THREADS = int(os.getenv("KRISHI_HTTP_THREADS", "4"))
+
+
+def create_async_app():
+    from async_routes.auth import auth
+    from async_routes.chatbot_routes import chatbot_bp, openai_client
+    from async_routes.farmer_routes import farmer_bp
+    from async_routes.market_routes import market_bp
+
+    app = cors(Quart(__name__))
+    metrics.init_async_app(app)
+
+    app.register_blueprint(chatbot_bp)
+    app.register_blueprint(market_bp)
+    app.register_blueprint(auth)
+    app.register_blueprint(farmer_bp)
+
+    @app.before_serving
+    async def start_background():
+        # runs in each worker after fork, like the sync app's first request
+        market_routes.ensure_snapshot_refresher()
+        # build the pooled clients now: importing openai holds the loop for
+        # ~1 s, which every request queued behind the first /chatbot waited out
+        await aio_clients.http()
+        try:
+            await openai_client()
+        except Exception as e:
+            print("OpenAI client warmup failed:", e)
+
+    @app.after_serving
+    async def close_clients():
+        await aio_clients.close_all()
+
+    return app
+
+
+class Dispatcher:
+    """Sends an HTTP request to the Quart app when one of its rules matches, else to Flask."""
+
+    def __init__(self, async_app, wsgi_app, threads=WSGI_THREADS):
+        self.async_app = async_app
+        self.wsgi_app = WSGIMiddleware(wsgi_app, workers=threads)
+        self.adapter = async_app.url_map.bind("localhost")
+
+    def is_async(self, scope):
+        try:
+            self.adapter.match(scope["path"], method=scope["method"])
+            return True
+        except HTTPException:
+            return False
+
+    async def __call__(self, scope, receive, send):
+        # lifespan and anything that isn't plain HTTP belongs to Quart
+        if scope["type"] == "http" and not self.is_async(scope):
+            return await self.wsgi_app(scope, receive, send)
+        return await self.async_app(scope, receive, send)
+
+
+app = Dispatcher(create_async_app(), flask_app)
@@ -0,0 +1,71 @@
+# backend/async_routes/auth.py
+from quart import Blueprint, jsonify, request
+
+from db import aio as adb
+from routes.auth import is_duplicate_key
+from services import passwords
+
+auth = Blueprint("auth", __name__)
+
+
+def hashing_busy():
+    return jsonify({"error": "Server busy, please retry"}), 503, {"Retry-After": "1"}
+
+
+@auth.post("/register")
+async def register():
+    data = await request.get_json()
+    name = data.get("name")
+    email = data.get("email")
+    password = data.get("password")
+
+    if not email or not password or not name:
+        return jsonify({"error": "Missing fields"}), 400
+
+    # Check if email exists (cheap reject before paying for a hash)
+    if await adb.fetchone("SELECT id FROM farmers WHERE email=%s", (email,)):
+        return jsonify({"error": "Email already exists"}), 409
+
+    try:
+        hashed_pw = await passwords.hash_password_async(password)
+    except passwords.HashPoolBusy:
+        return hashing_busy()
+
+    try:
+        await adb.execute("""
+            INSERT INTO farmers (name, email, password_hash, phone, location, state, district)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, (name, email, hashed_pw, data.get("phone"), data.get("location"),
+              data.get("state"), data.get("district")))
+    except Exception as e:
+        # lost the race to a concurrent register; ux_farmers_email caught it
+        if is_duplicate_key(e):
+            return jsonify({"error": "Email already exists"}), 409
+        raise
+
+    return jsonify({"message": "Farmer registered successfully!"}), 201
+
+
+@auth.post("/login")
+async def login():
+    data = await request.get_json()
+
+    farmer = await adb.fetchone(
+        "SELECT id, password_hash FROM farmers WHERE email=%s", (data["email"],), dictionary=True
+    )
+    if not farmer:
+        return jsonify({"authenticated": False}), 401
+
+    try:
+        ok, new_hash = await passwords.verify_password_async(farmer["password_hash"], data["password"])
+    except passwords.HashPoolBusy:
+        return hashing_busy()
+
+    if not ok:
+        return jsonify({"authenticated": False}), 401
+
+    if new_hash:
+        # stored hash used an older method/cost; upgrade it while we have the password
+        await adb.execute("UPDATE farmers SET password_hash=%s WHERE id=%s", (new_hash, farmer["id"]))
+
+    return jsonify({"authenticated": True, "farmer_id": farmer["id"]}), 200
@@ -0,0 +1,207 @@
+# backend/async_routes/chatbot_routes.py
+#
+# /chatbot and /chatbot/stream on the ASGI app. Prompting, caching and
+# session history are the sync module's; the OpenAI calls go through the
+# async client and tools are awaited instead of run on a thread pool.
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+from quart import Blueprint, Response, jsonify, request
+
+from async_routes.market_routes import query_market, snapshot_store
+from routes import chatbot_routes as shared
+from services import aio_clients, chat_tools, metrics
+from services import intent as local_intent
+from services.singleflight import AsyncSingleFlight
+
+chatbot_bp = Blueprint("chatbot", __name__)
+
+OPENAI_CALLS = AsyncSingleFlight("openai_async")
+OPENAI_CONNECTIONS = int(os.getenv("KRISHI_ASYNC_OPENAI_CONNECTIONS", "100"))
+
+
+def make_client():
+    if not shared.OPENAI_API_KEY:
+        raise RuntimeError("OPENAI_API_KEY not found in environment variables")
+
+    import httpx
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+    return AsyncOpenAI(
+        api_key=shared.OPENAI_API_KEY,
+        base_url=os.getenv("OPENAI_BASE_URL") or None,
+        http_client=DefaultAsyncHttpxClient(limits=httpx.Limits(max_connections=OPENAI_CONNECTIONS))
+    )
+
+
+async def openai_client():
+    return await aio_clients.get("openai", make_client)
+
+
+async def complete(messages):
+    key = hashlib.sha256(json.dumps(messages, sort_keys=True).encode()).hexdigest()
+
+    async def call():
+        client = await openai_client()
+        return await client.chat.completions.create(model="gpt-4o-mini", messages=messages)
+
+    return await OPENAI_CALLS.do(key, call)
+
+
+# -------------------------
+# Intent + tools
+# -------------------------
+async def detect_intent(message):
+    try:
+        store = await snapshot_store()
+        info = local_intent.classify(message, store.source if store is not None else [])
+        if not info.pop("ambiguous"):
+            return info
+    except Exception as e:
+        print("Local intent error:", e)
+
+    try:
+        completion = await complete([
+            {"role": "system", "content": shared.INTENT_SYSTEM},
+            {"role": "user", "content": message}
+        ])
+        return json.loads(completion.choices[0].message.content)
+    except Exception as e:
+        print("Intent detection error:", e)
+        return {"intent": "general"}
+
+
+async def market_tool(commodity, location="", farmer_id=None):
+    store = await snapshot_store()
+    state, district = store.resolve_place(location) if store is not None else ("", location)
+    payload, status = await query_market(commodity, state=state, district=district, farmer_id=farmer_id)
+    return payload if status == 200 else None
+
+
+async def weather_tool(location):
+    return None
+
+
+TOOLS = {
+    "market": market_tool,
+    "weather": weather_tool,
+}
+
+
+async def prepare_turn(session_id, user_message, farmer_id):
+    with metrics.stage("intent"):
+        intent_info = await detect_intent(user_message)
+
+    tool_result = ""
+    calls = shared.tool_calls(intent_info, farmer_id)
+    if calls:
+        with metrics.stage("tools"):
+            tool_result = shared.summarize_tools(await chat_tools.run_tools_async(calls, TOOLS), intent_info)
+
+    # the session store is a local SQLite file; its calls stay off the loop
+    with metrics.stage("db"):
+        history = await asyncio.to_thread(shared.SESSIONS.get, session_id)
+
+    return shared.build_turn(user_message, intent_info, tool_result, history)
+
+
+# -------------------------
+# Routes
+# -------------------------
+@chatbot_bp.route("/chatbot", methods=["POST"])
+async def chatbot():
+    user_message, farmer_id, session_id = shared.chat_fields(await request.get_json(silent=True) or {})
+
+    if not user_message:
+        return jsonify({"error": "Message missing"}), 400
+
+    turn = await prepare_turn(session_id, user_message, farmer_id)
+
+    ai_reply = turn["cached_reply"]
+    if ai_reply is None:
+        with metrics.stage("external_api"):
+            completion = await complete(turn["messages"])
+        ai_reply = completion.choices[0].message.content
+        shared.remember_reply(turn, user_message, ai_reply)
+
+    with metrics.stage("db"):
+        await asyncio.to_thread(shared.save_turn, session_id, user_message, ai_reply)
+
+    return jsonify({
+        "reply": ai_reply,
+        "session_id": session_id,
+        "cached": turn["cached_reply"] is not None
+    })
+
+
+@chatbot_bp.route("/chatbot/stream", methods=["POST"])
+async def chatbot_stream():
+    # TTFT counts from here: intent, tools and history are part of the wait
+    started = time.perf_counter()
+    user_message, farmer_id, session_id = shared.chat_fields(await request.get_json(silent=True) or {})
+
+    if not user_message:
+        return jsonify({"error": "Message missing"}), 400
+
+    turn = await prepare_turn(session_id, user_message, farmer_id)
+
+    async def generate():
+        first_token_at = None
+        parts = []
+
+        if turn["cached_reply"] is not None:
+            await asyncio.to_thread(shared.save_turn, session_id, user_message, turn["cached_reply"])
+            yield shared.sse("token", {"token": turn["cached_reply"]})
+            yield shared.sse("done", {
+                "session_id": session_id,
+                "ttft_ms": round((time.perf_counter() - started) * 1000, 1),
+                "cached": True
+            })
+            return
+
+        try:
+            client = await openai_client()
+            stream = await client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=turn["messages"],
+                stream=True
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if not token:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    shared.TTFT.observe(value=first_token_at - started)
+                parts.append(token)
+                yield shared.sse("token", {"token": token})
+        except Exception as e:
+            print("Chatbot stream error:", e)
+            yield shared.sse("error", {"error": "Stream failed"})
+            return
+
+        ai_reply = "".join(parts)
+        shared.STREAM_SECONDS.observe(value=time.perf_counter() - started)
+        shared.remember_reply(turn, user_message, ai_reply)
+        await asyncio.to_thread(shared.save_turn, session_id, user_message, ai_reply)
+
+        ttft = (first_token_at - started) if first_token_at else None
+        yield shared.sse("done", {
+            "session_id": session_id,
+            "ttft_ms": round(ttft * 1000, 1) if ttft is not None else None,
+            "cached": False
+        })
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
@@ -0,0 +1,73 @@
+# backend/async_routes/farmer_routes.py
+from quart import Blueprint, jsonify, request
+
+from db import aio as adb
+from db.crop_scans import finish_page, scan_page_query
+from services.singleflight import AsyncSingleFlight, coalesced
+from services.upload_store import UPLOAD_STORE
+
+farmer_bp = Blueprint("farmer", __name__)
+
+FARMER_PROFILE = AsyncSingleFlight("farmer_profile_async")
+
+
+@coalesced(FARMER_PROFILE)
+async def fetch_farmer(farmer_id):
+    return await adb.fetchone(
+        "SELECT id, name, email, phone, location FROM farmers WHERE id = %s", (farmer_id,)
+    )
+
+
+@farmer_bp.route("/farmer/<int:farmer_id>", methods=["GET"])
+async def get_farmer(farmer_id):
+    row = await fetch_farmer(farmer_id)
+
+    if not row:
+        return jsonify({"error": "Farmer not found"}), 404
+
+    return jsonify({
+        "id": row[0],
+        "name": row[1],
+        "email": row[2],
+        "phone": row[3],
+        "location": row[4]
+    })
+
+
+@farmer_bp.route("/farmer/<int:farmer_id>", methods=["PUT"])
+async def update_farmer(farmer_id):
+    data = await request.get_json()
+
+    await adb.execute(
+        """
+        UPDATE farmers
+        SET name=%s, email=%s, phone=%s, location=%s
+        WHERE id=%s
+        """,
+        (data.get("name"), data.get("email"), data.get("phone"), data.get("location"), farmer_id)
+    )
+
+    return jsonify({"message": "Profile updated successfully"})
+
+
+def upload_urls(key):
+    # /uploads is served by the Flask app, so its url_for can't build these here
+    if not key or not UPLOAD_STORE.valid_key(key):
+        return None, None
+    base = f"{request.host_url.rstrip('/')}/uploads/{key}"
+    return base, base + "/thumb"
+
+
+@farmer_bp.route("/farmer/<int:farmer_id>/scans", methods=["GET"])
+async def farmer_scans(farmer_id):
+    """Scan history, newest first; same paging as the sync route."""
+    limit = request.args.get("limit", 20, type=int)
+    try:
+        sql, params, limit = scan_page_query(farmer_id, limit, request.args.get("cursor") or None)
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    scans, next_cursor = finish_page(await adb.fetchall(sql, params, dictionary=True), limit)
+    for scan in scans:
+        scan["image_url"], scan["thumbnail_url"] = upload_urls(scan["image_path"])
+    return jsonify({"scans": scans, "next_cursor": next_cursor})
@@ -0,0 +1,187 @@
+# backend/async_routes/market_routes.py
+#
+# /market, /market/meta, /market/history, /market/nearby and /market/export
+# on the ASGI app.
+# Everything after the I/O (fuzzy matching, groups, spatial index) is the
+# sync module's code; only data.gov.in and the farmer lookup are awaited.
+import asyncio
+
+from quart import Blueprint, Response, jsonify, request
+
+from db import aio as adb
+from routes import market_routes as shared
+from services import aio_clients, mandi_export, mandi_store, mandi_stream, metrics
+from services.singleflight import AsyncSingleFlight, coalesced
+
+market_bp = Blueprint("market", __name__)
+
+MANDI_FETCH = AsyncSingleFlight("mandi_fetch_async")
+FARMER_LOCATION = AsyncSingleFlight("farmer_location_async")
+
+
+# ----------------------------------------------------
+# FETCH + SNAPSHOT
+# ----------------------------------------------------
+@coalesced(MANDI_FETCH)
+async def fetch_raw_records(limit=1200):
+    if not shared.API_KEY:
+        print("DATA_GOV_API_KEY not found in environment variables")
+        return []
+    client = await aio_clients.http()
+    params = {"api-key": shared.API_KEY, "format": "json", "limit": limit}
+    try:
+        async with client.stream("GET", shared.BASE_URL, params=params) as r:
+            r.raise_for_status()
+            stream = mandi_stream.RecordStream()
+            records = []
+            async for chunk in r.aiter_bytes(mandi_stream.CHUNK_SIZE):
+                records.extend(stream.feed(chunk))
+            records.extend(stream.close())
+            return records
+    except Exception:
+        return []
+
+
+async def snapshot_store():
+    """
+    The shared mandi store, or None when there is no data. The refresher
+    thread (started in before_serving) keeps it current; this only fetches
+    when nothing has been loaded yet.
+    """
+    store = mandi_store.STORE
+    if store.source:
+        return store
+    with metrics.stage("external_api"):
+        records = await fetch_raw_records()
+    if not records:
+        return None
+    # diffing a snapshot is CPU work; keep it off the event loop
+    return await asyncio.to_thread(mandi_store.sync, records)
+
+
+@coalesced(FARMER_LOCATION)
+async def get_farmer_location(farmer_id):
+    try:
+        return await adb.fetchone(
+            "SELECT state, district FROM farmers WHERE id=%s", (farmer_id,), dictionary=True
+        )
+    except Exception:
+        return None
+
+
+# ----------------------------------------------------
+# ROUTES
+# ----------------------------------------------------
+@market_bp.route("/market/meta", methods=["GET"])
+async def get_market_metadata():
+    store = await snapshot_store()
+    if store is None:
+        return jsonify({"error": "No mandi data available"}), 502
+    return jsonify(store.meta())
+
+
+async def query_market(commodity, state="", district="", farmer_id=None):
+    """Async twin of routes.market_routes.query_market; returns (payload, status)."""
+    commodity = (commodity or "").strip()
+    if not commodity:
+        return {"error": "commodity is required"}, 400
+
+    auto_state = auto_district = ""
+    if farmer_id:
+        with metrics.stage("db"):
+            loc = await get_farmer_location(farmer_id)
+        if loc:
+            auto_state = loc.get("state", "")
+            auto_district = loc.get("district", "")
+
+    state = (state or "").strip() or auto_state
+    district = (district or "").strip() or auto_district
+
+    if not state:
+        return {"error": "State not provided"}, 400
+
+    store = await snapshot_store()
+    if store is None:
+        return {"error": "No mandi data available"}, 502
+
+    return shared.market_payload(store, commodity, state, district)
+
+
+@market_bp.route("/market", methods=["GET"])
+async def get_market_data():
+    payload, status = await query_market(
+        request.args.get("commodity", ""),
+        state=request.args.get("state", ""),
+        district=request.args.get("district", ""),
+        farmer_id=request.args.get("farmer_id")
+    )
+    return jsonify(payload), status
+
+
+@market_bp.route("/market/history", methods=["GET"])
+async def get_market_history():
+    commodity = request.args.get("commodity", "").strip()
+    state = request.args.get("state", "").strip()
+
+    if not commodity or not state:
+        return jsonify({"error": "commodity and state required"}), 400
+
+    store = await snapshot_store()
+    formatted = store.group(state, commodity)["history"] if store is not None else []
+    if not formatted:
+        return jsonify({"error": "No history available"}), 404
+
+    return jsonify({
+        "commodity": commodity,
+        "state": state,
+        "history": formatted
+    })
+
+
+@market_bp.route("/market/nearby", methods=["GET"])
+async def get_market_nearby():
+    params, error = shared.parse_nearby_args(request.args)
+    if error:
+        return jsonify(error[0]), error[1]
+
+    state = request.args.get("state", "").strip()
+    district = request.args.get("district", "").strip()
+    farmer_id = request.args.get("farmer_id")
+    if farmer_id and not state and (params["lat"] is None or params["lon"] is None):
+        with metrics.stage("db"):
+            loc = await get_farmer_location(farmer_id) or {}
+        state, district = loc.get("state") or "", loc.get("district") or ""
+    if not shared.nearby_origin(params, state, district):
+        return jsonify(shared.NO_ORIGIN), 400
+
+    store = await snapshot_store()
+    if store is None:
+        return jsonify({"error": "No mandi data available"}), 502
+
+    payload, status = shared.nearby_payload(store, params)
+    return jsonify(payload), status
+
+
+@market_bp.route("/market/export", methods=["GET"])
+async def export_market_data():
+    params, error = mandi_export.parse_args(request.args, request.headers.get("Accept-Encoding", ""))
+    if error:
+        return jsonify(error[0]), error[1]
+
+    store = await snapshot_store()
+    if store is None:
+        return jsonify({"error": "No mandi data available"}), 502
+
+    records, seq = store.source, store.seq
+    chunks = mandi_export.stream(records, params)
+
+    async def body():
+        # encoding and gzip are CPU work; one chunk at a time off the event loop
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+    mimetype, headers = mandi_export.response_headers(params, seq)
+    return Response(body(), mimetype=mimetype, headers=headers)
@@ -0,0 +1,117 @@
+# backend/db/aio.py
+#
+# asyncio counterpart of db.config.get_db for the ASGI routes: a connection
+# pool per event loop (aiomysql, or aiosqlite on the sqlite backend) behind
+# three calls that take the same %s SQL the sync routes use. Writes are
+# autocommitted.
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+from db.config import db_backend, mysql_config, sqlite_path
+from db.sqlite_compat import PLACEHOLDER_RE
+from services import aio_clients
+
+POOL_SIZE = int(os.getenv("KRISHI_ASYNC_DB_POOL", "10"))
+
+
+class SqlitePool:
+    """Up to `size` aiosqlite connections (each runs on its own thread) handed out in turn."""
+
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self.opened = 0
+        self._idle = asyncio.Queue()
+
+    async def _open(self):
+        import aiosqlite
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = await aiosqlite.connect(self.path, timeout=10)
+        await conn.execute("PRAGMA journal_mode=WAL")
+        await conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @asynccontextmanager
+    async def acquire(self):
+        if self._idle.empty() and self.opened < self.size:
+            self.opened += 1
+            try:
+                conn = await self._open()
+            except Exception:
+                self.opened -= 1
+                raise
+        else:
+            conn = await self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put_nowait(conn)
+
+    async def run(self, sql, params, fetch, dictionary):
+        async with self.acquire() as conn:
+            cur = await conn.execute(PLACEHOLDER_RE.sub("?", sql), tuple(params or ()))
+            try:
+                if fetch is None:
+                    await conn.commit()
+                    return cur.rowcount, cur.lastrowid
+                rows = [await cur.fetchone()] if fetch == "one" else await cur.fetchall()
+                if dictionary and cur.description:
+                    names = [d[0] for d in cur.description]
+                    rows = [dict(zip(names, r)) if r is not None else None for r in rows]
+                return rows[0] if fetch == "one" else rows
+            finally:
+                await cur.close()
+
+    async def close(self):
+        while not self._idle.empty():
+            await self._idle.get_nowait().close()
+
+
+class MysqlPool:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def run(self, sql, params, fetch, dictionary):
+        import aiomysql
+
+        async with self.pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor if dictionary else aiomysql.Cursor) as cur:
+                await cur.execute(sql, tuple(params or ()))
+                if fetch is None:
+                    return cur.rowcount, cur.lastrowid
+                return await cur.fetchone() if fetch == "one" else list(await cur.fetchall())
+
+    async def close(self):
+        self.pool.close()
+        await self.pool.wait_closed()
+
+
+async def make_pool():
+    if db_backend() == "sqlite":
+        return SqlitePool(sqlite_path(), POOL_SIZE)
+
+    import aiomysql
+
+    config = mysql_config()
+    config["db"] = config.pop("database")
+    return MysqlPool(await aiomysql.create_pool(minsize=1, maxsize=POOL_SIZE, autocommit=True, **config))
+
+
+async def _run(sql, params, fetch, dictionary=False):
+    pool = await aio_clients.get("db", make_pool)
+    return await pool.run(sql, params, fetch, dictionary)
+
+
+async def fetchone(sql, params=(), dictionary=False):
+    return await _run(sql, params, "one", dictionary)
+
+
+async def fetchall(sql, params=(), dictionary=False):
+    return await _run(sql, params, "all", dictionary)
+
+
+async def execute(sql, params=()):
+    """Runs and commits a write; returns (rowcount, lastrowid)."""
+    return await _run(sql, params, None)
@@ -1,9 +1,34 @@
-import mysql.connector
+import os
 
-def get_db():
-    return mysql.connector.connect(
-        host="localhost",
-        user="kavya",
-        password="kavya@0411",
-        database="farmer"
+
+# Read on every call, not at import: the bench harness (and anything else
+# that configures the process after importing db.*) sets these late.
+def db_backend():
+    # "mysql" (default) or "sqlite" for local benchmarks and dev boxes
+    return os.getenv("KRISHI_DB_BACKEND", "mysql")
+
+
+def mysql_config():
+    return {
+        "host": os.getenv("KRISHI_DB_HOST", "localhost"),
+        "port": int(os.getenv("KRISHI_DB_PORT", "3306")),
+        "user": os.getenv("KRISHI_DB_USER", "kavya"),
+        "password": os.getenv("KRISHI_DB_PASSWORD", "kavya@0411"),
+        "database": os.getenv("KRISHI_DB_NAME", "farmer"),
+    }
+
+
+def sqlite_path():
+    return os.getenv(
+        "KRISHI_SQLITE_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "farmer.db")
     )
+
+
+def get_db():
+    if db_backend() == "sqlite":
+        from db.sqlite_compat import connect
+        return connect(sqlite_path())
+
+    import mysql.connector
+    return mysql.connector.connect(**mysql_config())
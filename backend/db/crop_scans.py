@@ -0,0 +1,92 @@
+# backend/db/crop_scans.py
+#
+# crop_scans reads/writes shared by the scan routes and the batch writer.
+import base64
+import json
+from datetime import datetime
+
+INSERT_SQL = (
+    "INSERT INTO crop_scans (farmer_id, image_path, crop_type, disease, confidence) "
+    "VALUES (%s, %s, %s, %s, %s)"
+)
+
+SCAN_COLUMNS = ("id", "farmer_id", "image_path", "crop_type", "disease", "confidence", "created_at")
+
+MAX_PAGE = 100
+
+
+def insert_scans(db, rows):
+    """rows: iterable of (farmer_id, image_path, crop_type, disease, confidence)."""
+    rows = list(rows)
+    if not rows:
+        return 0
+    cursor = db.cursor()
+    if len(rows) == 1:
+        cursor.execute(INSERT_SQL, rows[0])
+    else:
+        cursor.executemany(INSERT_SQL, rows)
+    db.commit()
+    cursor.close()
+    return len(rows)
+
+
+# ----------------------------------------------------
+# KEYSET PAGINATION (newest first)
+# ----------------------------------------------------
+def _ts(value):
+    # MySQL hands back datetime, SQLite the CURRENT_TIMESTAMP text; both
+    # compare correctly against this format
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return str(value)
+
+
+def encode_cursor(row):
+    raw = json.dumps([_ts(row["created_at"]), row["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Returns (created_at, id); raises ValueError on a malformed token."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        created_at, scan_id = json.loads(raw)
+        return str(created_at), int(scan_id)
+    except Exception:
+        raise ValueError("invalid cursor")
+
+
+def list_scans(db, farmer_id, limit=20, cursor=None):
+    """
+    One page of a farmer's scans plus the cursor for the next page (None
+    on the last page). Seeks on (created_at, id) through
+    ix_crop_scans_farmer_created, so page N costs the same as page 1.
+    """
+    sql, params, limit = scan_page_query(farmer_id, limit, cursor)
+    cur = db.cursor(dictionary=True)
+    cur.execute(sql, params)
+    rows = cur.fetchall()
+    cur.close()
+    return finish_page(rows, limit)
+
+
+def scan_page_query(farmer_id, limit, cursor):
+    """(sql, params, limit) for one page; fetches limit + 1 rows to detect the last page."""
+    limit = max(1, min(int(limit), MAX_PAGE))
+    sql = f"SELECT {', '.join(SCAN_COLUMNS)} FROM crop_scans WHERE farmer_id = %s"
+    params = [farmer_id]
+    if cursor:
+        created_at, scan_id = decode_cursor(cursor)
+        sql += " AND (created_at < %s OR (created_at = %s AND id < %s))"
+        params += [created_at, created_at, scan_id]
+    sql += " ORDER BY created_at DESC, id DESC LIMIT %s"
+    params.append(limit + 1)
+    return sql, params, limit
+
+
+def finish_page(rows, limit):
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    rows = rows[:limit]
+    for r in rows:
+        r["created_at"] = _ts(r["created_at"])
+    return rows, next_cursor
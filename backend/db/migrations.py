@@ -0,0 +1,214 @@
+# backend/db/migrations.py
+#
+# Ordered, versioned schema changes for the farmer database.
+#
+#   cd backend && python -m db.migrations          # apply pending
+#   cd backend && python -m db.migrations --status
+#
+# Each migration is (version, description, {"mysql": [...], "sqlite": [...]})
+# and runs once; applied versions are recorded in schema_migrations.
+import sys
+import time
+
+from db.config import db_backend, get_db
+
+MIGRATIONS = [
+    (1, "baseline farmers / crop_scans tables", {
+        "mysql": [
+            """
+            CREATE TABLE IF NOT EXISTS farmers (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                email VARCHAR(255) NOT NULL,
+                password_hash VARCHAR(255) NOT NULL,
+                phone VARCHAR(32),
+                location VARCHAR(255),
+                state VARCHAR(128),
+                district VARCHAR(128)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS crop_scans (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                farmer_id INT,
+                image_path VARCHAR(512),
+                crop_type VARCHAR(128),
+                disease VARCHAR(128),
+                confidence FLOAT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+        ],
+        "sqlite": [
+            """
+            CREATE TABLE IF NOT EXISTS farmers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                email TEXT NOT NULL,
+                password_hash TEXT NOT NULL,
+                phone TEXT,
+                location TEXT,
+                state TEXT,
+                district TEXT
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS crop_scans (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                farmer_id INTEGER,
+                image_path TEXT,
+                crop_type TEXT,
+                disease TEXT,
+                confidence REAL,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+        ],
+    }),
+    # /login and /register look farmers up by email; the unique index makes
+    # that a point lookup and closes the check-then-insert race in /register
+    (2, "unique index on farmers.email", {
+        "mysql": ["CREATE UNIQUE INDEX ux_farmers_email ON farmers (email)"],
+        "sqlite": ["CREATE UNIQUE INDEX IF NOT EXISTS ux_farmers_email ON farmers (email)"],
+    }),
+    # scan history is always "this farmer, newest first"; both engines append
+    # the primary key to secondary indexes, so this also serves the
+    # (created_at, id) keyset used by GET /farmer/<id>/scans
+    (3, "index crop_scans (farmer_id, created_at)", {
+        "mysql": ["CREATE INDEX ix_crop_scans_farmer_created ON crop_scans (farmer_id, created_at)"],
+        "sqlite": ["CREATE INDEX IF NOT EXISTS ix_crop_scans_farmer_created ON crop_scans (farmer_id, created_at)"],
+    }),
+    # price alert subscriptions and the outbox the alert engine writes to;
+    # (alert_id, event_key) is unique so two workers seeing the same price
+    # move record it once
+    (4, "price_alerts / alert_outbox tables", {
+        "mysql": [
+            """
+            CREATE TABLE IF NOT EXISTS price_alerts (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                farmer_id INT NOT NULL,
+                commodity VARCHAR(128) NOT NULL,
+                state VARCHAR(128) NOT NULL,
+                district VARCHAR(128) NOT NULL DEFAULT '',
+                kind VARCHAR(16) NOT NULL,
+                threshold DOUBLE NOT NULL,
+                active TINYINT NOT NULL DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                INDEX ix_price_alerts_farmer (farmer_id)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS alert_outbox (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                alert_id INT NOT NULL,
+                farmer_id INT NOT NULL,
+                event_key CHAR(40) NOT NULL,
+                commodity VARCHAR(128) NOT NULL,
+                state VARCHAR(128),
+                district VARCHAR(128),
+                market VARCHAR(128),
+                arrival_date VARCHAR(16),
+                old_price INT,
+                new_price INT,
+                change_pct DOUBLE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                delivered_at TIMESTAMP NULL,
+                UNIQUE KEY ux_alert_outbox_event (alert_id, event_key),
+                INDEX ix_alert_outbox_farmer (farmer_id, id)
+            )
+            """,
+        ],
+        "sqlite": [
+            """
+            CREATE TABLE IF NOT EXISTS price_alerts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                farmer_id INTEGER NOT NULL,
+                commodity TEXT NOT NULL,
+                state TEXT NOT NULL,
+                district TEXT NOT NULL DEFAULT '',
+                kind TEXT NOT NULL,
+                threshold REAL NOT NULL,
+                active INTEGER NOT NULL DEFAULT 1,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS ix_price_alerts_farmer ON price_alerts (farmer_id)",
+            """
+            CREATE TABLE IF NOT EXISTS alert_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                alert_id INTEGER NOT NULL,
+                farmer_id INTEGER NOT NULL,
+                event_key TEXT NOT NULL,
+                commodity TEXT NOT NULL,
+                state TEXT,
+                district TEXT,
+                market TEXT,
+                arrival_date TEXT,
+                old_price INTEGER,
+                new_price INTEGER,
+                change_pct REAL,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                delivered_at TEXT
+            )
+            """,
+            "CREATE UNIQUE INDEX IF NOT EXISTS ux_alert_outbox_event ON alert_outbox (alert_id, event_key)",
+            "CREATE INDEX IF NOT EXISTS ix_alert_outbox_farmer ON alert_outbox (farmer_id, id)",
+        ],
+    }),
+]
+
+VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT PRIMARY KEY,
+    description VARCHAR(255) NOT NULL,
+    applied_at DOUBLE NOT NULL
+)
+"""
+
+
+def applied_versions(db):
+    cur = db.cursor()
+    cur.execute(VERSION_TABLE)
+    db.commit()
+    cur.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cur.fetchall()}
+
+
+def pending(db):
+    done = applied_versions(db)
+    return [m for m in MIGRATIONS if m[0] not in done]
+
+
+def migrate(db=None, backend=None):
+    """Apply pending migrations in order; returns the versions applied."""
+    db = db or get_db()
+    backend = backend or db_backend()
+    applied = []
+    for version, description, statements in pending(db):
+        cur = db.cursor()
+        try:
+            for sql in statements[backend]:
+                cur.execute(sql)
+            cur.execute(
+                "INSERT INTO schema_migrations (version, description, applied_at) VALUES (%s, %s, %s)",
+                (version, description, time.time()),
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Migration {version} ({description}) failed:", e)
+            raise
+        print(f"Applied migration {version}: {description}")
+        applied.append(version)
+    return applied
+
+
+if __name__ == "__main__":
+    conn = get_db()
+    if "--status" in sys.argv:
+        todo = {m[0] for m in pending(conn)}
+        for version, description, _ in MIGRATIONS:
+            print(f"{version:>3}  {'pending' if version in todo else 'applied'}  {description}")
+    else:
+        if not migrate(conn):
+            print("Schema is up to date")
@@ -0,0 +1,107 @@
+# backend/db/price_alerts.py
+#
+# price_alerts / alert_outbox reads and writes shared by the alert routes
+# and the alert engine.
+from db.config import db_backend
+
+ALERT_KINDS = ("above", "below", "change")
+
+ALERT_COLUMNS = ("id", "farmer_id", "commodity", "state", "district", "kind", "threshold", "active", "created_at")
+
+OUTBOX_COLUMNS = (
+    "alert_id", "farmer_id", "event_key", "commodity", "state", "district",
+    "market", "arrival_date", "old_price", "new_price", "change_pct",
+)
+
+# Ignore rows another worker already recorded (ux_alert_outbox_event)
+INSERT_IGNORE = {"mysql": "INSERT IGNORE", "sqlite": "INSERT OR IGNORE"}
+
+LOAD_BATCH = 50000
+ID_CHUNK = 1000
+
+
+def create_alert(db, farmer_id, commodity, state, district, kind, threshold):
+    cursor = db.cursor()
+    cursor.execute(
+        "INSERT INTO price_alerts (farmer_id, commodity, state, district, kind, threshold) "
+        "VALUES (%s, %s, %s, %s, %s, %s)",
+        (farmer_id, commodity, state, district or "", kind, threshold),
+    )
+    db.commit()
+    return cursor.lastrowid
+
+
+def list_alerts(db, farmer_id):
+    cursor = db.cursor(dictionary=True)
+    cursor.execute(
+        f"SELECT {', '.join(ALERT_COLUMNS)} FROM price_alerts "
+        "WHERE farmer_id=%s AND active=1 ORDER BY id",
+        (farmer_id,),
+    )
+    return cursor.fetchall()
+
+
+def deactivate_alert(db, alert_id, farmer_id):
+    cursor = db.cursor()
+    cursor.execute(
+        "UPDATE price_alerts SET active=0 WHERE id=%s AND farmer_id=%s AND active=1",
+        (alert_id, farmer_id),
+    )
+    db.commit()
+    return cursor.rowcount > 0
+
+
+def iter_active_alerts(db, after_id=0, batch=LOAD_BATCH):
+    """Yields (id, commodity, state, district, kind, threshold) in id order, one keyset page at a time."""
+    cursor = db.cursor()
+    while True:
+        cursor.execute(
+            "SELECT id, commodity, state, district, kind, threshold FROM price_alerts "
+            "WHERE id > %s AND active=1 ORDER BY id LIMIT %s",
+            (after_id, batch),
+        )
+        rows = cursor.fetchall()
+        yield from rows
+        if len(rows) < batch:
+            return
+        after_id = rows[-1][0]
+
+
+def active_owners(db, alert_ids):
+    """{alert_id: farmer_id} for the ids that are still active."""
+    owners = {}
+    cursor = db.cursor()
+    ids = list(alert_ids)
+    for start in range(0, len(ids), ID_CHUNK):
+        chunk = ids[start:start + ID_CHUNK]
+        cursor.execute(
+            f"SELECT id, farmer_id FROM price_alerts WHERE active=1 AND id IN ({', '.join(['%s'] * len(chunk))})",
+            chunk,
+        )
+        owners.update(cursor.fetchall())
+    return owners
+
+
+def insert_outbox(db, rows, backend=None):
+    """rows: dicts with OUTBOX_COLUMNS; duplicates of already recorded events are skipped."""
+    if not rows:
+        return 0
+    backend = backend or db_backend()
+    sql = (
+        f"{INSERT_IGNORE[backend]} INTO alert_outbox ({', '.join(OUTBOX_COLUMNS)}) "
+        f"VALUES ({', '.join(['%s'] * len(OUTBOX_COLUMNS))})"
+    )
+    cursor = db.cursor()
+    cursor.executemany(sql, [tuple(r[c] for c in OUTBOX_COLUMNS) for r in rows])
+    db.commit()
+    return len(rows)
+
+
+def list_outbox(db, farmer_id, limit=50):
+    cursor = db.cursor(dictionary=True)
+    cursor.execute(
+        f"SELECT id, {', '.join(OUTBOX_COLUMNS[:2] + OUTBOX_COLUMNS[3:])}, created_at, delivered_at "
+        "FROM alert_outbox WHERE farmer_id=%s ORDER BY id DESC LIMIT %s",
+        (farmer_id, limit),
+    )
+    return cursor.fetchall()
@@ -0,0 +1,109 @@
+# backend/gunicorn.conf.py
+#
+#   cd backend && gunicorn -c gunicorn.conf.py
+#
+# Env overrides: WEB_CONCURRENCY (workers), KRISHI_HTTP_THREADS (threads per
+# worker), KRISHI_TORCH_THREADS (intra-op threads per worker),
+# KRISHI_HASH_WORKERS (password hashing processes per worker), PORT,
+# KRISHI_SERVER (wsgi, or asgi for the async I/O routes in asgi.py),
+# KRISHI_METRICS_DIR (per-worker metrics files merged by /metrics).
+import gc
+import glob
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+
+CPU_COUNT = multiprocessing.cpu_count()
+
+workers = int(os.getenv("WEB_CONCURRENCY", min(4, CPU_COUNT)))
+
+# Request threads per worker (gthread), or the Flask fallback pool under asgi
+HTTP_THREADS = int(os.getenv("KRISHI_HTTP_THREADS", "4"))
+
+# Every request thread can be inside a forward pass at once, so split the
+# cores over workers x threads: N workers x T threads x M torch threads
+# never exceeds the machine; oversubscription makes every forward pass slower.
+TORCH_THREADS = int(os.getenv("KRISHI_TORCH_THREADS", max(1, CPU_COUNT // (workers * HTTP_THREADS))))
+
+# Read by OpenMP/MKL/OpenBLAS when torch and numpy initialise in the master,
+# and inherited by every worker.
+for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+    os.environ.setdefault(var, str(TORCH_THREADS))
+
+# Same split for the password hashing pools (services/passwords.py)
+os.environ.setdefault("KRISHI_HASH_WORKERS", str(max(1, CPU_COUNT // workers)))
+
+# Each worker keeps its own counters; they write them here and /metrics
+# merges the files, so a scrape covers every worker (services/metrics.py)
+os.environ.setdefault("KRISHI_METRICS_DIR", tempfile.mkdtemp(prefix="krishi-metrics-"))
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+if os.getenv("KRISHI_SERVER", "wsgi") == "asgi":
+    # One event loop per worker serves the I/O-bound routes; KRISHI_HTTP_THREADS
+    # only sizes the pool the model routes fall back to.
+    wsgi_app = "asgi:app"
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    wsgi_app = "wsgi:app"
+    # Threads absorb I/O-bound routes (market, chatbot, DB) while model-bound
+    # routes are limited by TORCH_THREADS.
+    worker_class = "gthread"
+    threads = HTTP_THREADS
+
+# Import the app and load model weights once in the master, then fork.
+preload_app = True
+
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers slowly to bound any leak without a thundering reload
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    # a reused KRISHI_METRICS_DIR still holds the last run's workers
+    for path in glob.glob(os.path.join(os.environ["KRISHI_METRICS_DIR"], "*.json")):
+        os.remove(path)
+
+
+def when_ready(server):
+    # Move everything allocated during preload into the permanent
+    # generation so the GC never writes to those pages in the workers,
+    # which would break copy-on-write sharing.
+    gc.collect()
+    gc.freeze()
+    server.log.info(
+        "Preloaded app; %s workers x %s threads x %s torch threads",
+        workers, HTTP_THREADS, TORCH_THREADS
+    )
+
+
+def post_fork(server, worker):
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(TORCH_THREADS)
+
+    cv2 = sys.modules.get("cv2")
+    if cv2 is not None:
+        cv2.setNumThreads(TORCH_THREADS)
+
+    # Each worker owns its hashing pool; start it now instead of on the
+    # first /login of the morning rush
+    passwords = sys.modules.get("services.passwords")
+    if passwords is not None:
+        threading.Thread(target=passwords.warmup, name="hash-pool-warmup", daemon=True).start()
+
+
+def child_exit(server, worker):
+    # keep a recycled worker's counters in the totals, drop its gauges
+    from services import metrics
+
+    metrics.mark_process_dead(worker.pid)
@@ -1,29 +1,45 @@
 # backend/models/crop_disease/predict.py
 import os
-from ultralytics import YOLO
-from PIL import Image
-import numpy as np
+import time
+
+from services import admission, metrics
+from services.model_registry import register
 
 MODEL_PATH = os.path.join(os.path.dirname(__file__), "best.pt")
 
-# Load model once when module is imported
-model = YOLO(MODEL_PATH)
+
+def load_model():
+    from ultralytics import YOLO
+    return YOLO(MODEL_PATH)
+
+
+# Load model once, on first prediction (or by the warmup thread)
+MODEL = register("crop_disease", load_model)
+ADMISSION = admission.limiter("crop_disease")
 
 # class mapping: depends on how your YOLO model was trained
 # if you trained with class names in YAML, model.names will have them.
-def predict_image(image_path, conf_threshold=0.25):
+def predict_image(image_path, conf_threshold=0.25, classes=None):
     """
-    Run YOLO model on image_path.
+    Run YOLO model on image_path (a path, or an already decoded BGR array).
+    classes restricts detection to those class ids (None = all).
     Returns a list of detections:
     [ { 'class_id': int, 'label': 'Rust', 'confidence': 0.92, 'box': [x1,y1,x2,y2] }, ... ]
     """
-    results = model.predict(source=image_path, conf=conf_threshold, imgsz=640)  # returns Results list
+    model = MODEL.get()
+    with ADMISSION.slot():
+        started = time.perf_counter()
+        results = model.predict(source=image_path, conf=conf_threshold, imgsz=640,
+                                classes=classes, verbose=False)  # returns Results list
+        elapsed = time.perf_counter() - started
 
     detections = []
     # results may contain multiple frames; take first
     if len(results) == 0:
         return detections
 
+    metrics.record_yolo_speed(results[0], elapsed)
+
     r = results[0]
     boxes = r.boxes  # ultralytics Boxes object
     for box in boxes:
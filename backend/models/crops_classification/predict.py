@@ -0,0 +1,41 @@
+# backend/models/crops_classification/predict.py
+import os
+import time
+
+from services import admission, metrics
+from services.model_registry import register
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "best.pt")
+
+
+def load_model():
+    from ultralytics import YOLO
+    return YOLO(MODEL_PATH)
+
+
+# Loaded on first request (or by the warmup thread), not at import
+MODEL = register("crop_classifier", load_model)
+ADMISSION = admission.limiter("crop_classifier")
+
+
+def classify_image(source):
+    """
+    Top-1 crop/condition for a path or decoded BGR array.
+    Returns { 'label': 'Tomato___Late_blight', 'class_id': int, 'confidence': float }
+    """
+    model = MODEL.get()
+    with ADMISSION.slot():
+        started = time.perf_counter()
+        results = model(source, verbose=False)
+        metrics.record_yolo_speed(results[0], time.perf_counter() - started)
+
+    # best class index & confidence
+    index = results[0].probs.top1
+    confidence = float(results[0].probs.top1conf)
+
+    # Map index → label
+    return {
+        "label": results[0].names[index],
+        "class_id": index,
+        "confidence": confidence,
+    }
@@ -0,0 +1,291 @@
+"""
+Build the YOLO classification dataset for the crop classifier.
+
+    python backend/models/crops_classification/prepare_dataset.py --src /path/to/PlantVillage-raw
+
+Scans a raw PlantVillage-style tree (the parent folder of every image is
+its class, so `color/<class>/x.jpg` and `train/<class>/x.jpg` both work),
+drops byte-identical duplicates, splits each class train/val, writes the
+images pre-resized to --imgsz into data/PlantVillage/{train,val}/<class>/
+and regenerates data.yml.
+
+Reruns are incremental: a manifest keyed on (size, mtime) means only new
+or changed files are hashed and resized, and files removed from --src are
+removed from the output. The manifest also records --imgsz and --val: a
+new --imgsz re-resizes every output, a new --val moves the files whose
+split changed.
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from PIL import Image
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUT = os.path.join(HERE, "data", "PlantVillage")
+DATA_YML = os.path.join(HERE, "data.yml")
+MANIFEST_NAME = ".manifest.json"
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+IMGSZ = 224  # ultralytics default for classify models
+
+
+# ----------------------------------------------------
+# SCAN
+# ----------------------------------------------------
+def _scan_dir(path):
+    files, subdirs = [], []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif os.path.splitext(entry.name)[1].lower() in IMAGE_EXTS:
+                st = entry.stat()
+                files.append((entry.path, st.st_size, int(st.st_mtime)))
+    return files, subdirs
+
+
+def scan_tree(root, workers):
+    """Breadth-first parallel scandir -> {relpath: (size, mtime)}."""
+    found = {}
+    pending = [root]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending:
+            next_level = []
+            for files, subdirs in pool.map(_scan_dir, pending):
+                for path, size, mtime in files:
+                    found[os.path.relpath(path, root)] = (size, mtime)
+                next_level.extend(subdirs)
+            pending = next_level
+    return found
+
+
+def class_of(relpath):
+    return os.path.basename(os.path.dirname(relpath)) or "unknown"
+
+
+# ----------------------------------------------------
+# WORKERS
+# ----------------------------------------------------
+def _hash_file(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _hash_chunk(paths):
+    out = []
+    for p in paths:
+        try:
+            out.append(_hash_file(p))
+        except OSError as e:
+            print(f"Skipping unreadable file {p}: {e}")
+            out.append(None)
+    return out
+
+
+def _resize_chunk(args):
+    jobs, imgsz = args
+    ok = []
+    for src, dest in jobs:
+        try:
+            img = Image.open(src)
+            img.draft("RGB", (imgsz, imgsz))
+            img = img.convert("RGB")
+            scale = imgsz / min(img.size)
+            if scale < 1:  # shorter side -> imgsz, never upscale
+                img = img.resize((round(img.width * scale), round(img.height * scale)), Image.BILINEAR)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            img.save(dest, "JPEG", quality=95)
+            ok.append(True)
+        except Exception as e:
+            print(f"Skipping undecodable image {src}: {e}")
+            ok.append(False)
+    return ok
+
+
+def _chunks(items, n):
+    size = max(1, len(items) // n)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+# ----------------------------------------------------
+# SPLIT
+# ----------------------------------------------------
+def assign_splits(entries, val_fraction):
+    """
+    Per-class stratified split in content-hash order: each class's images
+    are ranked by hash and the lowest ceil(val_fraction * n) go to val (at
+    least one for any class with two or more images, never all of them),
+    so every class has both folders, as YOLO classify needs. The split
+    depends only on the class's images, not on the order they arrived in,
+    so reruns and other machines agree, and raising --val only moves
+    train images into val.
+    """
+    by_class = {}
+    for key, e in entries.items():
+        if not e.get("duplicate_of"):
+            by_class.setdefault(e["class"], []).append(key)
+
+    for keys in by_class.values():
+        keys.sort(key=lambda k: entries[k]["hash"])
+        n = len(keys)
+        n_val = min(math.ceil(val_fraction * n), n - 1) if n >= 2 and val_fraction > 0 else 0
+        for rank, key in enumerate(keys):
+            entries[key]["split"] = "val" if rank < n_val else "train"
+
+
+def dest_path(out_dir, entry):
+    # hash in the name keeps same-named files from different source folders apart
+    stem = os.path.splitext(os.path.basename(entry["src"]))[0]
+    return os.path.join(out_dir, entry["split"], entry["class"], f"{stem}-{entry['hash'][:8]}.jpg")
+
+
+# ----------------------------------------------------
+# DATA.YML
+# ----------------------------------------------------
+def write_data_yml(out_dir, classes, path=DATA_YML):
+    # relative to the yml, so the checkout can move or be shared between machines
+    root = os.path.relpath(os.path.abspath(out_dir), os.path.dirname(os.path.abspath(path)))
+    lines = [
+        "# generated by prepare_dataset.py; path is relative to this file",
+        f"path: {root.replace(os.sep, '/')}",
+        "train: train",
+        "val: val",
+        f"nc: {len(classes)}",
+        "names:",
+    ]
+    lines += [f"  {i}: {name}" for i, name in enumerate(classes)]
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+# ----------------------------------------------------
+# MAIN
+# ----------------------------------------------------
+def prepare(src, out_dir=DEFAULT_OUT, imgsz=IMGSZ, val_fraction=0.2, workers=None):
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+
+    entries = {}
+    resize_all = False
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f)
+        entries = previous.get("files", {})
+        if previous.get("imgsz") != imgsz:
+            # hashes and splits still hold; every output has to be redone
+            print(f"imgsz changed {previous.get('imgsz')} -> {imgsz}, resizing every image again")
+            resize_all = True
+        if previous.get("val_fraction") != val_fraction:
+            print(f"val fraction changed {previous.get('val_fraction')} -> {val_fraction}, re-splitting")
+    manifest = {"imgsz": imgsz, "val_fraction": val_fraction, "files": entries}
+
+    found = scan_tree(src, workers * 4)
+    scanned = time.perf_counter()
+
+    # removed or changed sources: drop their outputs, and forget duplicates
+    # of them so those copies are reconsidered as new files below
+    removed = 0
+    for key in list(entries):
+        e = entries[key]
+        if key not in found or tuple(found[key]) != (e["size"], e["mtime"]):
+            if e.get("dest") and os.path.exists(e["dest"]):
+                os.remove(e["dest"])
+            del entries[key]
+            removed += 1
+    gone = {k for k, e in entries.items() if e.get("duplicate_of") and e["duplicate_of"] not in entries}
+    for key in gone:
+        del entries[key]
+
+    new_keys = sorted(k for k in found if k not in entries)
+
+    # phase 1: hash new files in parallel, dedup against everything kept
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        hashes = [
+            h for chunk in pool.map(_hash_chunk, _chunks([os.path.join(src, k) for k in new_keys], workers * 8))
+            for h in chunk
+        ]
+    seen = {e["hash"]: k for k, e in entries.items() if not e.get("duplicate_of")}
+    duplicates = 0
+    unique_new = set()
+    for key, h in zip(new_keys, hashes):
+        if h is None:
+            continue
+        size, mtime = found[key]
+        entry = {"src": key, "class": class_of(key), "size": size, "mtime": mtime, "hash": h}
+        if h in seen:
+            entry["duplicate_of"] = seen[h]
+            duplicates += 1
+        else:
+            seen[h] = key
+            unique_new.add(key)
+        entries[key] = entry
+    hashed = time.perf_counter()
+
+    # phase 2: split each class in hash order; kept files whose split
+    # changed (a new --val, or the class grew or shrank) move, and anything
+    # new, resized at another --imgsz or missing from disk is resized into
+    # its split folder
+    assign_splits(entries, val_fraction)
+    jobs, moved = [], 0
+    for key in sorted(entries):
+        e = entries[key]
+        if e.get("duplicate_of"):
+            continue
+        dest, old = dest_path(out_dir, e), e.get("dest")
+        if old and (resize_all or key in unique_new):
+            if os.path.exists(old):
+                os.remove(old)
+        elif old and os.path.exists(old):
+            if old != dest:
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                os.replace(old, dest)
+                e["dest"] = dest
+                moved += 1
+            continue
+        e["dest"] = dest
+        jobs.append((os.path.join(src, key), dest))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = [ok for chunk in pool.map(_resize_chunk, [(c, imgsz) for c in _chunks(jobs, workers * 8)])
+                   for ok in chunk]
+    for (src_path, _), ok in zip(jobs, results):
+        if not ok:
+            del entries[os.path.relpath(src_path, src)]
+
+    os.makedirs(out_dir, exist_ok=True)
+    tmp = manifest_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, manifest_path)
+
+    classes = sorted({e["class"] for e in entries.values() if not e.get("duplicate_of")})
+    write_data_yml(out_dir, classes)
+
+    kept = [e for e in entries.values() if not e.get("duplicate_of")]
+    n_val = sum(1 for e in kept if e["split"] == "val")
+    print(f"Scanned {len(found)} files in {scanned - started:.1f}s, "
+          f"hashed {len(new_keys)} new in {hashed - scanned:.1f}s, "
+          f"resized {len(jobs)} in {time.perf_counter() - hashed:.1f}s, moved {moved} between splits")
+    print(f"{len(kept)} unique images ({len(kept) - n_val} train / {n_val} val), "
+          f"{len(classes)} classes, {duplicates} new duplicates skipped, {removed} removed/changed")
+    return classes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--src", required=True, help="raw PlantVillage-style image tree")
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--imgsz", type=int, default=IMGSZ)
+    parser.add_argument("--val", type=float, default=0.2, help="validation fraction per class")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    prepare(args.src, args.out, args.imgsz, args.val, args.workers)
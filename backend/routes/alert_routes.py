@@ -0,0 +1,155 @@
+from difflib import get_close_matches
+
+from flask import Blueprint, jsonify, request
+
+from db.config import get_db
+from db.price_alerts import ALERT_KINDS, create_alert, deactivate_alert, list_alerts, list_outbox
+from routes.market_routes import fetch_raw_records, snapshot_store
+
+alerts_bp = Blueprint("alerts", __name__)
+
+MAX_ALERTS_PER_FARMER = 100
+
+
+def canonical_commodity(commodity):
+    """Store the snapshot's spelling so the engine's exact key lookup matches."""
+    names = sorted({r.get("commodity", "") for r in fetch_raw_records()} - {""})
+    if not names:
+        return commodity
+    match = get_close_matches(commodity, names, n=1, cutoff=0.3)
+    return match[0] if match else None
+
+
+def _closest(name, names):
+    lookup = {}
+    for n in names:
+        # "Kozhikode(Calicut)" also answers to "kozhikode" and "calicut"
+        for alias in [n] + n.replace(")", "").split("("):
+            lookup.setdefault(alias.strip().lower(), n)
+    lookup.pop("", None)
+    if name.lower() in lookup:
+        return lookup[name.lower()]
+    # feed spellings drift ("Thirssur" for Thrissur); one fuzzy try, as geo does
+    match = get_close_matches(name.lower(), list(lookup), n=1, cutoff=0.75)
+    return lookup[match[0]] if match else None
+
+
+def canonical_place(state, district):
+    """
+    (state, district) in the snapshot's spelling, which is what the engine
+    matches on; None for a place the feed doesn't quote.
+    """
+    meta = snapshot_store().meta()
+    if not meta["states"]:
+        return state, district
+    state_used = _closest(state, meta["states"])
+    if state_used is None:
+        return None
+    if not district:
+        return state_used, ""
+    district_used = _closest(district, meta["districts"].get(state_used.lower(), []))
+    return (state_used, district_used) if district_used else None
+
+
+# ----------------------------------------------------
+# SUBSCRIPTIONS
+# ----------------------------------------------------
+@alerts_bp.route("/market/alerts", methods=["POST"])
+def create_price_alert():
+    """
+    Body: farmer_id, commodity, state, district (optional, empty = whole
+    state), kind (above | below | change) and threshold (Rs/quintal for
+    above/below, percent for change).
+    """
+    data = request.json or {}
+    farmer_id = data.get("farmer_id")
+    commodity = (data.get("commodity") or "").strip()
+    state = (data.get("state") or "").strip()
+    district = (data.get("district") or "").strip()
+    kind = data.get("kind")
+
+    if not farmer_id or not commodity or not state:
+        return jsonify({"error": "farmer_id, commodity and state are required"}), 400
+    if kind not in ALERT_KINDS:
+        return jsonify({"error": f"kind must be one of {', '.join(ALERT_KINDS)}"}), 400
+    try:
+        threshold = float(data.get("threshold"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "threshold must be a number"}), 400
+    if threshold <= 0:
+        return jsonify({"error": "threshold must be positive"}), 400
+
+    commodity_used = canonical_commodity(commodity)
+    if not commodity_used:
+        return jsonify({"message": "Commodity not found"}), 404
+    place = canonical_place(state, district)
+    if not place:
+        return jsonify({"message": "State or district not found"}), 404
+    state, district = place
+
+    conn = get_db()
+    try:
+        if len(list_alerts(conn, farmer_id)) >= MAX_ALERTS_PER_FARMER:
+            return jsonify({"error": f"At most {MAX_ALERTS_PER_FARMER} alerts per farmer"}), 409
+        alert_id = create_alert(conn, farmer_id, commodity_used, state, district, kind, threshold)
+    finally:
+        conn.close()
+
+    return jsonify({
+        "id": alert_id,
+        "commodity": commodity_used,
+        "state": state,
+        "district": district,
+        "kind": kind,
+        "threshold": threshold
+    }), 201
+
+
+@alerts_bp.route("/market/alerts", methods=["GET"])
+def get_price_alerts():
+    farmer_id = request.args.get("farmer_id", type=int)
+    if not farmer_id:
+        return jsonify({"error": "farmer_id is required"}), 400
+
+    conn = get_db()
+    try:
+        alerts = list_alerts(conn, farmer_id)
+    finally:
+        conn.close()
+    return jsonify({"alerts": alerts})
+
+
+@alerts_bp.route("/market/alerts/<int:alert_id>", methods=["DELETE"])
+def delete_price_alert(alert_id):
+    farmer_id = request.args.get("farmer_id", type=int)
+    if not farmer_id:
+        return jsonify({"error": "farmer_id is required"}), 400
+
+    conn = get_db()
+    try:
+        removed = deactivate_alert(conn, alert_id, farmer_id)
+    finally:
+        conn.close()
+
+    if not removed:
+        return jsonify({"error": "Alert not found"}), 404
+    return jsonify({"message": "Alert removed"})
+
+
+# ----------------------------------------------------
+# TRIGGERED ALERTS
+# ----------------------------------------------------
+@alerts_bp.route("/market/alerts/outbox", methods=["GET"])
+def get_triggered_alerts():
+    """Alerts the engine fired for this farmer, newest first."""
+    farmer_id = request.args.get("farmer_id", type=int)
+    if not farmer_id:
+        return jsonify({"error": "farmer_id is required"}), 400
+    limit = min(request.args.get("limit", 50, type=int), 200)
+
+    conn = get_db()
+    try:
+        events = list_outbox(conn, farmer_id, limit)
+    finally:
+        conn.close()
+    return jsonify({"events": events})
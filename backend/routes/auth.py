@@ -1,9 +1,19 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
 from db.config import get_db
+from services import passwords
 
 auth = Blueprint('auth', __name__)
 
+
+def hashing_busy():
+    return jsonify({"error": "Server busy, please retry"}), 503, {"Retry-After": "1"}
+
+
+def is_duplicate_key(exc):
+    # mysql.connector and sqlite3 both raise an IntegrityError subclass
+    return type(exc).__name__ == "IntegrityError"
+
+
 @auth.post("/register")
 def register():
     data = request.json
@@ -12,6 +22,9 @@ def register():
     password = data.get("password")
     phone = data.get("phone")
     location = data.get("location")
+    # read by /market to default to the farmer's own mandis
+    state = data.get("state")
+    district = data.get("district")
 
     if not email or not password or not name:
         return jsonify({"error": "Missing fields"}), 400
@@ -19,20 +32,29 @@ def register():
     db = get_db()
     cursor = db.cursor(dictionary=True)
 
-    # Check if email exists
-    cursor.execute("SELECT * FROM farmers WHERE email=%s", (email,))
+    # Check if email exists (cheap reject before paying for a hash)
+    cursor.execute("SELECT id FROM farmers WHERE email=%s", (email,))
     existing = cursor.fetchone()
     if existing:
         return jsonify({"error": "Email already exists"}), 409
 
-    hashed_pw = generate_password_hash(password)
-
-    cursor.execute("""
-        INSERT INTO farmers (name, email, password_hash, phone, location)
-        VALUES (%s, %s, %s, %s, %s)
-    """, (name, email, hashed_pw, phone, location))
+    try:
+        hashed_pw = passwords.hash_password(password)
+    except passwords.HashPoolBusy:
+        return hashing_busy()
 
-    db.commit()
+    try:
+        cursor.execute("""
+            INSERT INTO farmers (name, email, password_hash, phone, location, state, district)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, (name, email, hashed_pw, phone, location, state, district))
+        db.commit()
+    except Exception as e:
+        # lost the race to a concurrent register; ux_farmers_email caught it
+        if is_duplicate_key(e):
+            db.rollback()
+            return jsonify({"error": "Email already exists"}), 409
+        raise
 
     return jsonify({"message": "Farmer registered successfully!"}), 201
 
@@ -44,10 +66,22 @@ def login():
     db = get_db()
     cursor = db.cursor(dictionary=True)
 
-    cursor.execute("SELECT * FROM farmers WHERE email=%s", (data["email"],))
+    cursor.execute("SELECT id, password_hash FROM farmers WHERE email=%s", (data["email"],))
     farmer = cursor.fetchone()
+    if not farmer:
+        return jsonify({"authenticated": False}), 401
+
+    try:
+        ok, new_hash = passwords.verify_password(farmer["password_hash"], data["password"])
+    except passwords.HashPoolBusy:
+        return hashing_busy()
+
+    if not ok:
+        return jsonify({"authenticated": False}), 401
 
-    if farmer and check_password_hash(farmer["password_hash"], data["password"]):
-        return jsonify({"authenticated": True, "farmer_id": farmer["id"]}), 200
+    if new_hash:
+        # stored hash used an older method/cost; upgrade it while we have the password
+        cursor.execute("UPDATE farmers SET password_hash=%s WHERE id=%s", (new_hash, farmer["id"]))
+        db.commit()
 
-    return jsonify({"authenticated": False}), 401
+    return jsonify({"authenticated": True, "farmer_id": farmer["id"]}), 200
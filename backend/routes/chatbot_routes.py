@@ -1,8 +1,18 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 import os
+import hashlib
 import json
-import requests
-from openai import OpenAI
+import time
+import uuid
+
+from routes.market_routes import fetch_raw_records, on_snapshot_refresh
+from services import intent as local_intent
+from services import chat_tools
+from services.session_store import SessionStore, DEFAULT_DB_PATH
+from services.response_cache import ResponseCache, normalize
+from services.model_registry import register
+from services.singleflight import SingleFlight
+from services import metrics
 
 # -------------------------
 # Blueprint
@@ -14,21 +24,51 @@ chatbot_bp = Blueprint("chatbot", __name__)
 # -------------------------
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-if not OPENAI_API_KEY:
-    raise RuntimeError("OPENAI_API_KEY not found in environment variables")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+def make_client():
+    if not OPENAI_API_KEY:
+        raise RuntimeError("OPENAI_API_KEY not found in environment variables")
+
+    from openai import OpenAI
+
+    # OPENAI_BASE_URL lets the bot run against a local OpenAI-compatible
+    # server (see bench/fake_openai.py)
+    return OpenAI(
+        api_key=OPENAI_API_KEY,
+        base_url=os.getenv("OPENAI_BASE_URL") or None
+    )
+
+
+# Created on first chat message; a missing key fails that request instead
+# of the whole app import. Not required for readiness: every other route
+# works without it.
+OPENAI_CLIENT = register("openai_client", make_client, required=False)
+
+# Identical concurrent prompts (same message, same history) share one call
+OPENAI_CALLS = SingleFlight("openai")
+
+
+def complete(messages):
+    key = hashlib.sha256(json.dumps(messages, sort_keys=True).encode()).hexdigest()
+    return OPENAI_CALLS.do(
+        key,
+        lambda: OPENAI_CLIENT.get().chat.completions.create(model="gpt-4o-mini", messages=messages)
+    )
 
 # -------------------------
-# In-memory conversation storage
+# Conversation storage (shared across workers)
 # -------------------------
-USER_SESSIONS = {}
+SESSIONS = SessionStore(
+    os.getenv("CHAT_SESSION_DB", DEFAULT_DB_PATH),
+    token_budget=int(os.getenv("CHAT_HISTORY_TOKENS", "1500"))
+)
 
-def add_message(session_id, role, content):
-    if session_id not in USER_SESSIONS:
-        USER_SESSIONS[session_id] = []
-    USER_SESSIONS[session_id].append({"role": role, "content": content})
-    USER_SESSIONS[session_id] = USER_SESSIONS[session_id][-20:]
+def save_turn(session_id, user_message, ai_reply):
+    SESSIONS.append(
+        session_id,
+        {"role": "user", "content": user_message},
+        {"role": "assistant", "content": ai_reply}
+    )
 
 # -------------------------
 # Intent Detection Prompt
@@ -54,14 +94,26 @@ Return ONLY JSON:
 # Intent Detection
 # -------------------------
 def detect_intent(message):
+    """
+    Classify locally with keyword rules + the mandi gazetteer and only pay
+    for an LLM round trip when the local result is ambiguous.
+    """
     try:
-        completion = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": INTENT_SYSTEM},
-                {"role": "user", "content": message}
-            ]
-        )
+        info = local_intent.classify(message, fetch_raw_records())
+        if not info.pop("ambiguous"):
+            return info
+    except Exception as e:
+        print("Local intent error:", e)
+
+    return detect_intent_llm(message)
+
+
+def detect_intent_llm(message):
+    try:
+        completion = complete([
+            {"role": "system", "content": INTENT_SYSTEM},
+            {"role": "user", "content": message}
+        ])
 
         content = completion.choices[0].message.content
         return json.loads(content)
@@ -71,87 +123,124 @@ def detect_intent(message):
         return {"intent": "general"}
 
 # -------------------------
-# WEATHER FETCHER
+# TOOLS (in-process)
 # -------------------------
-def fetch_weather(location):
-    try:
-        r = requests.get(
-            "http://localhost:5000/weather",
-            params={"location": location},
-            timeout=5
-        )
-        return r.json()
-    except Exception as e:
-        print("Weather fetch error:", e)
-        return None
+def tool_calls(intent_info, farmer_id):
+    intent = intent_info.get("intent", "general")
+    location = intent_info.get("location", "")
+    commodity = intent_info.get("commodity", "")
+
+    calls = {}
+    if intent == "weather" and location:
+        calls["weather"] = ("weather", {"location": location})
+    elif intent == "market" and commodity:
+        calls["market"] = ("market", {
+            "commodity": commodity,
+            "location": location,
+            "farmer_id": farmer_id or None
+        })
+    return calls
+
+
+def summarize_tools(results, intent_info):
+    summaries = [
+        chat_tools.summarize(name, result, location=intent_info.get("location", ""))
+        for name, result in results.items()
+    ]
+    return "\n".join(s for s in summaries if s)
+
+
+def gather_tool_results(intent_info, farmer_id):
+    calls = tool_calls(intent_info, farmer_id)
+    if not calls:
+        return ""
+    return summarize_tools(chat_tools.run_tools(calls), intent_info)
 
 # -------------------------
-# MARKET FETCHER
+# RESPONSE CACHE
 # -------------------------
-def fetch_market(commodity, farmer_id):
-    try:
-        r = requests.get(
-            "http://localhost:5000/market",
-            params={
-                "commodity": commodity,
-                "farmer_id": farmer_id
-            },
-            timeout=5
-        )
-        return r.json()
-    except Exception as e:
-        print("Market fetch error:", e)
-        return None
+RESPONSE_CACHE = ResponseCache(
+    threshold=float(os.getenv("CHAT_CACHE_SIMILARITY", "0.85"))
+)
+
+# Replies built on mandi data die with the snapshot they came from
+on_snapshot_refresh(lambda records, diff: RESPONSE_CACHE.invalidate_tag("mandi"))
+
+CACHE_LOOKUPS = metrics.gauge(
+    "krishi_chatbot_cache_lookups", "Response cache lookups by outcome", ("outcome",)
+)
+
+
+@metrics.register_collector
+def collect_cache_stats():
+    stats = RESPONSE_CACHE.stats()
+    for outcome in ("hits", "near_hits", "misses"):
+        CACHE_LOOKUPS.set(outcome, value=stats[outcome])
+
+
+FOLLOW_UP_MAX_TOKENS = 3
+
+
+def is_cacheable(user_message, history):
+    # Short messages in an ongoing conversation ("and in Punjab?") only
+    # make sense with their history, so never share replies for them.
+    if history and len(normalize(user_message).split()) <= FOLLOW_UP_MAX_TOKENS:
+        return False
+    return True
+
+
+def is_shareable(history):
+    # A reply written with a session's history in the prompt can echo that
+    # history (names, fields, earlier answers); the cache is keyed on the
+    # message alone, so only replies from an empty history go into it.
+    return not history
+
+
+def cache_tags(turn):
+    return ("mandi",) if turn["intent"] == "market" else ()
 
 # -------------------------
-# MAIN CHATBOT ROUTE
+# PROMPT ASSEMBLY
 # -------------------------
-@chatbot_bp.route("/chatbot", methods=["POST"])
-def chatbot():
-    data = request.json or {}
+REPLY_SYSTEM = (
+    "You are KrishiSarthi AI, a friendly agricultural support assistant. "
+    "Use tool results to give correct answers. "
+    "Do NOT show raw JSON. Explain in simple farmer-friendly language."
+)
 
-    user_message = data.get("message", "")
-    farmer_id = data.get("farmer_id", "")
-    session_id = data.get("session_id", "default")
 
-    if not user_message:
-        return jsonify({"error": "Message missing"}), 400
+def parse_chat_request():
+    return chat_fields(request.json or {})
+
 
+def chat_fields(data):
+    return (
+        data.get("message", ""),
+        data.get("farmer_id", ""),
+        data.get("session_id") or uuid.uuid4().hex
+    )
+
+
+def prepare_turn(session_id, user_message, farmer_id):
     # Detect intent
-    intent_info = detect_intent(user_message)
-    intent = intent_info.get("intent", "general")
+    with metrics.stage("intent"):
+        intent_info = detect_intent(user_message)
+
+    with metrics.stage("tools"):
+        tool_result = gather_tool_results(intent_info, farmer_id)
 
-    tool_result = ""
+    with metrics.stage("db"):
+        history = SESSIONS.get(session_id)
 
-    # WEATHER
-    if intent == "weather":
-        location = intent_info.get("location", "")
-        if location:
-            weather = fetch_weather(location)
-            tool_result = f"Weather data for {location}: {weather}"
+    return build_turn(user_message, intent_info, tool_result, history)
 
-    # MARKET
-    elif intent == "market":
-        commodity = intent_info.get("commodity", "")
-        if commodity:
-            market = fetch_market(commodity, farmer_id)
-            tool_result = f"Market data for {commodity}: {market}"
 
+def build_turn(user_message, intent_info, tool_result, history):
     # Build OpenAI messages
-    messages = [
-        {
-            "role": "system",
-            "content": (
-                "You are KrishiSarthi AI, a friendly agricultural support assistant. "
-                "Use tool results to give correct answers. "
-                "Do NOT show raw JSON. Explain in simple farmer-friendly language."
-            )
-        }
-    ]
+    messages = [{"role": "system", "content": REPLY_SYSTEM}]
 
     # Add memory
-    if session_id in USER_SESSIONS:
-        messages.extend(USER_SESSIONS[session_id])
+    messages.extend(history)
 
     # Add user message
     messages.append({"role": "user", "content": user_message})
@@ -163,19 +252,144 @@ def chatbot():
             "content": f"TOOL_RESULT:\n{tool_result}"
         })
 
-    # OpenAI response
-    completion = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=messages
-    )
+    turn = {
+        "messages": messages,
+        "intent": intent_info.get("intent", "general"),
+        # replies are only shared between questions about the same crop and place
+        "subject": (intent_info.get("commodity") or "", intent_info.get("location") or ""),
+        "tool_result": tool_result,
+        "cacheable": is_cacheable(user_message, history),
+        "shareable": is_shareable(history),
+        "cached_reply": None
+    }
+    if turn["cacheable"]:
+        with metrics.stage("cache"):
+            turn["cached_reply"] = RESPONSE_CACHE.get(
+                user_message, turn["intent"], tool_result, subject=turn["subject"]
+            )
+    return turn
+
+
+def remember_reply(turn, user_message, ai_reply):
+    if turn["cacheable"] and turn["shareable"] and ai_reply:
+        RESPONSE_CACHE.put(
+            user_message, turn["intent"], turn["tool_result"], ai_reply,
+            tags=cache_tags(turn), subject=turn["subject"]
+        )
+
+
+# -------------------------
+# MAIN CHATBOT ROUTE
+# -------------------------
+@chatbot_bp.route("/chatbot", methods=["POST"])
+def chatbot():
+    user_message, farmer_id, session_id = parse_chat_request()
+
+    if not user_message:
+        return jsonify({"error": "Message missing"}), 400
 
-    ai_reply = completion.choices[0].message.content
+    turn = prepare_turn(session_id, user_message, farmer_id)
+
+    ai_reply = turn["cached_reply"]
+    if ai_reply is None:
+        # OpenAI response
+        with metrics.stage("external_api"):
+            completion = complete(turn["messages"])
+        ai_reply = completion.choices[0].message.content
+        remember_reply(turn, user_message, ai_reply)
 
     # Save memory
-    add_message(session_id, "user", user_message)
-    add_message(session_id, "assistant", ai_reply)
+    with metrics.stage("db"):
+        save_turn(session_id, user_message, ai_reply)
 
     return jsonify({
         "reply": ai_reply,
-        "session_id": session_id
+        "session_id": session_id,
+        "cached": turn["cached_reply"] is not None
     })
+
+
+# -------------------------
+# STREAMING CHATBOT ROUTE (SSE)
+# -------------------------
+TTFT = metrics.histogram(
+    "krishi_chatbot_ttft_seconds", "Time from request start to the first token"
+)
+STREAM_SECONDS = metrics.histogram(
+    "krishi_chatbot_stream_seconds", "Time from request start to the last token"
+)
+
+
+def sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+@chatbot_bp.route("/chatbot/stream", methods=["POST"])
+def chatbot_stream():
+    # TTFT counts from here: intent, tools and history are part of the wait
+    started = time.perf_counter()
+    user_message, farmer_id, session_id = parse_chat_request()
+
+    if not user_message:
+        return jsonify({"error": "Message missing"}), 400
+
+    turn = prepare_turn(session_id, user_message, farmer_id)
+
+    def generate():
+        first_token_at = None
+        parts = []
+
+        if turn["cached_reply"] is not None:
+            save_turn(session_id, user_message, turn["cached_reply"])
+            yield sse("token", {"token": turn["cached_reply"]})
+            yield sse("done", {
+                "session_id": session_id,
+                "ttft_ms": round((time.perf_counter() - started) * 1000, 1),
+                "cached": True
+            })
+            return
+
+        try:
+            stream = OPENAI_CLIENT.get().chat.completions.create(
+                model="gpt-4o-mini",
+                messages=turn["messages"],
+                stream=True
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if not token:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    TTFT.observe(value=first_token_at - started)
+                parts.append(token)
+                yield sse("token", {"token": token})
+        except Exception as e:
+            print("Chatbot stream error:", e)
+            yield sse("error", {"error": "Stream failed"})
+            return
+
+        ai_reply = "".join(parts)
+        STREAM_SECONDS.observe(value=time.perf_counter() - started)
+        remember_reply(turn, user_message, ai_reply)
+
+        # Save memory only once the full reply is known
+        save_turn(session_id, user_message, ai_reply)
+
+        ttft = (first_token_at - started) if first_token_at else None
+        yield sse("done", {
+            "session_id": session_id,
+            "ttft_ms": round(ttft * 1000, 1) if ttft is not None else None,
+            "cached": False
+        })
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
@@ -1,12 +1,22 @@
+import hashlib
+
 from flask import Blueprint, request, jsonify
-from ultralytics import YOLO
-import os
+
+from models.crops_classification.predict import classify_image
+from services import metrics
+from services.scan_pipeline import decode_image
+from services.singleflight import SingleFlight
 
 crop_classify = Blueprint("crop_classify", __name__)
 
-# Load model once when server starts
-model_path = os.path.join("backend","models", "crops_classification", "best.pt")
-model = YOLO(model_path)
+CLASSIFICATIONS = SingleFlight("crop_classify")
+
+
+def decode_and_classify(data):
+    with metrics.stage("decode"):
+        frame = decode_image(data)
+    return classify_image(frame)
+
 
 @crop_classify.route("/classify", methods=["POST"])
 def classify_crop():
@@ -14,20 +24,12 @@ def classify_crop():
         return jsonify({"error": "No image uploaded"}), 400
 
     image = request.files["image"]
-    image_path = "temp_image.jpg"
-    image.save(image_path)
-
-    results = model(image_path)
-
-    # best class index & confidence
-    index = results[0].probs.top1
-    confidence = float(results[0].probs.top1conf)
-
-    # Map index → label
-    label = results[0].names[index]
-
-    return jsonify({
-        "label": label,
-        "class_id": index,
-        "confidence": confidence
-    })
\ No newline at end of file
+    # decoded in memory: no shared temp file for concurrent requests to clobber
+    with metrics.stage("upload"):
+        data = image.read()
+    try:
+        result = CLASSIFICATIONS.do(hashlib.sha256(data).hexdigest(), decode_and_classify, data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(result)
@@ -1,70 +1,175 @@
 # backend/routes/crop_routes.py
-import os
+import io
 from flask import Blueprint, request, jsonify, current_app
-from werkzeug.utils import secure_filename
 from models.crop_disease.predict import predict_image
-from db import get_db
-from datetime import datetime
+from routes.upload_routes import upload_urls
+from services import admission, metrics
+from services.scan_pipeline import decode_image, run_scan
+from services.scan_writer import SCAN_WRITER
+from services.singleflight import SingleFlight
+from services.upload_store import UPLOAD_STORE
 
 crop = Blueprint("crop", __name__)
 
-# configure upload folder
-UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "uploads")
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Keyed by the upload's content hash: the same photo submitted again while
+# its scan is still running (double taps, client retries) waits for that run
+DETECTIONS = SingleFlight("crop_detect")
+SCANS = SingleFlight("crop_scan")
 
 ALLOWED_EXT = {"png", "jpg", "jpeg", "bmp", "webp"}
 
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXT
 
+
+def request_farmer_id():
+    """Returns (farmer_id or None, None) or (None, error response) for a non-integer id."""
+    raw = request.form.get("farmer_id") or request.form.get("farmerId") or request.form.get("farmer")
+    if not raw:
+        return None, None
+    try:
+        farmer_id = int(raw)
+    except ValueError:
+        farmer_id = 0
+    if farmer_id <= 0:
+        return None, (jsonify({"error": "farmer_id must be a positive integer"}), 400)
+    return farmer_id, None
+
+
+def wait_for_write():
+    return request.form.get("wait", "").lower() in ("1", "true", "yes")
+
+
+def validate_upload():
+    """Returns (file, None) or (None, error response)."""
+    if "image" not in request.files:
+        return None, (jsonify({"error": "No image file provided"}), 400)
+
+    file = request.files["image"]
+    if file.filename == "":
+        return None, (jsonify({"error": "Empty filename"}), 400)
+
+    if not allowed_file(file.filename):
+        return None, (jsonify({"error": "Unsupported file type"}), 400)
+    return file, None
+
+
 @crop.post("/scan-crop")
 def scan_crop():
     """
     Expects multipart/form-data with:
       - image: the uploaded file
       - farmer_id (optional): to link to DB
+      - wait (optional): "1" to write the scan row before responding
     Returns JSON with detections array and saved image path.
-    """
-    if "image" not in request.files:
-        return jsonify({"error": "No image file provided"}), 400
 
-    file = request.files["image"]
-    if file.filename == "":
-        return jsonify({"error": "Empty filename"}), 400
+    Without wait the row is queued for the batched scan writer: it shows
+    up in /farmer/<id>/scans up to KRISHI_SCAN_FLUSH_MS later and is lost
+    if the worker is killed first.
+    """
+    file, error = validate_upload()
+    if error:
+        return error
+    farmer_id, error = request_farmer_id()
+    if error:
+        return error
 
-    if not allowed_file(file.filename):
-        return jsonify({"error": "Unsupported file type"}), 400
+    # content-addressed: the same photo uploaded twice is stored once
+    with metrics.stage("upload"):
+        data = file.read()
+        stored = UPLOAD_STORE.put(io.BytesIO(data), file.filename.rsplit(".", 1)[1])
 
-    filename = secure_filename(f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{file.filename}")
-    save_path = os.path.join(UPLOAD_DIR, filename)
-    file.save(save_path)
+    # Stored objects have no extension, and ultralytics picks its loader by
+    # suffix, so the model gets the decoded array rather than the path
+    def decode_and_detect():
+        with metrics.stage("decode"):
+            image = decode_image(data)
+        return predict_image(image, conf_threshold=0.30)
 
     # Run model prediction
     try:
-        detections = predict_image(save_path, conf_threshold=0.30)
+        detections = DETECTIONS.do((stored.key, 0.30), decode_and_detect)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except admission.Overloaded:
+        raise
     except Exception as e:
         current_app.logger.exception("Model prediction failed")
         return jsonify({"error": "Model prediction failed", "detail": str(e)}), 500
 
-    # Optionally store scan in DB if farmer_id provided
-    farmer_id = request.form.get("farmer_id") or request.form.get("farmerId") or request.form.get("farmer")
+    # Optionally store scan in DB if farmer_id provided; rows are batched
+    # by the scan writer, so the request doesn't wait on a commit
+    saved = True
+    if farmer_id:
+        # For simplicity store top label (highest confidence) if exists
+        top_label = detections[0]["label"] if detections else None
+        top_conf = detections[0]["confidence"] if detections else None
+        saved = SCAN_WRITER.submit(farmer_id, stored.key, None, top_label,
+                                   float(top_conf) if top_conf else None, wait=wait_for_write())
+
+    image_url, thumbnail_url = upload_urls(stored.key)
+    body = {"image": image_url, "thumbnail": thumbnail_url, "detections": detections}
+    if not saved:
+        # do not fail entire request; return detection but warn
+        body["warning"] = "DB insert failed"
+    return jsonify(body), 200
+
+
+@crop.post("/scan")
+def scan():
+    """
+    Crop type + disease in one call. The upload is read and decoded once;
+    the classifier runs first and the disease detector is skipped for
+    confidently healthy leaves, or restricted to the detected crop's
+    classes. One crop_scans row records both results; farmer_id and
+    wait work as for /scan-crop.
+    """
+    file, error = validate_upload()
+    if error:
+        return error
+    farmer_id, error = request_farmer_id()
+    if error:
+        return error
+
+    with metrics.stage("upload"):
+        data = file.read()
+        stored = UPLOAD_STORE.put(io.BytesIO(data), file.filename.rsplit(".", 1)[1])
+
+    def decode_and_scan():
+        with metrics.stage("decode"):
+            image = decode_image(data)
+        return run_scan(image)
+
     try:
-        if farmer_id:
-            db = get_db()
-            cursor = db.cursor()
-            # For simplicity store top label (highest confidence) if exists
-            top_label = detections[0]["label"] if detections else None
-            top_conf = detections[0]["confidence"] if detections else None
-
-            cursor.execute(
-                "INSERT INTO crop_scans (farmer_id, image_path, crop_type, disease, confidence) VALUES (%s, %s, %s, %s, %s)",
-                (farmer_id, save_path, None, top_label, float(top_conf) if top_conf else None),
-            )
-            db.commit()
-            cursor.close()
+        # copied: the result is shared with any coalesced caller
+        result = dict(SCANS.do(stored.key, decode_and_scan))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except admission.Overloaded:
+        raise
     except Exception as e:
-        current_app.logger.exception("DB insert failed")
-        # do not fail entire request; return detection but warn
-        return jsonify({"warning": "DB insert failed", "detail": str(e), "detections": detections}), 200
+        current_app.logger.exception("Scan pipeline failed")
+        return jsonify({"error": "Model prediction failed", "detail": str(e)}), 500
+
+    image_url, thumbnail_url = upload_urls(stored.key)
+    if result["disease_model"] == "rejected":
+        return jsonify({
+            "status": "rejected",
+            "label": result["classification"]["label"],
+            "message": "Image is not a leaf.",
+            "image": image_url,
+        }), 200
+
+    if farmer_id:
+        # the row's confidence goes with the label it stores
+        confidence = result["disease_confidence"] if result["disease"] else result["confidence"]
+        if not SCAN_WRITER.submit(farmer_id, stored.key, result["crop_type"], result["disease"],
+                                  confidence, wait=wait_for_write()):
+            result["warning"] = "DB insert failed"
 
-    return jsonify({"image": save_path, "detections": detections}), 200
\ No newline at end of file
+    result.update({
+        "label": result["classification"]["label"],
+        "image": image_url,
+        "thumbnail": thumbnail_url,
+    })
+    return jsonify(result), 200
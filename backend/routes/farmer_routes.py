@@ -1,15 +1,25 @@
 from flask import Blueprint, jsonify, request
 from db.config import get_db
+from db.crop_scans import list_scans
+from routes.upload_routes import upload_urls
+from services.singleflight import SingleFlight, coalesced
 
 farmer_bp = Blueprint('farmer', __name__)
 
-@farmer_bp.route('/farmer/<int:farmer_id>', methods=['GET'])
-def get_farmer(farmer_id):
+FARMER_PROFILE = SingleFlight("farmer_profile")
+
+
+@coalesced(FARMER_PROFILE)
+def fetch_farmer(farmer_id):
     conn = get_db()
     cur = conn.cursor()
-
     cur.execute("SELECT id, name, email, phone, location FROM farmers WHERE id = %s", (farmer_id,))
-    row = cur.fetchone()
+    return cur.fetchone()
+
+
+@farmer_bp.route('/farmer/<int:farmer_id>', methods=['GET'])
+def get_farmer(farmer_id):
+    row = fetch_farmer(farmer_id)
 
     if not row:
         return jsonify({"error": "Farmer not found"}), 404
@@ -45,4 +55,26 @@ def update_farmer(farmer_id):
     )
     conn.commit()
 
-    return jsonify({"message": "Profile updated successfully"})
\ No newline at end of file
+    return jsonify({"message": "Profile updated successfully"})
+
+
+@farmer_bp.route('/farmer/<int:farmer_id>/scans', methods=['GET'])
+def farmer_scans(farmer_id):
+    """
+    Scan history, newest first.
+    Query: limit (default 20, max 100), cursor (next_cursor from the previous page)
+    """
+    limit = request.args.get("limit", 20, type=int)
+    cursor = request.args.get("cursor") or None
+
+    conn = get_db()
+    try:
+        scans, next_cursor = list_scans(conn, farmer_id, limit, cursor)
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+    finally:
+        conn.close()
+
+    for scan in scans:
+        scan["image_url"], scan["thumbnail_url"] = upload_urls(scan["image_path"])
+    return jsonify({"scans": scans, "next_cursor": next_cursor})
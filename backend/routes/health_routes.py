@@ -0,0 +1,16 @@
+from flask import Blueprint, jsonify
+
+from services.model_registry import readiness
+
+health_bp = Blueprint("health", __name__)
+
+
+@health_bp.route("/health/live", methods=["GET"])
+def live():
+    return jsonify({"status": "ok"})
+
+
+@health_bp.route("/health/ready", methods=["GET"])
+def ready():
+    is_ready, models = readiness()
+    return jsonify({"ready": is_ready, "models": models}), 200 if is_ready else 503
@@ -1,12 +1,11 @@
 import os
 import tempfile
 from flask import Blueprint, request, jsonify
-from ultralytics import YOLO
 
-intrusion_bp = Blueprint("intrusion", __name__)
+from routes.wildlife_routes import ADMISSION, MODEL
+from services import admission
 
-# Load model ONCE
-model = YOLO("yolov8n.pt")
+intrusion_bp = Blueprint("intrusion", __name__)
 
 ANIMAL_CLASSES = {
     "cow", "sheep", "horse", "dog", "cat",
@@ -15,6 +14,7 @@ ANIMAL_CLASSES = {
 }
 
 @intrusion_bp.route("/intrusion/detect", methods=["POST"])
+@admission.lane("alert")
 def detect_intrusion():
     if "image" not in request.files:
         return jsonify({"error": "No image uploaded"}), 400
@@ -25,8 +25,11 @@ def detect_intrusion():
         image.save(tmp.name)
         img_path = tmp.name
 
-    results = model(img_path, conf=0.4)
-    os.remove(img_path)
+    try:
+        with ADMISSION.slot():
+            results = MODEL.get()(img_path, conf=0.4)
+    finally:
+        os.remove(img_path)
 
     detected = []
     for r in results:
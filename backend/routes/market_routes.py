@@ -1,12 +1,15 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 import requests
 from difflib import get_close_matches
-from datetime import datetime
-from collections import defaultdict
-from functools import lru_cache
+import math
 import os
+import threading
+import time
 
 from db.config import get_db   # fetch farmer location
+from services import geo, mandi_export, mandi_store, mandi_stream, metrics
+from services.alerts import ALERT_ENGINE
+from services.singleflight import SingleFlight, coalesced
 
 market_bp = Blueprint("market", __name__)
 
@@ -14,29 +17,120 @@ market_bp = Blueprint("market", __name__)
 # CONFIG
 # ----------------------------------------------------
 API_KEY = os.getenv("DATA_GOV_API_KEY")
-if not API_KEY:
-    raise RuntimeError("DATA_GOV_API_KEY not found in enviroment variables")
-BASE_URL = "https://api.data.gov.in/resource/9ef84268-d588-465a-a308-a864a43d0070"
+BASE_URL = os.getenv(
+    "DATA_GOV_BASE_URL",
+    "https://api.data.gov.in/resource/9ef84268-d588-465a-a308-a864a43d0070"
+)
+
+
+# A cold cache under a burst of /market requests makes one upstream call
+MANDI_FETCH = SingleFlight("mandi_fetch")
+FARMER_LOCATION = SingleFlight("farmer_location")
 
 
 # ----------------------------------------------------
 # FETCH + CACHE RAW RECORDS
 # ----------------------------------------------------
-@lru_cache(maxsize=1)
-def fetch_raw_records(limit=1200):
+MANDI_LIMIT = 1200
+
+# limit -> records of the snapshot being served; replaced only by refresh_raw_records()
+_RAW_RECORDS = {}
+
+
+def fetch_raw_records(limit=MANDI_LIMIT):
+    records = _RAW_RECORDS.get(limit)
+    if records is None:
+        records = _RAW_RECORDS.setdefault(limit, download_raw_records(limit))
+    return records
+
+
+@coalesced(MANDI_FETCH)
+def download_raw_records(limit=MANDI_LIMIT):
+    if not API_KEY:
+        print("DATA_GOV_API_KEY not found in environment variables")
+        return []
     url = f"{BASE_URL}?api-key={API_KEY}&format=json&limit={limit}"
     try:
-        r = requests.get(url, timeout=10)
-        r.raise_for_status()
-        data = r.json()
-        return data.get("records", [])
+        # parsed as it downloads; the body is never held whole
+        with requests.get(url, timeout=10, stream=True) as r:
+            r.raise_for_status()
+            return list(mandi_stream.iter_records(r.iter_content(mandi_stream.CHUNK_SIZE)))
     except Exception:
         return []
 
 
+def snapshot_store():
+    """The mandi store synced to the current snapshot (groups, meta, latest quotes)."""
+    return mandi_store.sync(fetch_raw_records())
+
+
+# Callbacks run as fn(records, diff) after every snapshot refresh, once
+# mandi_store.STORE holds the records; diff is the SnapshotDiff just applied.
+SNAPSHOT_LISTENERS = []
+
+
+def on_snapshot_refresh(fn):
+    SNAPSHOT_LISTENERS.append(fn)
+    return fn
+
+
+# Move only the changed markets in the spatial index, now rather than on the next /market/nearby
+on_snapshot_refresh(lambda records, diff: geo.get_market_index(mandi_store.STORE))
+on_snapshot_refresh(lambda records, diff: ALERT_ENGINE.on_diff(diff))
+
+# Background refresh so the alert engine sees every new snapshot (0 = only
+# when refresh_raw_records() is called explicitly)
+SNAPSHOT_REFRESH_SECONDS = float(os.getenv("KRISHI_MANDI_REFRESH_SECONDS", "1800"))
+_refresher_pid = None
+_refresher_lock = threading.Lock()
+
+
+def _refresh_loop():
+    # the snapshot this process already serves is the baseline for the first diff
+    snapshot_store()
+    while True:
+        time.sleep(SNAPSHOT_REFRESH_SECONDS)
+        try:
+            refresh_raw_records()
+        except Exception as e:
+            print("Snapshot refresh failed:", e)
+
+
+@market_bp.before_app_request
+def ensure_snapshot_refresher():
+    global _refresher_pid
+    # gunicorn workers fork after preload; each needs its own thread
+    if SNAPSHOT_REFRESH_SECONDS <= 0 or _refresher_pid == os.getpid():
+        return
+    with _refresher_lock:
+        if _refresher_pid != os.getpid():
+            threading.Thread(target=_refresh_loop, name="mandi-refresh", daemon=True).start()
+            _refresher_pid = os.getpid()
+
+
+def refresh_raw_records():
+    records = download_raw_records()
+
+    def publish():
+        _RAW_RECORDS[MANDI_LIMIT] = records
+
+    # an empty snapshot is a failed fetch, not every market closing: keep serving the held one
+    diff = mandi_store.replace(records, publish)
+    if diff is None:
+        return records
+    print(f"Mandi snapshot {diff.seq}: +{len(diff.inserted)} ~{len(diff.updated)} -{len(diff.removed)}")
+    for fn in SNAPSHOT_LISTENERS:
+        try:
+            fn(records, diff)
+        except Exception as e:
+            print("Snapshot listener error:", e)
+    return records
+
+
 # ----------------------------------------------------
 # FETCH FARMER LOCATION FROM DB
 # ----------------------------------------------------
+@coalesced(FARMER_LOCATION)
 def get_farmer_location(farmer_id):
     try:
         db = get_db()
@@ -55,40 +149,7 @@ def get_farmer_location(farmer_id):
 # ----------------------------------------------------
 @market_bp.route("/market/meta", methods=["GET"])
 def get_market_metadata():
-    records = fetch_raw_records()
-
-    states = sorted({r.get("state", "").strip() for r in records if r.get("state")})
-    commodities = sorted({r.get("commodity", "").strip() for r in records if r.get("commodity")})
-
-    districts_by_state = defaultdict(set)
-    markets_by_state = defaultdict(lambda: defaultdict(set))
-
-    for r in records:
-        state = r.get("state", "").strip()
-        district = r.get("district", "").strip()
-        market = r.get("market", "").strip()
-
-        if state and district and market:
-            districts_by_state[state].add(district)
-            markets_by_state[state][district].add(market)
-
-    districts = {}
-    markets = {}
-
-    for state, dist_set in districts_by_state.items():
-        key = state.lower()
-        districts[key] = sorted(dist_set)
-        markets[key] = {
-            dist: sorted(mkts)
-            for dist, mkts in markets_by_state[state].items()
-        }
-
-    return jsonify({
-        "states": states,
-        "commodities": commodities,
-        "districts": districts,
-        "markets": markets
-    })
+    return jsonify(snapshot_store().meta())
 
 
 # ----------------------------------------------------
@@ -115,95 +176,72 @@ def compute_trend(prices):
 # ----------------------------------------------------
 # MAIN MARKET SEARCH
 # ----------------------------------------------------
-@market_bp.route("/market", methods=["GET"])
-def get_market_data():
-    commodity = request.args.get("commodity", "").strip()
-    passed_state = request.args.get("state", "").strip()
-    passed_district = request.args.get("district", "").strip()
-    farmer_id = request.args.get("farmer_id")
-
+def query_market(commodity, state="", district="", farmer_id=None):
+    """
+    Market lookup shared by the /market route and the chatbot tools.
+    Returns (payload, status) so callers can decide how to serialize it.
+    """
+    commodity = (commodity or "").strip()
     if not commodity:
-        return jsonify({"error": "commodity is required"}), 400
+        return {"error": "commodity is required"}, 400
 
     # Auto-location
     auto_state = auto_district = ""
     if farmer_id:
-        loc = get_farmer_location(farmer_id)
+        with metrics.stage("db"):
+            loc = get_farmer_location(farmer_id)
         if loc:
             auto_state = loc.get("state", "")
             auto_district = loc.get("district", "")
 
-    state = passed_state or auto_state
-    district = passed_district or auto_district
+    state = (state or "").strip() or auto_state
+    district = (district or "").strip() or auto_district
 
     if not state:
-        return jsonify({"error": "State not provided"}), 400
+        return {"error": "State not provided"}, 400
 
-    records = fetch_raw_records()
+    with metrics.stage("external_api"):
+        records = fetch_raw_records()
     if not records:
-        return jsonify({"error": "No mandi data available"}), 502
+        return {"error": "No mandi data available"}, 502
+
+    return market_payload(mandi_store.sync(records), commodity, state, district)
+
 
-    # Filter by state
-    state_records = [
-        r for r in records
-        if r.get("state", "").lower() == state.lower()
-    ]
+def market_payload(store, commodity, state, district):
+    """The /market body for an already resolved state/district; shared with the async routes."""
+    started = time.perf_counter()
 
-    if not state_records:
-        return jsonify({"message": f"No data for state {state}"}), 404
+    # Fuzzy commodity match among the state's commodities
+    all_commodities = store.commodities_in(state)
+    if not all_commodities:
+        return {"message": f"No data for state {state}"}, 404
 
-    # Fuzzy commodity match
-    all_commodities = sorted({r.get("commodity", "") for r in state_records})
     best_match = get_close_matches(commodity, all_commodities, n=1, cutoff=0.3)
 
     if not best_match:
-        return jsonify({"message": "Commodity not found"}), 404
+        return {"message": "Commodity not found"}, 404
 
     commodity_used = best_match[0]
 
-    filtered = [
-        r for r in state_records
-        if r.get("commodity") == commodity_used
-    ]
+    # Already formatted and sorted by arrival date
+    markets = store.group(state, commodity_used)["markets"]
 
     # Fuzzy district match
     district_used = None
     if district:
-        all_districts = sorted({r.get("district", "") for r in filtered})
+        all_districts = sorted({m["district"] for m in markets})
         match = get_close_matches(district, all_districts, n=1, cutoff=0.3)
         if match:
             district_used = match[0]
-            filtered = [
-                r for r in filtered
-                if r.get("district") == district_used
-            ]
-
-    # Format markets
-    markets = []
-    for r in filtered:
-        try:
-            markets.append({
-                "market": r.get("market", ""),
-                "district": r.get("district", ""),
-                "variety": r.get("variety", ""),
-                "arrival_date": r.get("arrival_date", ""),
-                "min_price": int(r.get("min_price") or 0),
-                "max_price": int(r.get("max_price") or 0),
-                "modal_price": int(r.get("modal_price") or 0)
-            })
-        except ValueError:
-            continue
-
-    # Sort by date
-    markets.sort(
-        key=lambda x: datetime.strptime(x["arrival_date"], "%d/%m/%Y")
-        if x["arrival_date"] else datetime.min
-    )
+            markets = [m for m in markets if m["district"] == district_used]
 
     modal_prices = [m["modal_price"] for m in markets if m["modal_price"] > 0]
     trend, change_percent = compute_trend(modal_prices)
 
-    return jsonify({
+    metrics.observe_stage("postprocess", time.perf_counter() - started)
+
+    return {
         "commodity": commodity_used,
         "state": state,
         "district": district_used or district,
@@ -211,7 +249,18 @@ def get_market_data():
         "trend": trend,
         "change_percent": change_percent,
         "markets": markets
-    })
+    }, 200
+
+
+@market_bp.route("/market", methods=["GET"])
+def get_market_data():
+    payload, status = query_market(
+        request.args.get("commodity", ""),
+        state=request.args.get("state", ""),
+        district=request.args.get("district", ""),
+        farmer_id=request.args.get("farmer_id")
+    )
+    return jsonify(payload), status
 
 
 # ----------------------------------------------------
@@ -225,37 +274,138 @@ def get_market_history():
     if not commodity or not state:
         return jsonify({"error": "commodity and state required"}), 400
 
-    records = fetch_raw_records()
-
-    rows = [
-        r for r in records
-        if r.get("state", "").lower() == state.lower()
-        and r.get("commodity", "").lower() == commodity.lower()
-    ]
-
-    if not rows:
+    formatted = snapshot_store().group(state, commodity)["history"]
+    if not formatted:
         return jsonify({"error": "No history available"}), 404
 
-    series = []
-    for r in rows:
-        try:
-            dt = datetime.strptime(r["arrival_date"], "%d/%m/%Y")
-            series.append({
-                "date": dt,
-                "price": int(r.get("modal_price") or 0)
-            })
-        except Exception:
-            continue
-
-    series.sort(key=lambda x: x["date"])
-
-    formatted = [
-        {"date": x["date"].strftime("%d %b"), "price": x["price"]}
-        for x in series
-    ]
-
     return jsonify({
         "commodity": commodity,
         "state": state,
         "history": formatted
     })
+
+
+# ----------------------------------------------------
+# BEST PRICE NEAR ME
+# ----------------------------------------------------
+NEARBY_RADIUS_KM = float(os.getenv("KRISHI_NEARBY_RADIUS_KM", "100"))
+NEARBY_MAX_RADIUS_KM = 1000
+NEARBY_MAX_K = 50
+# Rs per quintal per km of haulage, subtracted from the modal price
+NEARBY_COST_PER_KM = float(os.getenv("KRISHI_NEARBY_COST_PER_KM", "1.0"))
+
+
+def _float_arg(args, name, default, low=-math.inf, high=math.inf):
+    """float(args[name]) or default; ValueError for nan/inf or outside [low, high]."""
+    value = args.get(name)
+    if value in (None, ""):
+        return default
+    value = float(value)
+    if not math.isfinite(value) or not low <= value <= high:
+        raise ValueError(f"{name} out of range")
+    return value
+
+
+def parse_nearby_args(args):
+    """Query args -> (params, None) or (None, (error payload, status))."""
+    commodity = args.get("commodity", "").strip()
+    if not commodity:
+        return None, ({"error": "commodity is required"}, 400)
+
+    try:
+        params = {
+            "commodity": commodity,
+            "lat": _float_arg(args, "lat", None, -90.0, 90.0),
+            "lon": _float_arg(args, "lon", None, -180.0, 180.0),
+            "radius_km": min(_float_arg(args, "radius_km", NEARBY_RADIUS_KM), NEARBY_MAX_RADIUS_KM),
+            "cost_per_km": max(_float_arg(args, "cost_per_km", NEARBY_COST_PER_KM), 0.0),
+            "k": min(int(args.get("k") or 10), NEARBY_MAX_K),
+        }
+    except ValueError:
+        return None, ({"error": "lat, lon, radius_km, cost_per_km and k must be finite numbers, "
+                                "with lat in [-90, 90] and lon in [-180, 180]"}, 400)
+    if params["radius_km"] <= 0 or params["k"] <= 0:
+        return None, ({"error": "radius_km and k must be positive"}, 400)
+    return params, None
+
+
+def nearby_origin(params, state, district):
+    """Fill lat/lon/origin from the district centroid unless coordinates were given; False if unknown."""
+    params["origin"] = "coordinates"
+    if params["lat"] is not None and params["lon"] is not None:
+        return True
+    where = geo.get_centroids().locate(state, district) if state else None
+    if where is None:
+        return False
+    params["lat"], params["lon"], params["origin"] = where
+    return True
+
+
+NO_ORIGIN = {"error": "Provide lat/lon, state/district or a farmer_id with a known location"}
+
+
+def nearby_payload(store, params):
+    started = time.perf_counter()
+    index = geo.get_market_index(store)
+    commodity_used = index.match_commodity(params["commodity"])
+    if not commodity_used:
+        return {"message": "Commodity not found"}, 404
+
+    markets = index.nearby(commodity_used, params["lat"], params["lon"],
+                           params["radius_km"], params["k"], params["cost_per_km"])
+    metrics.observe_stage("postprocess", time.perf_counter() - started)
+
+    return {
+        "commodity": commodity_used,
+        "origin": {"lat": params["lat"], "lon": params["lon"], "source": params["origin"]},
+        "radius_km": params["radius_km"],
+        "cost_per_km": params["cost_per_km"],
+        "count": len(markets),
+        "markets": markets
+    }, 200
+
+
+@market_bp.route("/market/nearby", methods=["GET"])
+def get_market_nearby():
+    params, error = parse_nearby_args(request.args)
+    if error:
+        return jsonify(error[0]), error[1]
+
+    # Origin: explicit coordinates, else the farmer's (or given) district centroid
+    state = request.args.get("state", "").strip()
+    district = request.args.get("district", "").strip()
+    farmer_id = request.args.get("farmer_id")
+    if farmer_id and not state and (params["lat"] is None or params["lon"] is None):
+        with metrics.stage("db"):
+            loc = get_farmer_location(farmer_id) or {}
+        state, district = loc.get("state") or "", loc.get("district") or ""
+    if not nearby_origin(params, state, district):
+        return jsonify(NO_ORIGIN), 400
+
+    with metrics.stage("external_api"):
+        records = fetch_raw_records()
+    if not records:
+        return jsonify({"error": "No mandi data available"}), 502
+
+    payload, status = nearby_payload(mandi_store.sync(records), params)
+    return jsonify(payload), status
+
+
+# ----------------------------------------------------
+# BULK EXPORT (CSV / NDJSON / ARROW)
+# ----------------------------------------------------
+@market_bp.route("/market/export", methods=["GET"])
+def export_market_data():
+    params, error = mandi_export.parse_args(request.args, request.headers.get("Accept-Encoding", ""))
+    if error:
+        return jsonify(error[0]), error[1]
+
+    with metrics.stage("external_api"):
+        records = fetch_raw_records()
+    if not records:
+        return jsonify({"error": "No mandi data available"}), 502
+
+    # the records list is never mutated, so a refresh mid-download can't tear the export
+    store = mandi_store.sync(records)
+    mimetype, headers = mandi_export.response_headers(params, store.seq)
+    return Response(mandi_export.stream(records, params), mimetype=mimetype, headers=headers)
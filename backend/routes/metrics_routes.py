@@ -0,0 +1,53 @@
+import math
+import os
+from flask import Blueprint, Response, jsonify, request
+
+from services import metrics, model_registry
+
+metrics_bp = Blueprint("metrics", __name__)
+
+MODEL_WARM = metrics.gauge(
+    "krishi_model_warm", "1 if the model is loaded in every worker, else 0", ("model",),
+    multiprocess="min"
+)
+MODEL_LOAD_SECONDS = metrics.gauge(
+    "krishi_model_load_seconds", "Time the last successful load took", ("model",)
+)
+
+
+@metrics.register_collector
+def collect_model_state():
+    for name, model in model_registry.REGISTRY.items():
+        MODEL_WARM.set(name, value=1 if model.state == model_registry.WARM else 0)
+        if model.load_seconds is not None:
+            MODEL_LOAD_SECONDS.set(name, value=model.load_seconds)
+
+# The profiler exposes stack traces, so it is opt-in
+PROFILER_ENABLED = os.getenv("KRISHI_ENABLE_PROFILER") == "1"
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+@metrics_bp.route("/debug/profiler", methods=["GET", "POST", "DELETE"])
+def profiler():
+    if not PROFILER_ENABLED:
+        return jsonify({"error": "Profiler disabled"}), 404
+
+    if request.method == "POST":
+        try:
+            interval_ms = float(request.args.get("interval_ms", 10))
+        except ValueError:
+            return jsonify({"error": "interval_ms must be a number"}), 400
+        if not math.isfinite(interval_ms):
+            return jsonify({"error": "interval_ms must be a number"}), 400
+        started = metrics.PROFILER.start(interval_ms)
+        return jsonify({"started": started, "running": metrics.PROFILER.running})
+
+    if request.method == "DELETE":
+        metrics.PROFILER.stop()
+
+    top = request.args.get("top", type=int)
+    return jsonify(metrics.PROFILER.report(top))
@@ -1,24 +1,26 @@
 # backend/routes/soil_routes.py
 import os
 import io
+import hashlib
 import json
 import tempfile
 from flask import Blueprint, request, jsonify
 from werkzeug.utils import secure_filename
-import torch
-import torch.nn as nn
-import torchvision.transforms as T
-from torchvision import models
 from PIL import Image
 import numpy as np
 
+from services import admission, metrics
+from services.model_registry import register
+from services.singleflight import SingleFlight
+
 soil_bp = Blueprint("soil", __name__)
 
 MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "models", "soil")
 CLASS_WEIGHTS_PATH = os.path.join(MODEL_DIR, "soil_class.pth")
 REG_WEIGHTS_PATH = os.path.join(MODEL_DIR, "npk_reg.pth")
-
-DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+# Written by training/soil_features.py next to the regressor; without it the
+# colour embedding stays at its random init
+COLOR_EMB_PATH = os.path.join(MODEL_DIR, "color_emb.pth")
 
 # Your 7 classes
 SOIL_CLASSES = ["Alluvial", "Black", "Loamy", "Red", "Sandy", "Clay", "Laterite"]
@@ -26,16 +28,24 @@ SOIL_CLASSES = ["Alluvial", "Black", "Loamy", "Red", "Sandy", "Clay", "Laterite"
 SOIL_COLOR_CATS = ["brown", "light-brown", "red", "yellow", "black", "gray"]
 
 IMG_SIZE = 224
-transform = T.Compose([
-    T.Resize((IMG_SIZE, IMG_SIZE)),
-    T.CenterCrop(IMG_SIZE),
-    T.ToTensor(),
-    T.Normalize(mean=[0.485, 0.456, 0.406],
-                std=[0.229, 0.224, 0.225]),
-])
 
 
-def build_backbone_and_heads(num_classes=len(SOIL_CLASSES), feature_dim=1280):
+def build_transform():
+    import torchvision.transforms as T
+    return T.Compose([
+        T.Resize((IMG_SIZE, IMG_SIZE)),
+        T.CenterCrop(IMG_SIZE),
+        T.ToTensor(),
+        T.Normalize(mean=[0.485, 0.456, 0.406],
+                    std=[0.229, 0.224, 0.225]),
+    ])
+
+
+def build_backbone_and_heads(device, num_classes=len(SOIL_CLASSES), feature_dim=1280):
+    import torch
+    import torch.nn as nn
+    from torchvision import models
+
     eff = models.efficientnet_b0(pretrained=True)
 
     class FeatureExtractor(nn.Module):
@@ -72,21 +82,20 @@ def build_backbone_and_heads(num_classes=len(SOIL_CLASSES), feature_dim=1280):
 
     color_embedding = nn.Embedding(len(SOIL_COLOR_CATS), color_emb_dim)
 
-    return (backbone.to(DEVICE),
-            classifier.to(DEVICE),
-            regressor.to(DEVICE),
-            color_embedding.to(DEVICE))
+    return (backbone.to(device),
+            classifier.to(device),
+            regressor.to(device),
+            color_embedding.to(device))
 
 
-BACKBONE, CLASSIFIER, REGRESSOR, COLOR_EMB = build_backbone_and_heads()
+def try_load_weights(classifier, regressor, device, color_emb=None):
+    import torch
 
-
-def try_load_weights():
     loaded = False
     try:
         if os.path.exists(CLASS_WEIGHTS_PATH):
-            CLASSIFIER.load_state_dict(torch.load(CLASS_WEIGHTS_PATH,
-                                                  map_location=DEVICE))
+            classifier.load_state_dict(torch.load(CLASS_WEIGHTS_PATH,
+                                                  map_location=device))
             print("Loaded classifier:", CLASS_WEIGHTS_PATH)
             loaded = True
     except Exception as e:
@@ -94,25 +103,63 @@ def try_load_weights():
 
     try:
         if os.path.exists(REG_WEIGHTS_PATH):
-            REGRESSOR.load_state_dict(torch.load(REG_WEIGHTS_PATH,
-                                                 map_location=DEVICE))
+            regressor.load_state_dict(torch.load(REG_WEIGHTS_PATH,
+                                                 map_location=device))
             print("Loaded regressor:", REG_WEIGHTS_PATH)
             loaded = True
     except Exception as e:
         print("Failed regressor load:", e)
 
+    try:
+        if color_emb is not None and os.path.exists(COLOR_EMB_PATH):
+            color_emb.load_state_dict(torch.load(COLOR_EMB_PATH,
+                                                 map_location=device))
+            print("Loaded colour embedding:", COLOR_EMB_PATH)
+    except Exception as e:
+        print("Failed colour embedding load:", e)
+
     return loaded
 
 
-WEIGHTS_LOADED = try_load_weights()
+def load_soil_models():
+    import torch
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    backbone, classifier, regressor, color_emb = build_backbone_and_heads(device)
+    for module in (backbone, classifier, regressor, color_emb):
+        module.eval()
 
+    return {
+        "device": device,
+        "transform": build_transform(),
+        "backbone": backbone,
+        "classifier": classifier,
+        "regressor": regressor,
+        "color_emb": color_emb,
+        "weights_loaded": try_load_weights(classifier, regressor, device, color_emb),
+    }
+
+
+# torch/torchvision and the EfficientNet download happen on first use
+SOIL_MODELS = register("soil", load_soil_models)
+ADMISSION = admission.limiter("soil")
+
+# Same photo + same pH/colour while a run is in flight -> one model pass
+ANALYSES = SingleFlight("soil")
 
-def pil_from_file_storage(file):
-    return Image.open(io.BytesIO(file.read())).convert("RGB")
 
+def pil_from_bytes(data):
+    return Image.open(io.BytesIO(data)).convert("RGB")
 
-def preprocess_image(pil_img):
-    return transform(pil_img).unsqueeze(0).to(DEVICE)
+
+def analyze_bytes(data, ph_value, color):
+    with metrics.stage("decode"):
+        pil_img = pil_from_bytes(data)
+    return run_models_on_image(pil_img, ph_value, color)
+
+
+def preprocess_image(pil_img, soil):
+    return soil["transform"](pil_img).unsqueeze(0).to(soil["device"])
 
 
 def soil_color_to_index(color):
@@ -150,24 +197,30 @@ def heuristic_estimate(pil_img, ph_value, color):
 
 
 def run_models_on_image(pil_img, ph_value, color):
-    if not WEIGHTS_LOADED:
+    soil = SOIL_MODELS.get()
+    if not soil["weights_loaded"]:
         return heuristic_estimate(pil_img, ph_value, color)
 
-    x = preprocess_image(pil_img)
+    import torch
 
-    with torch.no_grad():
-        feat = BACKBONE(x)
+    device = soil["device"]
+    with ADMISSION.slot():
+        with metrics.stage("preprocess"):
+            x = preprocess_image(pil_img, soil)
 
-        logits = CLASSIFIER(feat)
-        soil_idx = torch.argmax(torch.softmax(logits, dim=1)).item()
-        soil_type = SOIL_CLASSES[soil_idx]
+        with torch.no_grad(), metrics.stage("model_forward"):
+            feat = soil["backbone"](x)
 
-        color_idx = torch.tensor([soil_color_to_index(color)], dtype=torch.long, device=DEVICE)
-        ph_t = torch.tensor([[ph_value]], dtype=torch.float32, device=DEVICE)
-        color_vec = COLOR_EMB(color_idx)
+            logits = soil["classifier"](feat)
+            soil_idx = torch.argmax(torch.softmax(logits, dim=1)).item()
+            soil_type = SOIL_CLASSES[soil_idx]
 
-        reg_in = torch.cat([feat, ph_t, color_vec], dim=1)
-        N, P, K, moisture, organic = REGRESSOR(reg_in).cpu().numpy()[0]
+            color_idx = torch.tensor([soil_color_to_index(color)], dtype=torch.long, device=device)
+            ph_t = torch.tensor([[ph_value]], dtype=torch.float32, device=device)
+            color_vec = soil["color_emb"](color_idx)
+
+            reg_in = torch.cat([feat, ph_t, color_vec], dim=1)
+            N, P, K, moisture, organic = soil["regressor"](reg_in).cpu().numpy()[0]
 
     return {
         "soil_type": soil_type,
@@ -197,18 +250,22 @@ def analyze_soil():
 
         ph_value = float(ph_raw)
 
-        pil_img = pil_from_file_storage(img_file)
-
-        result = run_models_on_image(pil_img, ph_value, color)
+        data = img_file.read()
+        key = (hashlib.sha256(data).hexdigest(), ph_value, color)
+        # copied: the result is shared with any coalesced caller
+        result = dict(ANALYSES.do(key, analyze_bytes, data, ph_value, color))
 
-        result.update({
-            "fertilizers": generate_fertilizer_suggestions(result["npk"], result["soil_type"]),
-            "recommended_crops": recommend_crops(result["soil_type"]),
-            "model_loaded": WEIGHTS_LOADED
-        })
+        with metrics.stage("postprocess"):
+            result.update({
+                "fertilizers": generate_fertilizer_suggestions(result["npk"], result["soil_type"]),
+                "recommended_crops": recommend_crops(result["soil_type"]),
+                "model_loaded": SOIL_MODELS.get()["weights_loaded"]
+            })
 
         return jsonify(result)
 
+    except admission.Overloaded:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -0,0 +1,45 @@
+from flask import Blueprint, abort, send_file, url_for
+import os
+
+from services.upload_store import UPLOAD_STORE
+
+uploads_bp = Blueprint("uploads", __name__)
+
+# Keys are content hashes, so a URL's bytes never change
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def upload_urls(key):
+    """Absolute image/thumbnail URLs for a stored key (None for legacy paths)."""
+    if not key or not UPLOAD_STORE.valid_key(key):
+        return None, None
+    return (url_for("uploads.get_upload", key=key, _external=True),
+            url_for("uploads.get_thumbnail", key=key, _external=True))
+
+
+def _send(path, mimetype=None):
+    if not os.path.exists(path):
+        abort(404)
+    return send_file(path, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE, conditional=True)
+
+
+@uploads_bp.route("/uploads/<path:key>", methods=["GET"])
+def get_upload(key):
+    if not UPLOAD_STORE.valid_key(key):
+        abort(404)
+    path = UPLOAD_STORE.path_for(key)
+    if not os.path.exists(path):
+        abort(404)
+    # keys carry no extension; the type comes from the bytes
+    return _send(path, UPLOAD_STORE.mimetype_for(key))
+
+
+@uploads_bp.route("/uploads/<path:key>/thumb", methods=["GET"])
+def get_thumbnail(key):
+    if not UPLOAD_STORE.valid_key(key):
+        abort(404)
+    thumb = UPLOAD_STORE.thumb_for(key)
+    # thumbnail generation can fail (PIL missing, odd format); fall back to the original
+    if os.path.exists(thumb):
+        return _send(thumb, "image/jpeg")
+    return get_upload(key)
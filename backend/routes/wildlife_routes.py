@@ -1,13 +1,31 @@
+import hashlib
 import os
+import shutil
 import tempfile
+import time
 from flask import Blueprint, request, jsonify
-from ultralytics import YOLO
+
+from services import admission, metrics
+from services.model_registry import register
+from services.singleflight import SingleFlight
 
 wildlife_bp = Blueprint("wildlife", __name__)
 
-# Load YOLOv8 COCO model (animals included)
+# YOLOv8 COCO model (animals included)
 MODEL_PATH = "yolov8n.pt"   # auto-downloads if not present
-model = YOLO(MODEL_PATH)
+
+
+def load_model():
+    from ultralytics import YOLO
+    return YOLO(MODEL_PATH)
+
+
+# Shared with intrusion_routes; loaded on first use
+MODEL = register("yolov8n_coco", load_model)
+ADMISSION = admission.limiter("yolov8n_coco")
+
+# A burst of identical camera-trap frames shares one YOLO pass
+DETECTIONS = SingleFlight("wildlife")
 
 # Animal threat mapping
 THREAT_MAP = {
@@ -23,20 +41,23 @@ THREAT_MAP = {
     "deer": "High"
 }
 
-@wildlife_bp.route("/wildlife/detect", methods=["POST"])
-def detect_wildlife():
-    if "image" not in request.files:
-        return jsonify({"error": "No image uploaded"}), 400
-
-    file = request.files["image"]
-
+def detect_animals(data, filename):
     # Save image temporarily
-    temp_dir = tempfile.mkdtemp()
-    img_path = os.path.join(temp_dir, file.filename)
-    file.save(img_path)
+    with metrics.stage("upload"):
+        temp_dir = tempfile.mkdtemp()
+        img_path = os.path.join(temp_dir, os.path.basename(filename) or "upload.jpg")
+        with open(img_path, "wb") as f:
+            f.write(data)
 
-    # Run YOLO
-    results = model(img_path, conf=0.4)[0]
+    try:
+        # Run YOLO
+        model = MODEL.get()
+        with ADMISSION.slot():
+            started = time.perf_counter()
+            results = model(img_path, conf=0.4)[0]
+            metrics.record_yolo_speed(results, time.perf_counter() - started)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
 
     animals = []
     for box in results.boxes:
@@ -48,6 +69,18 @@ def detect_wildlife():
             "name": label,
             "confidence": round(conf, 2)
         })
+    return animals
+
+
+@wildlife_bp.route("/wildlife/detect", methods=["POST"])
+@admission.lane("alert")
+def detect_wildlife():
+    if "image" not in request.files:
+        return jsonify({"error": "No image uploaded"}), 400
+
+    file = request.files["image"]
+    data = file.read()
+    animals = DETECTIONS.do(hashlib.sha256(data).hexdigest(), detect_animals, data, file.filename)
 
     if not animals:
         return jsonify({
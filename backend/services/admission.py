@@ -0,0 +1,288 @@
+# backend/services/admission.py
+#
+# Per-model admission control. Each model gets a fixed number of concurrent
+# forward passes and a small bounded wait queue ordered by priority lane.
+# A request that can't start in time to finish inside its deadline is turned
+# away at once with 503 + Retry-After instead of queueing behind work it
+# will never get to, so the requests that are admitted keep a bounded latency.
+import functools
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+
+from flask import g, has_request_context, jsonify, request
+
+from services import metrics
+
+# Lower index = served first. Wildlife/intrusion alerts jump the queue;
+# "history" is for re-running models over past scans while browsing them.
+LANES = ("alert", "interactive", "history")
+DEFAULT_LANE = "interactive"
+LANE_HEADER = "X-Krishi-Lane"
+
+# Client-supplied remaining budget; never longer than the server default
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+DEFAULT_DEADLINE_MS = float(os.getenv("KRISHI_ADMIT_DEADLINE_MS", "10000"))
+DEFAULT_CONCURRENCY = int(os.getenv("KRISHI_ADMIT_CONCURRENCY", "2"))
+DEFAULT_QUEUE = int(os.getenv("KRISHI_ADMIT_QUEUE", "16"))
+
+# weight of the newest sample in the per-model service time average
+EWMA_ALPHA = 0.2
+
+QUEUE_DEPTH = metrics.gauge(
+    "krishi_admission_queue_depth", "Requests waiting for a model slot", ("model", "lane"),
+    multiprocess="sum"
+)
+RUNNING = metrics.gauge(
+    "krishi_admission_running", "Forward passes currently holding a model slot", ("model",),
+    multiprocess="sum"
+)
+SERVICE_SECONDS = metrics.gauge(
+    "krishi_admission_service_seconds", "Moving average of time spent holding a model slot", ("model",)
+)
+ADMITTED = metrics.counter(
+    "krishi_admission_admitted_total", "Requests granted a model slot", ("model", "lane")
+)
+REJECTED = metrics.counter(
+    "krishi_admission_rejected_total",
+    "Requests shed with 503 (deadline, queue_full, evicted, timeout)",
+    ("model", "lane", "reason"),
+)
+WAIT = metrics.histogram(
+    "krishi_admission_wait_seconds", "Time spent queued before getting a model slot", ("model", "lane")
+)
+
+
+class Overloaded(Exception):
+    """Raised instead of running the model; rendered as 503 with Retry-After."""
+
+    def __init__(self, model, reason, retry_after):
+        super().__init__(f"{model} overloaded ({reason})")
+        self.model = model
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("lane", "event", "granted", "dropped")
+
+    def __init__(self, lane):
+        self.lane = lane
+        self.event = threading.Event()
+        self.granted = False
+        self.dropped = None     # reason, once removed without a slot
+
+
+class Limiter:
+    def __init__(self, name, concurrency, queue_size):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.queue_size = max(0, queue_size)
+        self.running = 0
+        self.service_seconds = None
+        self._heap = []          # (lane index, seq, waiter); dropped waiters are skipped lazily
+        self._queued = [0] * len(LANES)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    # ----------------------------------------------------
+    # ESTIMATES (call with the lock held)
+    # ----------------------------------------------------
+    def _start_delay(self, ahead):
+        # every slot is busy: the ahead + 1'th release hands us one
+        if self.service_seconds is None:
+            return 0.0
+        return self.service_seconds * (ahead + 1) / self.concurrency
+
+    def _retry_after(self):
+        backlog = self.running + sum(self._queued)
+        return max(1, math.ceil((self.service_seconds or 1.0) * backlog / self.concurrency))
+
+    def _reject(self, lane, reason):
+        REJECTED.inc(self.name, LANES[lane], reason)
+        return Overloaded(self.name, reason, self._retry_after())
+
+    def _publish(self):
+        for i, lane in enumerate(LANES):
+            QUEUE_DEPTH.set(self.name, lane, value=self._queued[i])
+        RUNNING.set(self.name, value=self.running)
+
+    # ----------------------------------------------------
+    # ACQUIRE / RELEASE
+    # ----------------------------------------------------
+    def acquire(self, lane, deadline):
+        """Blocks until a slot is ours; raises Overloaded. deadline is a perf_counter time."""
+        now = time.perf_counter()
+        with self._lock:
+            if self.running < self.concurrency and not sum(self._queued):
+                self.running += 1
+                self._publish()
+                ADMITTED.inc(self.name, LANES[lane])
+                return
+
+            service = self.service_seconds or 0.0
+            ahead = sum(self._queued[:lane + 1])
+            if now + self._start_delay(ahead) + service > deadline:
+                raise self._reject(lane, "deadline")
+
+            if sum(self._queued) >= self.queue_size:
+                victim = self._lowest_waiter()
+                if victim is None or victim.lane <= lane:
+                    raise self._reject(lane, "queue_full")
+                # a more urgent request takes the place of the least urgent one
+                self._drop(victim, "evicted")
+
+            waiter = _Waiter(lane)
+            heapq.heappush(self._heap, (lane, next(self._seq), waiter))
+            self._queued[lane] += 1
+            self._publish()
+
+        # the latest start that can still finish in time
+        waiter.event.wait(max(0.0, deadline - service - now))
+
+        with self._lock:
+            if not waiter.granted and waiter.dropped is None:
+                self._drop(waiter, "timeout")
+            WAIT.observe(self.name, LANES[lane], value=time.perf_counter() - now)
+            if waiter.granted:
+                ADMITTED.inc(self.name, LANES[lane])
+                return
+            raise Overloaded(self.name, waiter.dropped, self._retry_after())
+
+    def release(self, seconds):
+        with self._lock:
+            if self.service_seconds is None:
+                self.service_seconds = seconds
+            else:
+                self.service_seconds += EWMA_ALPHA * (seconds - self.service_seconds)
+            SERVICE_SECONDS.set(self.name, value=round(self.service_seconds, 4))
+
+            # hand the slot straight to the most urgent waiter
+            while self._heap:
+                _, _, waiter = heapq.heappop(self._heap)
+                if waiter.dropped is None:
+                    self._queued[waiter.lane] -= 1
+                    waiter.granted = True
+                    waiter.event.set()
+                    break
+            else:
+                self.running -= 1
+            self._publish()
+
+    def _lowest_waiter(self):
+        live = [entry for entry in self._heap if entry[2].dropped is None]
+        return max(live, key=lambda entry: (entry[0], entry[1]))[2] if live else None
+
+    def _drop(self, waiter, reason):
+        waiter.dropped = reason
+        self._queued[waiter.lane] -= 1
+        REJECTED.inc(self.name, LANES[waiter.lane], reason)
+        waiter.event.set()
+        if len(self._heap) > 4 * (self.queue_size + 1):
+            self._heap = [entry for entry in self._heap if entry[2].dropped is None]
+            heapq.heapify(self._heap)
+
+    def slot(self, lane=None, deadline=None):
+        """with limiter.slot(): model(...) -- lane/deadline default to the current request's."""
+        return _Slot(
+            self,
+            LANES.index(lane) if lane is not None else current_lane(),
+            deadline if deadline is not None else current_deadline(),
+        )
+
+
+class _Slot:
+    __slots__ = ("limiter", "lane", "deadline", "started")
+
+    def __init__(self, limiter, lane, deadline):
+        self.limiter = limiter
+        self.lane = lane
+        self.deadline = deadline
+        self.started = None
+
+    def __enter__(self):
+        self.limiter.acquire(self.lane, self.deadline)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.limiter.release(time.perf_counter() - self.started)
+        return False
+
+
+LIMITERS = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def limiter(name):
+    """
+    The limiter for a model registry name. Sized by
+    KRISHI_ADMIT_<NAME>_CONCURRENCY / _QUEUE, falling back to the globals.
+    """
+    with _LIMITERS_LOCK:
+        if name not in LIMITERS:
+            env = "KRISHI_ADMIT_" + name.upper()
+            LIMITERS[name] = Limiter(
+                name,
+                int(os.getenv(env + "_CONCURRENCY", DEFAULT_CONCURRENCY)),
+                int(os.getenv(env + "_QUEUE", DEFAULT_QUEUE)),
+            )
+        return LIMITERS[name]
+
+
+# ----------------------------------------------------
+# REQUEST CONTEXT
+# ----------------------------------------------------
+def lane(name):
+    """Route decorator: the most urgent lane the route's model calls run in."""
+    index = LANES.index(name)
+
+    def wrap(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            g.admission_lane = index
+            return fn(*args, **kwargs)
+        return wrapper
+    return wrap
+
+
+def current_lane():
+    if not has_request_context():
+        return LANES.index(DEFAULT_LANE)
+    index = g.get("admission_lane", LANES.index(DEFAULT_LANE))
+    # clients may only demote themselves (e.g. history re-scans), never promote
+    requested = request.headers.get(LANE_HEADER, "").strip().lower()
+    if requested in LANES:
+        index = max(index, LANES.index(requested))
+    return index
+
+
+def current_deadline():
+    budget = DEFAULT_DEADLINE_MS
+    started = time.perf_counter()
+    if has_request_context():
+        started = g.get("metrics_started", started)
+        try:
+            budget = min(budget, float(request.headers.get(DEADLINE_HEADER, budget)))
+        except ValueError:
+            pass
+    return started + budget / 1000
+
+
+def overloaded_response(e):
+    response = jsonify({
+        "error": "Server busy, retry shortly",
+        "model": e.model,
+        "reason": e.reason,
+        "retry_after": e.retry_after,
+    })
+    response.status_code = 503
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response
+
+
+def init_app(app):
+    app.register_error_handler(Overloaded, overloaded_response)
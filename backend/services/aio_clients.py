@@ -0,0 +1,62 @@
+# backend/services/aio_clients.py
+#
+# Long-lived asyncio clients for the ASGI routes (pooled HTTP, the async
+# OpenAI client, the async DB pool). Each is created on first use and bound
+# to the event loop it was made on, so one per uvicorn worker; close_all()
+# runs from the app's after_serving hook.
+import asyncio
+import inspect
+import os
+
+# Sockets, not threads, bound upstream concurrency now
+HTTP_CONNECTIONS = int(os.getenv("KRISHI_ASYNC_HTTP_CONNECTIONS", "100"))
+HTTP_KEEPALIVE = int(os.getenv("KRISHI_ASYNC_HTTP_KEEPALIVE", "20"))
+HTTP_TIMEOUT = float(os.getenv("KRISHI_ASYNC_HTTP_TIMEOUT", "10"))
+
+_state = {"loop": None, "resources": {}, "lock": None}
+
+
+async def get(name, factory):
+    """The loop's instance of name, building it with factory() (sync or async) the first time."""
+    loop = asyncio.get_running_loop()
+    if _state["loop"] is not loop:
+        # clients hold sockets/futures of the loop that made them
+        _state.update(loop=loop, resources={}, lock=asyncio.Lock())
+    resources = _state["resources"]
+    if name not in resources:
+        async with _state["lock"]:
+            if name not in resources:
+                value = factory()
+                if inspect.isawaitable(value):
+                    value = await value
+                resources[name] = value
+    return resources[name]
+
+
+def make_http_client():
+    import httpx
+
+    return httpx.AsyncClient(
+        timeout=HTTP_TIMEOUT,
+        limits=httpx.Limits(max_connections=HTTP_CONNECTIONS, max_keepalive_connections=HTTP_KEEPALIVE),
+    )
+
+
+async def http():
+    return await get("http", make_http_client)
+
+
+async def close_all():
+    resources, _state["resources"] = _state["resources"], {}
+    for name, value in resources.items():
+        try:
+            if hasattr(value, "aclose"):
+                await value.aclose()
+            elif hasattr(value, "close"):
+                result = value.close()
+                if inspect.isawaitable(result):
+                    await result
+            if hasattr(value, "wait_closed"):
+                await value.wait_closed()
+        except Exception as e:
+            print(f"Closing {name} failed:", e)
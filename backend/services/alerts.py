@@ -0,0 +1,232 @@
+# backend/services/alerts.py
+#
+# Price alert engine. Runs once per mandi snapshot refresh on the store's
+# snapshot diff and only looks the (commodity, market) quotes that moved up
+# in an interval index of subscriptions.
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from db.config import get_db
+from db.price_alerts import active_owners, insert_outbox, iter_active_alerts
+from services import metrics
+from services.geo import norm
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: every process evaluates
+    fcntl = None
+
+LOCK_PATH = os.getenv("KRISHI_ALERT_LOCK", os.path.join(tempfile.gettempdir(), "krishi-alerts.lock"))
+# Reload every subscription (dropping deleted ones) every N refreshes;
+# in between only alerts created since the last load are read
+FULL_RELOAD_EVERY = int(os.getenv("KRISHI_ALERT_FULL_RELOAD", "48"))
+
+FIRED = metrics.counter(
+    "krishi_price_alerts_fired_total", "Price alerts written to the outbox", ("kind",)
+)
+SUBSCRIPTIONS = metrics.gauge(
+    "krishi_price_alert_subscriptions", "Alert subscriptions held in the matching index",
+    multiprocess="max"
+)
+
+
+def quote_moves(diff):
+    """[(market_key, old_price, new_price, arrival_date)] for markets whose latest price moved."""
+    return [
+        (mk, old[0], new[0], new[1])
+        for mk, old, new in diff.quote_changes
+        # a market appearing or disappearing is not a price move
+        if old is not None and new is not None and old[0] != new[0]
+    ]
+
+
+# ----------------------------------------------------
+# INTERVAL INDEX
+# ----------------------------------------------------
+class _Bucket:
+    """Sorted thresholds (with alert ids alongside) per alert kind for one (commodity, state, district)."""
+
+    __slots__ = ("thresholds", "ids", "pending")
+
+    def __init__(self):
+        self.thresholds = {}
+        self.ids = {}
+        self.pending = {}
+
+    def finalize(self):
+        for kind, items in self.pending.items():
+            items.extend(zip(self.thresholds.get(kind, ()), self.ids.get(kind, ())))
+            items.sort()
+            self.thresholds[kind] = array("d", (t for t, _ in items))
+            self.ids[kind] = array("q", (i for _, i in items))
+        self.pending = {}
+
+
+class AlertIndex:
+    """
+    A move from old to new price fires:
+      above   thresholds t with old <  t <= new
+      below   thresholds t with new <= t <  old
+      change  thresholds t <= |new - old| / old * 100
+    Each is a bisect on that bucket's sorted thresholds, so the cost is
+    O(log n + fired) per changed quote however many alerts exist.
+    Alerts with an empty district watch every market in the state.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.size = 0
+
+    def add_many(self, rows):
+        """rows: (alert_id, commodity, state, district, kind, threshold)."""
+        touched, keys = set(), {}
+        for alert_id, commodity, state, district, kind, threshold in rows:
+            key = keys.get((commodity, state, district))
+            if key is None:
+                key = keys[(commodity, state, district)] = (norm(commodity), norm(state), norm(district))
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = _Bucket()
+            bucket.pending.setdefault(kind, []).append((float(threshold), alert_id))
+            touched.add(key)
+            self.size += 1
+        for key in touched:
+            self.buckets[key].finalize()
+
+    def match(self, changes):
+        """Returns {alert_id: (kind, change)} keeping the largest move per alert."""
+        fired = {}
+        for change in changes:
+            (commodity, state, district, _), old, new, _ = change
+            c, s = norm(commodity), norm(state)
+            pct = abs(new - old) / old * 100
+            for key in ((c, s, norm(district)), (c, s, "")):
+                bucket = self.buckets.get(key)
+                if bucket is None:
+                    continue
+                hits = []
+                if new > old and "above" in bucket.thresholds:
+                    th = bucket.thresholds["above"]
+                    hits.append(("above", bucket.ids["above"][bisect_right(th, old):bisect_right(th, new)]))
+                if new < old and "below" in bucket.thresholds:
+                    th = bucket.thresholds["below"]
+                    hits.append(("below", bucket.ids["below"][bisect_left(th, new):bisect_left(th, old)]))
+                if "change" in bucket.thresholds:
+                    th = bucket.thresholds["change"]
+                    hits.append(("change", bucket.ids["change"][:bisect_right(th, pct)]))
+
+                for kind, ids in hits:
+                    for alert_id in ids:
+                        seen = fired.get(alert_id)
+                        if seen is None or pct > seen[2]:
+                            fired[alert_id] = (kind, change, pct)
+        return {alert_id: (kind, change) for alert_id, (kind, change, _) in fired.items()}
+
+
+# ----------------------------------------------------
+# ENGINE
+# ----------------------------------------------------
+def event_key(change):
+    (commodity, state, district, market), _, new, arrival = change
+    raw = "|".join((commodity, state, district, market, arrival, str(new)))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+class AlertEngine:
+    """
+    Registered as a snapshot listener. Only one process evaluates (flock on
+    LOCK_PATH, held for the life of the process). Every worker holds the
+    same store, so a follower that takes over diffs from its own baseline.
+    """
+
+    def __init__(self, db_factory=get_db, lock_path=LOCK_PATH):
+        self.db_factory = db_factory
+        self.lock_path = lock_path
+        self.index = AlertIndex()
+        self.loaded_upto = 0
+        self.refreshes = 0
+        self.seen_seq = 0
+        self._leader = None
+        self._lock_file = None
+        self._lock = threading.Lock()
+
+    def _is_leader(self):
+        if self._leader is None:
+            if fcntl is None:
+                self._leader = True
+            else:
+                self._lock_file = open(self.lock_path, "w")
+                try:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    self._leader = True
+                except OSError:
+                    self._lock_file.close()
+                    self._lock_file = None
+        return bool(self._leader)
+
+    def _sync(self, db):
+        if self.refreshes % FULL_RELOAD_EVERY == 0:
+            self.index, self.loaded_upto = AlertIndex(), 0
+        rows = list(iter_active_alerts(db, self.loaded_upto))
+        if rows:
+            self.index.add_many(rows)
+            self.loaded_upto = rows[-1][0]
+        self.refreshes += 1
+        SUBSCRIPTIONS.set(value=self.index.size)
+
+    def evaluate(self, changes, db):
+        """Match quote moves and write the outbox; returns rows written."""
+        if not changes:
+            return 0
+
+        self._sync(db)
+        started = time.perf_counter()
+        fired = self.index.match(changes)
+        metrics.observe_stage("alert_match", time.perf_counter() - started, route="snapshot_refresh")
+        if not fired:
+            return 0
+
+        # deleted since the last full reload -> dropped here
+        owners = active_owners(db, fired)
+        rows = []
+        for alert_id, (kind, change) in fired.items():
+            if alert_id not in owners:
+                continue
+            (commodity, state, district, market), old, new, arrival = change
+            rows.append({
+                "alert_id": alert_id,
+                "farmer_id": owners[alert_id],
+                "event_key": event_key(change),
+                "commodity": commodity,
+                "state": state,
+                "district": district,
+                "market": market,
+                "arrival_date": arrival,
+                "old_price": old,
+                "new_price": new,
+                "change_pct": round((new - old) / old * 100, 2),
+            })
+            FIRED.inc(kind)
+        return insert_outbox(db, rows)
+
+    def on_diff(self, diff):
+        if diff is None or diff.seq <= self.seen_seq or not self._is_leader():
+            return 0
+        with self._lock:
+            self.seen_seq = diff.seq
+            changes = quote_moves(diff)
+            if not changes:
+                return 0
+            db = self.db_factory()
+            try:
+                return self.evaluate(changes, db)
+            finally:
+                db.close()
+
+
+ALERT_ENGINE = AlertEngine()
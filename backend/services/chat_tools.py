@@ -0,0 +1,137 @@
+# backend/services/chat_tools.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from statistics import median
+
+from routes.market_routes import query_market, snapshot_store
+
+# Shared pool so tool calls never block on request-thread creation and the
+# number of in-flight upstream lookups stays bounded.
+TOOL_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="chat-tool")
+
+DEFAULT_TIMEOUT = 5
+MAX_MARKETS_IN_SUMMARY = 5
+
+
+# ----------------------------------------------------
+# LOCATION RESOLUTION
+# ----------------------------------------------------
+def resolve_location(location):
+    """
+    Map a free-text place (state or district) to (state, district)
+    using the current mandi snapshot.
+    """
+    return snapshot_store().resolve_place(location)
+
+
+# ----------------------------------------------------
+# TOOLS (plain python, return dicts)
+# ----------------------------------------------------
+def market_tool(commodity, location="", farmer_id=None):
+    state, district = resolve_location(location)
+    payload, status = query_market(
+        commodity, state=state, district=district, farmer_id=farmer_id
+    )
+    return payload if status == 200 else None
+
+
+def weather_tool(location):
+    # No weather provider lives in this backend yet (/weather is not
+    # served), so there is nothing to call in-process.
+    return None
+
+
+TOOLS = {
+    "market": market_tool,
+    "weather": weather_tool,
+}
+
+
+# ----------------------------------------------------
+# CONCURRENT EXECUTION
+# ----------------------------------------------------
+def run_tools(calls, timeout=DEFAULT_TIMEOUT):
+    """
+    Run independent tool calls concurrently.
+
+    calls: {name: (tool_name, kwargs)} or {name: (tool_name, kwargs, timeout)}
+    Returns {name: result}; a tool that fails or overruns its timeout
+    yields None instead of holding up the reply.
+    """
+    futures = {}
+    for name, call in calls.items():
+        tool_name, kwargs = call[0], call[1]
+        tool_timeout = call[2] if len(call) > 2 else timeout
+        futures[name] = (TOOL_POOL.submit(TOOLS[tool_name], **kwargs), tool_timeout)
+
+    results = {}
+    for name, (future, tool_timeout) in futures.items():
+        try:
+            results[name] = future.result(timeout=tool_timeout)
+        except FutureTimeout:
+            print(f"Tool {name} timed out after {tool_timeout}s")
+            future.cancel()
+            results[name] = None
+        except Exception as e:
+            print(f"Tool {name} error:", e)
+            results[name] = None
+    return results
+
+
+async def run_tools_async(calls, tools, timeout=DEFAULT_TIMEOUT):
+    """run_tools for the ASGI chatbot: tools maps names to coroutine functions."""
+    async def run_one(name, call):
+        tool_timeout = call[2] if len(call) > 2 else timeout
+        try:
+            return await asyncio.wait_for(tools[call[0]](**call[1]), tool_timeout)
+        except asyncio.TimeoutError:
+            print(f"Tool {name} timed out after {tool_timeout}s")
+        except Exception as e:
+            print(f"Tool {name} error:", e)
+        return None
+
+    names = list(calls)
+    results = await asyncio.gather(*(run_one(name, calls[name]) for name in names))
+    return dict(zip(names, results))
+
+
+# ----------------------------------------------------
+# PROMPT SUMMARIES
+# ----------------------------------------------------
+def summarize_market(payload):
+    markets = [m for m in payload.get("markets", []) if m.get("modal_price")]
+    where = payload.get("state", "")
+    if payload.get("district"):
+        where = f"{payload['district']}, {where}"
+
+    if not markets:
+        return f"No recent mandi prices for {payload.get('commodity')} in {where}."
+
+    modals = [m["modal_price"] for m in markets]
+    lines = [
+        f"{payload.get('commodity')} in {where}: {len(markets)} mandi reports, "
+        f"modal Rs {min(modals)}-{max(modals)}/quintal (median Rs {int(median(modals))}), "
+        f"trend {payload.get('trend')} ({payload.get('change_percent')}%)."
+    ]
+
+    best = sorted(markets, key=lambda m: m["modal_price"], reverse=True)
+    for m in best[:MAX_MARKETS_IN_SUMMARY]:
+        lines.append(
+            f"- {m['market']} ({m['district']}): modal Rs {m['modal_price']}, "
+            f"range {m['min_price']}-{m['max_price']}, {m['arrival_date']}"
+        )
+    return "\n".join(lines)
+
+
+def summarize_weather(location, payload):
+    return f"Weather for {location}: {payload}"
+
+
+def summarize(name, result, **context):
+    if result is None:
+        return ""
+    if name == "market":
+        return summarize_market(result)
+    if name == "weather":
+        return summarize_weather(context.get("location", ""), result)
+    return str(result)
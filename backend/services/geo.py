@@ -0,0 +1,250 @@
+# backend/services/geo.py
+#
+# Where the mandis are: a bundled centroid gazetteer (state / district /
+# optional market rows in mandi_centroids.csv) and a grid index over the
+# markets of the current snapshot for "best price near me" lookups.
+import csv
+import functools
+import heapq
+import math
+import os
+import threading
+from difflib import get_close_matches
+
+CENTROIDS_PATH = os.getenv(
+    "KRISHI_CENTROIDS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "mandi_centroids.csv"),
+)
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEG_LAT = 111.2
+# 0.5 deg cells are ~55 km tall: a 100 km radius touches at most 5x5 cells
+CELL_DEG = 0.5
+# resolved names kept per gazetteer; the feed has ~3.5k distinct markets, and
+# /market/nearby passes client-typed state/district through here as well
+LOCATE_CACHE_SIZE = 8192
+
+
+def norm(name):
+    return "".join(c for c in (name or "").lower() if c.isalnum())
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+# ----------------------------------------------------
+# CENTROID GAZETTEER
+# ----------------------------------------------------
+class CentroidGazetteer:
+    """
+    Resolves (state, district, market) to a lat/lon, falling back from the
+    market row to the district centroid to the state centroid. District
+    names in the mandi feed are spelled inconsistently ("Thirssur",
+    "Mau(Maunathbhanjan)"), so unmatched districts get one fuzzy try
+    within their state.
+    """
+
+    def __init__(self, path=CENTROIDS_PATH):
+        self.states = {}
+        self.districts = {}
+        self.markets = {}
+        # LRU-bounded, so arbitrary client strings can't grow it without limit
+        self._cached_locate = functools.lru_cache(maxsize=LOCATE_CACHE_SIZE)(self._locate)
+
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                point = (float(row["lat"]), float(row["lon"]))
+                state, district, market = norm(row["state"]), norm(row["district"]), norm(row["market"])
+                if market:
+                    self.markets[(state, district, market)] = point
+                elif district:
+                    self.districts.setdefault(state, {})[district] = point
+                else:
+                    self.states[state] = point
+
+    def locate(self, state, district="", market=""):
+        """Returns (lat, lon, precision) or None; precision is market/district/state."""
+        return self._cached_locate(norm(state), norm(district), norm(market))
+
+    def _locate(self, state, district, market):
+        if market and (state, district, market) in self.markets:
+            return self.markets[(state, district, market)] + ("market",)
+
+        known = self.districts.get(state, {})
+        if district:
+            if district in known:
+                return known[district] + ("district",)
+            match = get_close_matches(district, list(known), n=1, cutoff=0.75)
+            if match:
+                return known[match[0]] + ("district",)
+
+        if state in self.states:
+            return self.states[state] + ("state",)
+        return None
+
+
+_CENTROIDS = None
+_CENTROIDS_LOCK = threading.Lock()
+
+
+def get_centroids():
+    global _CENTROIDS
+    if _CENTROIDS is None:
+        with _CENTROIDS_LOCK:
+            if _CENTROIDS is None:
+                _CENTROIDS = CentroidGazetteer()
+    return _CENTROIDS
+
+
+# ----------------------------------------------------
+# GRID INDEX
+# ----------------------------------------------------
+class GridIndex:
+    """Points bucketed into CELL_DEG squares; a radius query only visits overlapping cells."""
+
+    def __init__(self, cell_deg=CELL_DEG):
+        self.cell_deg = cell_deg
+        self.cells = {}
+        self.size = 0
+
+    def _cell(self, lat, lon):
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg))
+
+    def add(self, lat, lon, item):
+        self.cells.setdefault(self._cell(lat, lon), []).append((lat, lon, item))
+        self.size += 1
+
+    def remove(self, lat, lon, item):
+        cell = self._cell(lat, lon)
+        # replace the cell list instead of mutating it under a running query
+        self.cells[cell] = [p for p in self.cells.get(cell, ()) if p[2] is not item]
+        if not self.cells[cell]:
+            del self.cells[cell]
+        self.size -= 1
+
+    def within(self, lat, lon, radius_km):
+        """Yields (distance_km, item) for every point within radius_km."""
+        dlat = radius_km / KM_PER_DEG_LAT
+        # longitude degrees shrink towards the poles; India stays well below 40N
+        dlon = radius_km / (KM_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.1))
+        row0, col0 = self._cell(lat - dlat, lon - dlon)
+        row1, col1 = self._cell(lat + dlat, lon + dlon)
+
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                for plat, plon, item in self.cells.get((row, col), ()):
+                    distance = haversine_km(lat, lon, plat, plon)
+                    if distance <= radius_km:
+                        yield distance, item
+
+
+# ----------------------------------------------------
+# MARKET INDEX (FOLLOWS THE MANDI STORE)
+# ----------------------------------------------------
+class MarketIndex:
+    """
+    Latest quote per (commodity, market), with one grid per commodity so a
+    lookup never touches markets that don't trade it. Built once from the
+    mandi store, then kept current from each snapshot diff's quote changes.
+    """
+
+    def __init__(self, quotes, seq=0, centroids=None):
+        self.centroids = centroids or get_centroids()
+        self.grids = {}
+        self.points = {}
+        self.unlocated = 0
+        self.seq = seq
+        for mk, quote in quotes.items():
+            self._put(mk, quote)
+        self._refresh_names()
+
+    def _put(self, mk, quote):
+        commodity, state, district, market = mk
+        if not commodity.strip() or not market.strip():
+            return
+        where = self.centroids.locate(state, district, market)
+        if where is None:
+            self.unlocated += 1
+            return
+        lat, lon, precision = where
+        modal, arrival, r = quote
+        item = {
+            "market": market,
+            "district": district,
+            "state": state,
+            "variety": r.get("variety", ""),
+            "arrival_date": arrival,
+            "min_price": int(r.get("min_price") or 0),
+            "max_price": int(r.get("max_price") or 0),
+            "modal_price": modal,
+            "location_precision": precision,
+        }
+        self.grids.setdefault(commodity, GridIndex()).add(lat, lon, item)
+        self.points[mk] = (lat, lon, item)
+
+    def _drop(self, mk):
+        point = self.points.pop(mk, None)
+        if point is None:
+            return
+        grid = self.grids[mk[0]]
+        grid.remove(*point)
+        if not grid.size:
+            del self.grids[mk[0]]
+
+    def _refresh_names(self):
+        self.commodities = sorted(self.grids)
+        self._by_lower = {c.lower(): c for c in self.commodities}
+
+    def apply(self, quote_changes, seq):
+        """Move / add / drop only the markets whose latest quote changed."""
+        for mk, _, new in quote_changes:
+            self._drop(mk)
+            if new is not None:
+                self._put(mk, new)
+        self._refresh_names()
+        self.seq = seq
+
+    def match_commodity(self, commodity):
+        if commodity.lower() in self._by_lower:
+            return self._by_lower[commodity.lower()]
+        match = get_close_matches(commodity, self.commodities, n=1, cutoff=0.3)
+        return match[0] if match else None
+
+    def nearby(self, commodity, lat, lon, radius_km, k, cost_per_km):
+        """Top-k quotes within radius_km ranked by modal price minus cost_per_km * distance."""
+        grid = self.grids.get(commodity)
+        if grid is None:
+            return []
+
+        def ranked():
+            for distance, quote in grid.within(lat, lon, radius_km):
+                yield round(quote["modal_price"] - cost_per_km * distance, 2), distance, quote
+
+        best = heapq.nlargest(k, ranked(), key=lambda t: (t[0], -t[1]))
+        return [
+            dict(quote, distance_km=round(distance, 1), net_price=net)
+            for net, distance, quote in best
+        ]
+
+
+_INDEX = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_market_index(store):
+    """The spatial index for the store's current snapshot, following its diffs."""
+    global _INDEX
+    if _INDEX is not None and _INDEX.seq == store.seq:
+        return _INDEX
+    with _INDEX_LOCK:
+        diff = store.last_diff
+        if _INDEX is not None and diff is not None and diff.seq == _INDEX.seq + 1:
+            _INDEX.apply(diff.quote_changes, diff.seq)
+        elif _INDEX is None or _INDEX.seq != store.seq:
+            # first build, or more than one refresh since the last lookup
+            _INDEX = MarketIndex(store.latest_quotes(), store.seq)
+    return _INDEX
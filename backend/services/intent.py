@@ -0,0 +1,172 @@
+# backend/services/intent.py
+import re
+import threading
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+MAX_ALIAS_TOKENS = 4
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or "").lower())
+
+
+def singular(token):
+    if len(token) > 4 and token.endswith("oes"):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+# ----------------------------------------------------
+# KEYWORD RULES
+# ----------------------------------------------------
+WEATHER_WORDS = {singular(w) for w in {
+    "weather", "forecast", "rain", "rains", "raining", "rainfall", "monsoon",
+    "temperature", "temp", "humidity", "humid", "wind", "windy", "storm",
+    "cyclone", "hailstorm", "hail", "drizzle", "sunny", "cloudy", "clouds",
+    "frost", "heatwave", "climate", "mausam", "barish", "baarish",
+}}
+
+MARKET_WORDS = {singular(w) for w in {
+    "price", "prices", "rate", "rates", "mandi", "mandis", "market", "markets",
+    "sell", "selling", "bhav", "bhaav", "daam", "cost", "msp", "quintal",
+    "rs", "rupees", "modal", "trend", "apmc",
+}}
+
+# Words that should never be treated as a place or crop even if the
+# snapshot happens to contain a district/commodity with that name
+# (e.g. the "Mandi" district in Himachal Pradesh).
+STOP_ALIASES = MARKET_WORDS | WEATHER_WORDS | {
+    "today", "tomorrow", "best", "what", "when", "where", "which", "how",
+    "green", "red", "dry", "raw", "local", "whole", "common", "leaves",
+    "oil", "seed", "dal", "south", "north", "west", "east", "district",
+    "the", "and", "for", "in", "of", "to", "is",
+}
+
+
+def name_aliases(name):
+    """
+    Expand a mandi name into lookup aliases.
+    "Arhar (Tur/Red Gram)(Whole)" -> "arhar tur red gram whole",
+    "arhar", "tur", "red gram", "whole" (single stop words are dropped later).
+    """
+    aliases = {" ".join(tokenize(name))}
+    head = name.split("(", 1)[0]
+    aliases.add(" ".join(tokenize(head)))
+    for inner in re.findall(r"\(([^)]*)\)", name):
+        for part in re.split(r"[/,]", inner):
+            aliases.add(" ".join(tokenize(part)))
+    return {a for a in aliases if a}
+
+
+# ----------------------------------------------------
+# GAZETTEER (BUILT FROM MANDI SNAPSHOT)
+# ----------------------------------------------------
+class Gazetteer:
+    def __init__(self, records):
+        self.commodities = {}
+        self.locations = {}
+
+        for r in records:
+            commodity = (r.get("commodity") or "").strip()
+            if commodity:
+                self._add(self.commodities, commodity)
+            for field in ("state", "district"):
+                place = (r.get(field) or "").strip()
+                if place:
+                    self._add(self.locations, place)
+
+    @staticmethod
+    def _add(table, name):
+        for alias in name_aliases(name):
+            tokens = alias.split()
+            if len(tokens) == 1 and (tokens[0] in STOP_ALIASES or len(tokens[0]) < 3):
+                continue
+            key = " ".join(singular(t) for t in tokens)
+            # on clashes keep the shorter canonical name, it is usually the
+            # more general one ("Onion" over "Onion Green")
+            if key not in table or len(name) < len(table[key]):
+                table[key] = name
+
+    def match(self, tokens):
+        """Greedy longest-match over token n-grams. Returns (commodity, location)."""
+        commodity = location = None
+        i = 0
+        while i < len(tokens):
+            for n in range(min(MAX_ALIAS_TOKENS, len(tokens) - i), 0, -1):
+                key = " ".join(tokens[i:i + n])
+                if commodity is None and key in self.commodities:
+                    commodity = self.commodities[key]
+                    break
+                if location is None and key in self.locations:
+                    location = self.locations[key]
+                    break
+            else:
+                n = 1
+            i += n
+        return commodity, location
+
+
+_GAZETTEER = None
+_GAZETTEER_SOURCE = None
+_GAZETTEER_LOCK = threading.Lock()
+
+
+def get_gazetteer(records):
+    """Rebuild the gazetteer only when the snapshot object changes."""
+    global _GAZETTEER, _GAZETTEER_SOURCE
+    if _GAZETTEER is not None and _GAZETTEER_SOURCE is records:
+        return _GAZETTEER
+    with _GAZETTEER_LOCK:
+        if _GAZETTEER is None or _GAZETTEER_SOURCE is not records:
+            _GAZETTEER = Gazetteer(records or [])
+            _GAZETTEER_SOURCE = records
+    return _GAZETTEER
+
+
+# ----------------------------------------------------
+# LOCAL INTENT + ENTITY EXTRACTION
+# ----------------------------------------------------
+def classify(message, records):
+    """
+    Label a chat message as weather / market / general and pull out the
+    commodity and location using keyword rules plus the mandi gazetteer.
+
+    Returns the same shape the LLM intent prompt produced, plus an
+    "ambiguous" flag telling the caller whether to fall back to the LLM.
+    """
+    tokens = [singular(t) for t in tokenize(message)]
+    gazetteer = get_gazetteer(records)
+    commodity, location = gazetteer.match(tokens)
+
+    weather_score = sum(1 for t in tokens if t in WEATHER_WORDS)
+    market_score = sum(1 for t in tokens if t in MARKET_WORDS)
+    if "₹" in (message or ""):
+        market_score += 1
+    # a bare crop name with a price-ish cue is a market question, but a
+    # crop name alone ("how to grow tomato") is general advice
+    if commodity and market_score:
+        market_score += 1
+
+    if weather_score > market_score:
+        intent = "weather"
+    elif market_score > weather_score:
+        intent = "market"
+    else:
+        intent = "general"
+
+    # weather is answered for a place; without one the tools have nothing
+    # to look up, so let the LLM try to pull it out of the message
+    ambiguous = (
+        (weather_score and weather_score == market_score)
+        or (intent == "market" and not commodity)
+        or (intent == "weather" and not location)
+    )
+
+    return {
+        "intent": intent,
+        "commodity": commodity or "",
+        "location": location or "",
+        "ambiguous": bool(ambiguous),
+    }
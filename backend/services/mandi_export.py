@@ -0,0 +1,195 @@
+# backend/services/mandi_export.py
+#
+# Bulk export of the mandi snapshot for /market/export. Records are filtered,
+# projected and encoded a batch at a time straight off the snapshot list, so
+# the response is a stream of bounded chunks however many rows match; nothing
+# the size of the result is ever built. Shared by the Flask and Quart routes.
+import csv
+import importlib.util
+import io
+import json
+import os
+import zlib
+from datetime import datetime
+from itertools import islice
+from operator import itemgetter
+
+from services import metrics
+from services.mandi_store import KEY_FIELDS, PRICE_FIELDS, date_key
+from services.mandi_stream import to_price
+
+FIELDS = KEY_FIELDS + PRICE_FIELDS
+FILTERS = ("state", "district", "market", "commodity", "variety")
+
+# format -> (mimetype, file extension)
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+BATCH_ROWS = int(os.getenv("KRISHI_EXPORT_BATCH_ROWS", "5000"))
+GZIP_LEVEL = int(os.getenv("KRISHI_EXPORT_GZIP_LEVEL", "1"))
+
+EXPORT_ROWS = metrics.counter(
+    "krishi_market_export_rows_total", "Rows streamed by /market/export", ("format",)
+)
+
+
+# ----------------------------------------------------
+# REQUEST
+# ----------------------------------------------------
+def _date_arg(args, name):
+    value = args.get(name, "").strip()
+    if not value:
+        return None
+    # same "YYYYmmdd" form as mandi_store.date_key
+    return datetime.strptime(value, "%Y-%m-%d").strftime("%Y%m%d")
+
+
+def parse_args(args, accept_encoding=""):
+    """Query args -> (params, None) or (None, (error payload, status))."""
+    fmt = args.get("format", "csv").strip().lower()
+    if fmt not in FORMATS:
+        return None, ({"error": f"format must be one of {', '.join(FORMATS)}"}, 400)
+    if fmt == "arrow" and importlib.util.find_spec("pyarrow") is None:
+        return None, ({"error": "arrow export is not available on this server"}, 501)
+
+    fields = [f.strip() for f in args.get("fields", "").split(",") if f.strip()] or list(FIELDS)
+    unknown = [f for f in fields if f not in FIELDS]
+    if unknown:
+        return None, ({"error": f"unknown fields: {', '.join(unknown)}", "fields": list(FIELDS)}, 400)
+
+    try:
+        start, end = _date_arg(args, "from"), _date_arg(args, "to")
+    except ValueError:
+        return None, ({"error": "from and to must be YYYY-MM-DD"}, 400)
+
+    compress = args.get("compress", "1") != "0" and "gzip" in accept_encoding.lower()
+    return {
+        "format": fmt,
+        "fields": tuple(dict.fromkeys(fields)),
+        "filters": {f: args[f].strip().lower() for f in FILTERS if args.get(f, "").strip()},
+        "from": start,
+        "to": end,
+        "gzip": compress,
+    }, None
+
+
+def response_headers(params, seq):
+    """(mimetype, headers) for a stream from snapshot seq."""
+    mimetype, ext = FORMATS[params["format"]]
+    headers = {
+        "Content-Disposition": f'attachment; filename="mandi-{seq}.{ext}"',
+        "Cache-Control": "no-store",
+        "Vary": "Accept-Encoding",
+        "X-Mandi-Snapshot": str(seq),
+        "X-Accel-Buffering": "no",
+    }
+    if params["gzip"]:
+        headers["Content-Encoding"] = "gzip"
+    return mimetype, headers
+
+
+# ----------------------------------------------------
+# ROWS
+# ----------------------------------------------------
+def matching(records, params):
+    filters = params["filters"].items()
+    start, end = params["from"], params["to"]
+    if not filters and not (start or end):
+        return iter(records)
+
+    def keep(r):
+        if any((r.get(f) or "").strip().lower() != want for f, want in filters):
+            return False
+        if start or end:
+            day = date_key(r.get("arrival_date", ""))
+            if not day or (start and day < start) or (end and day > end):
+                return False
+        return True
+    return filter(keep, records)
+
+
+def project(batch, fields):
+    """Tuples in field order; prices as ints whatever the snapshot held."""
+    try:
+        rows = list(map(itemgetter(*fields), batch))
+    except KeyError:
+        rows = [tuple(r.get(f, "") for f in fields) for r in batch]
+    if len(fields) == 1:
+        rows = [(v,) for v in rows]
+    for i, f in enumerate(fields):
+        # slimmed snapshots already hold ints; only a raw one pays per row
+        if f in PRICE_FIELDS and set(map(type, map(itemgetter(i), rows))) - {int}:
+            rows = [row[:i] + (to_price(row[i]),) + row[i + 1:] for row in rows]
+    return rows
+
+
+def batches(records, params, size=BATCH_ROWS):
+    rows = matching(records, params)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        EXPORT_ROWS.inc(params["format"], amount=len(batch))
+        yield project(batch, params["fields"])
+
+
+# ----------------------------------------------------
+# ENCODERS (one bytes chunk per batch)
+# ----------------------------------------------------
+def encode_csv(batched, fields):
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(fields)
+    for batch in batched:
+        writer.writerows(batch)
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+
+def encode_ndjson(batched, fields):
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    for batch in batched:
+        yield "".join(dumps(dict(zip(fields, row))) + "\n" for row in batch).encode()
+
+
+def encode_arrow(batched, fields):
+    import pyarrow as pa
+
+    schema = pa.schema([(f, pa.int64() if f in PRICE_FIELDS else pa.string()) for f in fields])
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for batch in batched:
+            columns = list(zip(*batch))
+            writer.write_batch(pa.record_batch(
+                [pa.array(col, type=schema.field(i).type) for i, col in enumerate(columns)],
+                schema=schema,
+            ))
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    yield sink.getvalue()
+
+
+ENCODERS = {"csv": encode_csv, "ndjson": encode_ndjson, "arrow": encode_arrow}
+
+
+def _gzip(chunks, level):
+    z = zlib.compressobj(level, zlib.DEFLATED, 31)   # wbits 31 = gzip container
+    for chunk in chunks:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
+
+
+def stream(records, params):
+    """Bytes chunks of the export of records (a snapshot list) for parse_args params."""
+    chunks = ENCODERS[params["format"]](batches(records, params), params["fields"])
+    chunks = (c for c in chunks if c)
+    return _gzip(chunks, GZIP_LEVEL) if params["gzip"] else chunks
@@ -0,0 +1,372 @@
+# backend/services/mandi_store.py
+#
+# The current mandi snapshot plus every structure derived from it (meta
+# dropdowns, per state/commodity groups, latest quote per market). A new
+# snapshot is diffed against the held one on the natural record key and
+# only the inserted / updated / removed records touch the derived state,
+# so the work after a refresh scales with what changed.
+import threading
+from collections import Counter
+from datetime import datetime
+from operator import itemgetter
+
+KEY_FIELDS = ("state", "district", "market", "commodity", "variety", "grade", "arrival_date")
+PRICE_FIELDS = ("min_price", "max_price", "modal_price")
+
+
+_KEY = itemgetter(*KEY_FIELDS)
+_PRICES = itemgetter(*PRICE_FIELDS)
+
+
+def record_key(record):
+    try:
+        return _KEY(record)
+    except KeyError:
+        return tuple(record.get(f, "") for f in KEY_FIELDS)
+
+
+def record_prices(record):
+    try:
+        return _PRICES(record)
+    except KeyError:
+        return tuple(record.get(f) for f in PRICE_FIELDS)
+
+
+def market_key(record):
+    return (record.get("commodity", ""), record.get("state", ""), record.get("district", ""), record.get("market", ""))
+
+
+def date_key(arrival):
+    # "dd/mm/YYYY" -> "YYYYmmdd", sortable without strptime
+    return arrival[6:10] + arrival[3:5] + arrival[0:2] if len(arrival or "") == 10 else ""
+
+
+def _modal(record):
+    try:
+        return int(record.get("modal_price") or 0)
+    except ValueError:
+        return 0
+
+
+def _quote_rank(record):
+    # newest arrival first, then the higher price; None = no usable price
+    modal = _modal(record)
+    return (date_key(record.get("arrival_date", "")), modal) if modal > 0 else None
+
+
+class SnapshotDiff:
+    def __init__(self, seq, inserted, updated, removed):
+        self.seq = seq
+        self.inserted = inserted      # [record]
+        self.updated = updated        # [(old_record, new_record)]
+        self.removed = removed        # [record]
+        # [(market_key, old_quote, new_quote)] for markets whose latest
+        # quote changed; a quote is (modal_price, arrival_date, record) or None
+        self.quote_changes = []
+
+    def __len__(self):
+        return len(self.inserted) + len(self.updated) + len(self.removed)
+
+
+class MandiStore:
+    """
+    Readers only see immutable cached lists/dicts that are built under the
+    lock and swapped in whole, so a concurrent load never changes anything
+    a request is iterating.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.source = None
+        self.seq = 0
+        self.last_diff = None
+
+        self._groups = {}          # (state.lower(), commodity.lower()) -> {key: record}
+        self._markets = {}         # market_key -> {key: record}
+        self._latest = {}          # market_key -> (rank, record, key), newest priced arrival
+        self._state_commodities = {}   # state.lower() -> Counter(commodity)
+        self._states = Counter()
+        self._commodities = Counter()
+        self._districts = Counter()    # (state, district)
+        self._market_names = Counter()  # (state, district, market)
+
+        self._aggregates = {}      # group -> {"markets": [...], "history": [...]}
+        self._commodity_lists = {}
+        self._meta = None
+        self._places = None
+        self._lock = threading.RLock()
+
+    # ----------------------------------------------------
+    # DIFF + APPLY
+    # ----------------------------------------------------
+    def diff(self, records):
+        """Returns (new_rows, SnapshotDiff) without changing the store."""
+        rows = {}
+        for r in records:
+            rows[record_key(r)] = r
+
+        inserted, updated = [], []
+        held = self.rows
+        for key, r in rows.items():
+            old = held.get(key)
+            if old is None:
+                inserted.append(r)
+            elif old is not r and record_prices(old) != record_prices(r):
+                updated.append((old, r))
+        removed = [r for key, r in held.items() if key not in rows] if len(held) + len(inserted) != len(rows) else []
+        return rows, SnapshotDiff(self.seq + 1, inserted, updated, removed)
+
+    def load(self, records):
+        """Diff records against the held snapshot and apply it; returns the SnapshotDiff."""
+        with self._lock:
+            rows, diff = self.diff(records)
+            self.apply(rows, diff)
+            self.source = records
+            return diff
+
+    def apply(self, rows, diff):
+        touched = {market_key(r) for r in diff.inserted}
+        touched.update(market_key(r) for r in diff.removed)
+        touched.update(market_key(new) for _, new in diff.updated)
+        before = {mk: self.latest_quote(mk) for mk in touched}
+
+        for r in diff.removed:
+            self._remove(r)
+        for old, new in diff.updated:
+            self._replace(old, new)
+        for r in diff.inserted:
+            self._add(r)
+
+        self.rows = rows
+        self.seq = diff.seq
+        for mk in touched:
+            old, new = before[mk], self.latest_quote(mk)
+            if old != new:
+                diff.quote_changes.append((mk, old, new))
+        self.last_diff = diff
+
+    def _add(self, r):
+        key = record_key(r)
+        state, district, market, commodity = (r.get(f, "").strip() for f in ("state", "district", "market", "commodity"))
+        group = (state.lower(), commodity.lower())
+        self._groups.setdefault(group, {})[key] = r
+        mk = market_key(r)
+        self._markets.setdefault(mk, {})[key] = r
+        self._aggregates.pop(group, None)
+        rank = _quote_rank(r)
+        if rank is not None and (mk not in self._latest or rank > self._latest[mk][0]):
+            self._latest[mk] = (rank, r, key)
+
+        by_state = self._state_commodities.setdefault(state.lower(), Counter())
+        by_state[r.get("commodity", "")] += 1
+        if by_state[r.get("commodity", "")] == 1:
+            self._commodity_lists.pop(state.lower(), None)
+        self._count(1, state, district, market, commodity)
+
+    def _remove(self, r):
+        key = record_key(r)
+        state, district, market, commodity = (r.get(f, "").strip() for f in ("state", "district", "market", "commodity"))
+        group = (state.lower(), commodity.lower())
+        mk = market_key(r)
+        self._discard(self._groups, group, key)
+        self._discard(self._markets, mk, key)
+        self._aggregates.pop(group, None)
+        # compare keys, not objects: a refresh parses fresh dicts for unchanged rows
+        if mk in self._latest and self._latest[mk][2] == key:
+            self._rescan_latest(mk)
+
+        by_state = self._state_commodities.get(state.lower())
+        if by_state is not None:
+            by_state[r.get("commodity", "")] -= 1
+            if by_state[r.get("commodity", "")] <= 0:
+                del by_state[r.get("commodity", "")]
+                self._commodity_lists.pop(state.lower(), None)
+        self._count(-1, state, district, market, commodity)
+
+    def _replace(self, old, new):
+        key = record_key(new)
+        group = (new.get("state", "").strip().lower(), new.get("commodity", "").strip().lower())
+        mk = market_key(new)
+        self._groups[group][key] = new
+        self._markets[mk][key] = new
+        self._aggregates.pop(group, None)
+        rank = _quote_rank(new)
+        best = self._latest.get(mk)
+        if best is not None and best[2] == key:
+            self._rescan_latest(mk)
+        elif rank is not None and (best is None or rank > best[0]):
+            self._latest[mk] = (rank, new, key)
+
+    def _rescan_latest(self, mk):
+        # only when the current best left or got cheaper: one market's rows
+        best = None
+        for key, r in self._markets.get(mk, {}).items():
+            rank = _quote_rank(r)
+            if rank is not None and (best is None or rank > best[0]):
+                best = (rank, r, key)
+        if best is None:
+            self._latest.pop(mk, None)
+        else:
+            self._latest[mk] = best
+
+    @staticmethod
+    def _discard(table, outer, key):
+        inner = table.get(outer)
+        if inner is not None:
+            inner.pop(key, None)
+            if not inner:
+                del table[outer]
+
+    def _count(self, delta, state, district, market, commodity):
+        # the meta payload / place lookup only change when a name appears or disappears
+        changed = False
+        for counter, name, present in (
+            (self._states, state, state),
+            (self._commodities, commodity, commodity),
+            (self._districts, (state, district), state and district and market),
+            (self._market_names, (state, district, market), state and district and market),
+        ):
+            if not present:
+                continue
+            counter[name] += delta
+            if counter[name] <= 0:
+                del counter[name]
+                changed = True
+            elif counter[name] == delta == 1:
+                changed = True
+        if changed:
+            self._meta = None
+            self._places = None
+
+    # ----------------------------------------------------
+    # READS
+    # ----------------------------------------------------
+    def latest_quote(self, mk):
+        """(modal_price, arrival_date, record) of the newest priced arrival at a market, or None."""
+        best = self._latest.get(mk)
+        if best is None:
+            return None
+        return best[0][1], best[1].get("arrival_date", ""), best[1]
+
+    def latest_quotes(self):
+        with self._lock:
+            return {mk: self.latest_quote(mk) for mk in self._latest}
+
+    def commodities_in(self, state):
+        state = (state or "").strip().lower()
+        names = self._commodity_lists.get(state)
+        if names is None:
+            with self._lock:
+                names = sorted(self._state_commodities.get(state, ()))
+                self._commodity_lists[state] = names
+        return names
+
+    def group(self, state, commodity):
+        """
+        {"markets": [...], "history": [...]} for one (state, commodity),
+        markets formatted and sorted by arrival date as /market returns them.
+        Rebuilt only after a refresh touched the group.
+        """
+        group = ((state or "").strip().lower(), (commodity or "").strip().lower())
+        aggregate = self._aggregates.get(group)
+        if aggregate is None:
+            with self._lock:
+                aggregate = self._build_group(list(self._groups.get(group, {}).items()))
+                self._aggregates[group] = aggregate
+        return aggregate
+
+    @staticmethod
+    def _build_group(items):
+        markets, series, keys = [], [], {}
+        for key, r in items:
+            try:
+                markets.append({
+                    "market": r.get("market", ""),
+                    "district": r.get("district", ""),
+                    "variety": r.get("variety", ""),
+                    "arrival_date": r.get("arrival_date", ""),
+                    "min_price": int(r.get("min_price") or 0),
+                    "max_price": int(r.get("max_price") or 0),
+                    "modal_price": int(r.get("modal_price") or 0)
+                })
+            except ValueError:
+                continue
+            keys[id(markets[-1])] = tuple("" if v is None else str(v) for v in key)
+        for m in markets:
+            try:
+                m["_date"] = datetime.strptime(m["arrival_date"], "%d/%m/%Y") if m["arrival_date"] else datetime.min
+            except ValueError:
+                m["_date"] = None
+
+        dated = [m for m in markets if m["_date"] is not None]
+        # ties on the date break on the record key: the group's dict order
+        # depends on the refresh history, and the trend reads the last two prices
+        dated.sort(key=lambda m: (m["_date"], keys[id(m)]))
+        series = [
+            {"date": m["_date"].strftime("%d %b"), "price": m["modal_price"]}
+            for m in dated if m["_date"] != datetime.min
+        ]
+        for m in markets:
+            del m["_date"]
+        return {"markets": dated, "history": series}
+
+    def meta(self):
+        """The /market/meta payload."""
+        meta = self._meta
+        if meta is None:
+            with self._lock:
+                districts, markets = {}, {}
+                for state, district in sorted(self._districts):
+                    districts.setdefault(state.lower(), []).append(district)
+                for state, district, market in sorted(self._market_names):
+                    markets.setdefault(state.lower(), {}).setdefault(district, []).append(market)
+                meta = self._meta = {
+                    "states": sorted(self._states),
+                    "commodities": sorted(self._commodities),
+                    "districts": districts,
+                    "markets": markets
+                }
+        return meta
+
+    def resolve_place(self, location):
+        """Free-text state or district -> (state, district); ("", location) when unknown."""
+        location = (location or "").strip().lower()
+        if not location:
+            return "", ""
+        places = self._places
+        if places is None:
+            with self._lock:
+                places = {}
+                for state, district in self._districts:
+                    places.setdefault(district.lower(), (state, district))
+                for state in self._states:
+                    places[state.lower()] = (state, "")
+                self._places = places
+        return places.get(location, ("", location))
+
+
+STORE = MandiStore()
+
+
+def sync(records):
+    """Load records into STORE if they are not already the held snapshot; returns STORE."""
+    # an empty list is a failed fetch; never let it wipe the held snapshot
+    if records and STORE.source is not records:
+        with STORE._lock:
+            if STORE.source is not records:
+                STORE.load(records)
+    return STORE
+
+
+def replace(records, publish):
+    """
+    Load a new snapshot into STORE and call publish() before any reader can
+    sync again, so the records callers are handed and the store move together.
+    Returns the SnapshotDiff, or None for an empty (failed) snapshot.
+    """
+    if not records:
+        return None
+    with STORE._lock:
+        diff = STORE.load(records)
+        publish()
+    return diff
@@ -0,0 +1,217 @@
+# backend/services/mandi_stream.py
+#
+# Incremental parser for data.gov.in mandi responses. Records are pulled out
+# of the "records" array one at a time as the body arrives, so a fetch never
+# holds the raw body, its decoded text and the full parse tree at once.
+# Every record is slimmed on the way in: prices become ints and repeated
+# strings (states, districts, commodities, dates, even whole prices) share
+# one object per snapshot instead of one per record.
+import codecs
+import json
+import re
+
+from services.mandi_store import PRICE_FIELDS
+
+CHUNK_SIZE = 64 * 1024
+# after an incomplete record, wait for this much more text before decoding it again
+RETRY_BYTES = 4096
+
+_WS = re.compile(r"[ \t\n\r]*")
+_ITEM_SEP = re.compile(r"[ \t\n\r]*,[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
+# parser states
+_START, _KEY, _COLON, _VALUE, _AFTER_VALUE, _RECORDS, _FIRST_ITEM, _ITEM, _AFTER_ITEM, _DONE = range(10)
+
+
+def to_price(value):
+    """'15100' / '15100.0' / 15100.0 -> 15100; anything unparseable -> 0 (treated as no quote)."""
+    if type(value) is int:
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            return int(round(float(value)))
+        except (TypeError, ValueError):
+            return 0
+
+
+class Slimmer:
+    """Shares equal keys and values between records; one per snapshot."""
+
+    def __init__(self):
+        self._table = {}
+        self._prices = {}
+
+    def __call__(self, record):
+        share = self._table.setdefault
+        # strings only: True == 1 == 1.0 hash alike, so sharing any other
+        # value would hand one record's 1 to another's True
+        out = {share(k, k): share(v, v) if type(v) is str else v for k, v in record.items()}
+        for field in PRICE_FIELDS:
+            if field in out:
+                raw = out[field]
+                if type(raw) is str:
+                    price = self._prices.get(raw)
+                    if price is None:
+                        price = self._prices[raw] = to_price(raw)
+                else:
+                    price = to_price(raw)
+                out[field] = price
+        return out
+
+
+class RecordStream:
+    """
+    Push parser: feed(chunk) returns the records completed by that chunk,
+    close() the rest. Uses ijson's C backend when it is installed, else a
+    small state machine over json's own scanner (each record is still
+    decoded in C, only the top-level structure is walked in Python).
+    """
+
+    def __init__(self):
+        self.slim = Slimmer()
+        try:
+            import ijson
+        except ImportError:
+            self._ijson = None
+            self._text = codecs.getincrementaldecoder("utf-8")()
+            self._buf = ""
+            self._pos = 0
+            self._state = _START
+            self._key = None
+            self._retry_at = 0
+        else:
+            self._ijson = ijson.sendable_list()
+            self._coro = ijson.items_coro(self._ijson, "records.item", use_float=True)
+
+    def feed(self, chunk):
+        if self._ijson is not None:
+            self._coro.send(chunk)
+            return self._drain()
+        return self._parse(self._text.decode(chunk), final=False)
+
+    def close(self):
+        if self._ijson is not None:
+            self._coro.close()
+            return self._drain()
+        records = self._parse(self._text.decode(b"", True), final=True)
+        if self._state != _DONE:
+            raise ValueError("truncated mandi response")
+        return records
+
+    def _drain(self):
+        records = [self.slim(r) for r in self._ijson]
+        del self._ijson[:]
+        return records
+
+    # ----------------------------------------------------
+    # PURE-PYTHON FALLBACK
+    # ----------------------------------------------------
+    def _parse(self, text, final):
+        self._buf = self._buf[self._pos:] + text
+        self._retry_at -= self._pos
+        self._pos = 0
+        out = []
+        if len(self._buf) < self._retry_at and not final:
+            return out
+        while self._step(out, final):
+            pass
+        return out
+
+    def _decode(self, pos, final):
+        """(value, end), or None until the value is complete in the buffer."""
+        try:
+            value, end = _DECODER.scan_once(self._buf, pos)
+        except (StopIteration, json.JSONDecodeError) as e:
+            if final:
+                if isinstance(e, StopIteration):
+                    raise json.JSONDecodeError("Expecting value", self._buf, pos) from None
+                raise
+            self._retry_at = len(self._buf) + RETRY_BYTES
+            return None
+        # a number at the very end of the buffer may continue in the next chunk
+        if end == len(self._buf) and not final:
+            self._retry_at = len(self._buf) + 1
+            return None
+        return value, end
+
+    def _step(self, out, final):
+        buf = self._buf
+        pos = _WS.match(buf, self._pos).end()
+        self._pos = pos
+        if pos == len(buf):
+            return False
+        c, state = buf[pos], self._state
+
+        if state == _START:
+            if c != "{":
+                raise ValueError("mandi response is not a JSON object")
+            self._pos, self._state = pos + 1, _KEY
+        elif state == _KEY:
+            if c == "}":
+                self._pos, self._state = pos + 1, _DONE
+                return True
+            decoded = self._decode(pos, final)
+            if decoded is None:
+                return False
+            self._key, self._pos = decoded
+            self._state = _COLON
+        elif state == _COLON:
+            if c != ":":
+                raise ValueError(f"expected ':' at offset {pos}")
+            self._pos = pos + 1
+            self._state = _RECORDS if self._key == "records" else _VALUE
+        elif state == _RECORDS and c == "[":
+            self._pos, self._state = pos + 1, _FIRST_ITEM
+        elif state in (_FIRST_ITEM, _ITEM):
+            if state == _FIRST_ITEM and c == "]":
+                self._pos, self._state = pos + 1, _AFTER_VALUE
+                return True
+            # the hot loop: one record per pass while the separators are in the buffer
+            while True:
+                decoded = self._decode(pos, final)
+                if decoded is None:
+                    self._pos, self._state = pos, _ITEM
+                    return False
+                value, end = decoded
+                if isinstance(value, dict):
+                    out.append(self.slim(value))
+                sep = _ITEM_SEP.match(buf, end)
+                if sep is None:
+                    self._pos, self._state = end, _AFTER_ITEM
+                    return True
+                pos = sep.end()
+        elif state in (_VALUE, _RECORDS):
+            # metadata ("field", "total", ...) or a non-list "records"
+            decoded = self._decode(pos, final)
+            if decoded is None:
+                return False
+            _, self._pos = decoded
+            self._state = _AFTER_VALUE
+        elif state == _AFTER_ITEM:
+            if c not in ",]":
+                raise ValueError(f"expected ',' or ']' at offset {pos}")
+            self._pos = pos + 1
+            self._state = _ITEM if c == "," else _AFTER_VALUE
+        elif state == _AFTER_VALUE:
+            if c not in ",}":
+                raise ValueError(f"expected ',' or '}}' at offset {pos}")
+            self._pos = pos + 1
+            self._state = _KEY if c == "," else _DONE
+        else:
+            raise ValueError(f"trailing data at offset {pos}")
+        return True
+
+
+def iter_records(chunks):
+    """Slim records from an iterable of byte chunks (a response's iter_content, a file)."""
+    stream = RecordStream()
+    for chunk in chunks:
+        yield from stream.feed(chunk)
+    yield from stream.close()
+
+
+def read_chunks(f, size=CHUNK_SIZE):
+    return iter(lambda: f.read(size), b"")
@@ -0,0 +1,551 @@
+# backend/services/metrics.py
+import atexit
+import bisect
+import collections
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+
+# Latency buckets (seconds) sized for everything from a dict lookup to a
+# cold YOLO forward pass on CPU
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+# ----------------------------------------------------
+# METRIC TYPES
+# ----------------------------------------------------
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = collections.defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] += amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def state(self):
+        with self._lock:
+            return [[list(k), v] for k, v in self._values.items()]
+
+    def merge(self, states):
+        """[(pid, alive, state)] from every process -> [(labels, value)]; counters sum, dead workers included."""
+        totals = collections.defaultdict(float)
+        for _, _, state in states:
+            for labels, value in state:
+                totals[tuple(labels)] += value
+        return list(totals.items())
+
+    def lines(self, items, label_names=None):
+        label_names = self.label_names if label_names is None else label_names
+        return [f"{self.name}{_labels(label_names, k)} {v}" for k, v in items]
+
+    def collect(self):
+        with self._lock:
+            items = list(self._values.items())
+        return self.lines(items)
+
+
+class Gauge(Counter):
+    """
+    multiprocess says how the workers' values merge at scrape time: "all"
+    (one series per live worker, with a pid label), "sum", "max" or "min".
+    Exited workers' gauges are dropped.
+    """
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels=(), multiprocess="all"):
+        super().__init__(name, help_text, labels)
+        self.multiprocess = multiprocess
+
+    def set(self, *labels, value):
+        with self._lock:
+            self._values[labels] = value
+
+    def merge(self, states):
+        merged = {}
+        pick = {"sum": lambda a, b: a + b, "max": max, "min": min}.get(self.multiprocess)
+        for pid, alive, state in states:
+            if not alive:
+                continue
+            for labels, value in state:
+                if pick is None:
+                    merged[tuple(labels) + (pid,)] = value
+                else:
+                    key = tuple(labels)
+                    merged[key] = pick(merged[key], value) if key in merged else value
+        return list(merged.items())
+
+    def lines(self, items, label_names=None):
+        if label_names is None and self.multiprocess == "all" and multiprocess_dir():
+            label_names = self.label_names + ("pid",)
+        return super().lines(items, label_names)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> [bucket counts..., +Inf count, sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, *labels, value):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[idx] += 1
+            series[-1] += value
+
+    def snapshot(self, *labels):
+        with self._lock:
+            series = list(self._series.get(labels) or [])
+        return series
+
+    def state(self):
+        with self._lock:
+            return [[list(k), list(v)] for k, v in self._series.items()]
+
+    def merge(self, states):
+        totals = {}
+        for _, _, state in states:
+            for labels, series in state:
+                key = tuple(labels)
+                if key in totals:
+                    totals[key] = [a + b for a, b in zip(totals[key], series)]
+                else:
+                    totals[key] = list(series)
+        return list(totals.items())
+
+    def collect(self):
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        return self.lines(items)
+
+    def lines(self, items):
+        lines = []
+        for labels, series in items:
+            running = 0
+            for bound, count in zip(self.buckets, series):
+                running += count
+                lines.append(
+                    f"{self.name}_bucket{_labels(self.label_names, labels, [('le', bound)])} {running}"
+                )
+            running += series[len(self.buckets)]
+            lines.append(
+                f"{self.name}_bucket{_labels(self.label_names, labels, [('le', '+Inf')])} {running}"
+            )
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {series[-1]}")
+        return lines
+
+
+# ----------------------------------------------------
+# REGISTRY
+# ----------------------------------------------------
+METRICS = {}
+COLLECTORS = []
+
+
+def _register(metric):
+    return METRICS.setdefault(metric.name, metric)
+
+
+def counter(name, help_text, labels=()):
+    return _register(Counter(name, help_text, labels))
+
+
+def gauge(name, help_text, labels=(), multiprocess="all"):
+    return _register(Gauge(name, help_text, labels, multiprocess))
+
+
+def histogram(name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+    return _register(Histogram(name, help_text, labels, buckets))
+
+
+def register_collector(fn):
+    """fn() is called at scrape time to refresh gauges (cache sizes etc.)."""
+    COLLECTORS.append(fn)
+    return fn
+
+
+def _run_collectors():
+    for fn in COLLECTORS:
+        try:
+            fn()
+        except Exception as e:
+            print("Metrics collector error:", e)
+
+
+def render():
+    _run_collectors()
+    states = _read_process_files() if multiprocess_dir() else None
+
+    lines = []
+    for metric in list(METRICS.values()):
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        if states is None:
+            lines.extend(metric.collect())
+        else:
+            per_process = [(pid, alive, state.get(metric.name, {}).get("series", []))
+                           for pid, alive, state in states]
+            lines.extend(metric.lines(metric.merge(per_process)))
+    return "\n".join(lines) + "\n"
+
+
+# ----------------------------------------------------
+# MULTIPROCESS (gunicorn workers)
+# ----------------------------------------------------
+# With KRISHI_METRICS_DIR set (gunicorn.conf.py sets it), every worker writes
+# its series to <dir>/<pid>.json every FLUSH_SECONDS, at exit and when it
+# serves a scrape, and render() merges every file: one scrape covers all
+# workers instead of whichever one answered. Counters and histograms of
+# exited workers are folded into archive.json by the master (child_exit),
+# so totals never go backwards when a worker is recycled.
+FLUSH_SECONDS = float(os.getenv("KRISHI_METRICS_FLUSH_SECONDS", "5"))
+ARCHIVE_FILE = "archive.json"
+
+_flusher = {"pid": None}
+_flusher_lock = threading.Lock()
+
+
+def multiprocess_dir():
+    return os.getenv("KRISHI_METRICS_DIR") or None
+
+
+def _state():
+    return {name: {"kind": m.kind, "series": m.state()} for name, m in list(METRICS.items())}
+
+
+def _write_json(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None  # removed by child_exit since listdir
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def write_process_file():
+    directory = multiprocess_dir()
+    if directory:
+        _write_json(os.path.join(directory, f"{os.getpid()}.json"), _state())
+
+
+def _read_process_files():
+    """[(pid, alive, state)] for every worker file plus the archive (pid None, not alive)."""
+    directory = multiprocess_dir()
+    write_process_file()
+    states = []
+    for name in os.listdir(directory):
+        if not name.endswith(".json"):
+            continue
+        state = _read_json(os.path.join(directory, name))
+        if state is None:
+            continue
+        if name == ARCHIVE_FILE:
+            states.append((None, False, state))
+        else:
+            pid = int(name[:-len(".json")])
+            states.append((pid, pid == os.getpid() or _alive(pid), state))
+    return states
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        try:
+            _run_collectors()
+            write_process_file()
+        except Exception as e:
+            print("Metrics flush failed:", e)
+
+
+def ensure_flusher():
+    """Start this worker's file writer (a no-op without KRISHI_METRICS_DIR)."""
+    if _flusher["pid"] == os.getpid() or not multiprocess_dir():
+        return
+    with _flusher_lock:
+        if _flusher["pid"] != os.getpid():
+            threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True).start()
+            atexit.register(write_process_file)
+            _flusher["pid"] = os.getpid()
+
+
+def mark_process_dead(pid):
+    """Fold an exited worker's counters and histograms into the archive (gunicorn child_exit)."""
+    directory = multiprocess_dir()
+    if not directory:
+        return
+    path = os.path.join(directory, f"{pid}.json")
+    state = _read_json(path)
+    if state is not None:
+        archive_path = os.path.join(directory, ARCHIVE_FILE)
+        archive = _read_json(archive_path) or {}
+        for name, metric in state.items():
+            if metric["kind"] == "gauge":
+                continue
+            held = archive.setdefault(name, {"kind": metric["kind"], "series": []})
+            merger = Histogram(name, "") if metric["kind"] == "histogram" else Counter(name, "")
+            merged = merger.merge([(None, False, held["series"]), (None, False, metric["series"])])
+            held["series"] = [[list(k), v] for k, v in merged]
+        _write_json(archive_path, archive)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+REQUESTS = counter(
+    "krishi_http_requests_total", "HTTP requests by route, method and status",
+    ("route", "method", "status"),
+)
+ERRORS = counter(
+    "krishi_http_errors_total", "HTTP requests that ended in a 5xx or an exception",
+    ("route", "method"),
+)
+LATENCY = histogram(
+    "krishi_http_request_duration_seconds", "End-to-end request latency",
+    ("route", "method"),
+)
+STAGES = histogram(
+    "krishi_request_stage_seconds",
+    "Time spent per stage (decode, preprocess, model_forward, postprocess, db, external_api, ...)",
+    ("route", "stage"),
+)
+
+
+# ----------------------------------------------------
+# STAGE TIMING
+# ----------------------------------------------------
+# Set per request by the ASGI app's hooks; the Flask request context isn't there
+_ASYNC_ROUTE = contextvars.ContextVar("krishi_async_route", default=None)
+
+
+def current_route():
+    if has_request_context() and request.url_rule is not None:
+        return request.url_rule.rule
+    return _ASYNC_ROUTE.get() or "-"
+
+
+def observe_stage(name, seconds, route=None):
+    STAGES.observe(route or current_route(), name, value=seconds)
+
+
+@contextmanager
+def stage(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - started)
+
+
+def record_yolo_speed(result, total_seconds=None):
+    """
+    Split an ultralytics call into stages using result.speed (ms). Any time
+    not covered by YOLO's own timers (image load/decode) is charged to decode.
+    """
+    speed = getattr(result, "speed", None) or {}
+    parts = {
+        "preprocess": speed.get("preprocess") or 0.0,
+        "model_forward": speed.get("inference") or 0.0,
+        "postprocess": speed.get("postprocess") or 0.0,
+    }
+    for name, ms in parts.items():
+        observe_stage(name, ms / 1000)
+    if total_seconds is not None:
+        observe_stage("decode", max(0.0, total_seconds - sum(parts.values()) / 1000))
+
+
+# ----------------------------------------------------
+# FLASK HOOKS
+# ----------------------------------------------------
+def _before():
+    ensure_flusher()
+    g.metrics_started = time.perf_counter()
+
+
+def _after(response):
+    started = g.pop("metrics_started", None)
+    if started is not None:
+        route, method = current_route(), request.method
+        LATENCY.observe(route, method, value=time.perf_counter() - started)
+        REQUESTS.inc(route, method, str(response.status_code))
+        if response.status_code >= 500:
+            ERRORS.inc(route, method)
+    return response
+
+
+def _teardown(exc):
+    # only reached with metrics_started still set when _after never ran
+    started = g.pop("metrics_started", None)
+    if started is not None and exc is not None:
+        route, method = current_route(), request.method
+        LATENCY.observe(route, method, value=time.perf_counter() - started)
+        REQUESTS.inc(route, method, "500")
+        ERRORS.inc(route, method)
+
+
+def init_app(app):
+    app.before_request(_before)
+    app.after_request(_after)
+    app.teardown_request(_teardown)
+
+
+def init_async_app(app):
+    """Same series for the Quart app (asgi.py); hooks are async so the route contextvar reaches the view."""
+    from quart import g as async_g, request as async_request
+
+    async def before():
+        ensure_flusher()
+        async_g.metrics_started = time.perf_counter()
+        rule = async_request.url_rule
+        _ASYNC_ROUTE.set(rule.rule if rule is not None else "-")
+
+    async def after(response):
+        started = async_g.pop("metrics_started", None)
+        if started is not None:
+            route, method = current_route(), async_request.method
+            LATENCY.observe(route, method, value=time.perf_counter() - started)
+            REQUESTS.inc(route, method, str(response.status_code))
+            if response.status_code >= 500:
+                ERRORS.inc(route, method)
+        return response
+
+    async def teardown(exc):
+        started = async_g.pop("metrics_started", None)
+        if started is not None and exc is not None:
+            route, method = current_route(), async_request.method
+            LATENCY.observe(route, method, value=time.perf_counter() - started)
+            REQUESTS.inc(route, method, "500")
+            ERRORS.inc(route, method)
+
+    app.before_request(before)
+    app.after_request(after)
+    app.teardown_request(teardown)
+
+
+# ----------------------------------------------------
+# SAMPLING PROFILER (toggled at runtime)
+# ----------------------------------------------------
+class SamplingProfiler:
+    """
+    Samples every thread's Python stack at a fixed interval and counts
+    collapsed stacks ("a;b;c N"), the input format for flamegraph tools.
+    Costs nothing while stopped.
+    """
+
+    def __init__(self, max_depth=64):
+        self.max_depth = max_depth
+        self.interval = 0.01
+        self.samples = collections.Counter()
+        self.sample_count = 0
+        self.started_at = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_ms=10):
+        with self._lock:
+            if self.running:
+                return False
+            self.interval = max(1, interval_ms) / 1000
+            self.samples = collections.Counter()
+            self.sample_count = 0
+            self.started_at = time.time()
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="sampling-profiler", daemon=True
+            )
+            self._thread.start()
+            return True
+
+    def stop(self):
+        with self._lock:
+            if not self.running:
+                return False
+            self._stop.set()
+            self._thread.join()
+            return True
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+            self.sample_count += 1
+
+    def report(self, top=None):
+        items = self.samples.most_common(top)
+        return {
+            "running": self.running,
+            "interval_ms": round(self.interval * 1000, 2),
+            "ticks": self.sample_count,
+            "started_at": self.started_at,
+            "collapsed": "\n".join(f"{stack} {n}" for stack, n in items),
+        }
+
+
+PROFILER = SamplingProfiler()
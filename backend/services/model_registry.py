@@ -0,0 +1,131 @@
+# backend/services/model_registry.py
+import os
+import threading
+import time
+
+COLD = "cold"
+LOADING = "loading"
+WARM = "warm"
+FAILED = "failed"
+
+# A failed load is retried after this, doubling per consecutive failure up
+# to RETRY_MAX_SECONDS, instead of on every request (a soil call used to
+# re-download EfficientNet each time)
+RETRY_SECONDS = float(os.getenv("KRISHI_MODEL_RETRY_SECONDS", "5"))
+RETRY_MAX_SECONDS = float(os.getenv("KRISHI_MODEL_RETRY_MAX_SECONDS", "300"))
+
+
+class LazyModel:
+    """
+    Wraps a loader so the heavy import + weight load happens on first use
+    (or in a warmup thread) instead of when the route module is imported.
+    Concurrent first callers wait for the single in-flight load.
+
+    required: the pod can't serve its purpose without it, so /health/ready
+    waits on it while it is loading (or queued for warmup) and fails while
+    it is FAILED. A COLD model never blocks readiness; it loads on first use.
+    """
+
+    def __init__(self, name, loader, required=True):
+        self.name = name
+        self.loader = loader
+        self.required = required
+        self.state = COLD
+        self.error = None
+        self.load_seconds = None
+        self.warming = False
+        self.failures = 0
+        self.retry_at = 0.0
+        self._value = None
+        self._lock = threading.Lock()
+
+    def _backoff_error(self):
+        return RuntimeError(
+            f"{self.name} failed to load ({self.error}); retrying in "
+            f"{max(0.0, self.retry_at - time.monotonic()):.1f}s"
+        )
+
+    def get(self):
+        if self.state == WARM:
+            return self._value
+        if self.state == FAILED and time.monotonic() < self.retry_at:
+            raise self._backoff_error()
+        with self._lock:
+            if self.state == FAILED and time.monotonic() < self.retry_at:
+                # someone else's attempt failed while we waited for the lock
+                raise self._backoff_error()
+            if self.state != WARM:
+                self.state = LOADING
+                started = time.perf_counter()
+                try:
+                    self._value = self.loader()
+                except Exception as e:
+                    self.state = FAILED
+                    self.error = str(e)
+                    self.failures += 1
+                    delay = min(RETRY_SECONDS * 2 ** (self.failures - 1), RETRY_MAX_SECONDS)
+                    self.retry_at = time.monotonic() + delay
+                    raise
+                self.load_seconds = round(time.perf_counter() - started, 3)
+                self.error = None
+                self.failures = 0
+                self.state = WARM
+        return self._value
+
+    def blocks_readiness(self):
+        if not self.required:
+            return False
+        return self.state in (LOADING, FAILED) or (self.state == COLD and self.warming)
+
+    def status(self):
+        status = {
+            "state": self.state,
+            "required": self.required,
+            "load_seconds": self.load_seconds,
+            "error": self.error,
+        }
+        if self.state == FAILED:
+            status["retry_in"] = round(max(0.0, self.retry_at - time.monotonic()), 1)
+        return status
+
+
+REGISTRY = {}
+
+
+def register(name, loader, required=True):
+    if name not in REGISTRY:
+        REGISTRY[name] = LazyModel(name, loader, required)
+    return REGISTRY[name]
+
+
+def _selected(names):
+    return [model for name, model in list(REGISTRY.items()) if not names or name in names]
+
+
+def warmup(names=None):
+    for model in _selected(names):
+        try:
+            model.get()
+            print(f"Warmed {model.name} in {model.load_seconds}s")
+        except Exception as e:
+            print(f"Warmup failed for {model.name}:", e)
+        finally:
+            model.warming = False
+
+
+def warmup_in_background(names=None):
+    # queued models hold readiness until the thread gets to them
+    for model in _selected(names):
+        model.warming = True
+    thread = threading.Thread(
+        target=warmup, args=(names,), name="model-warmup", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def readiness():
+    """Ready unless a required model is loading, queued for warmup or failed."""
+    models = {name: model.status() for name, model in REGISTRY.items()}
+    ready = not any(model.blocks_readiness() for model in REGISTRY.values())
+    return ready, models
@@ -0,0 +1,157 @@
+# backend/services/passwords.py
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from services import metrics
+
+# Any werkzeug method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000".
+# Stored hashes made with a different method/cost are upgraded on next login.
+HASH_METHOD = os.getenv("KRISHI_PASSWORD_HASH", "scrypt:32768:8:1")
+# Processes per web worker doing the hashing; 0 hashes inline (tests, dev)
+HASH_WORKERS = int(os.getenv("KRISHI_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hash jobs allowed in flight per web worker before new ones are refused
+HASH_QUEUE = int(os.getenv("KRISHI_HASH_QUEUE", str(max(1, HASH_WORKERS) * 8)))
+HASH_TIMEOUT = float(os.getenv("KRISHI_HASH_TIMEOUT", "10"))
+
+INFLIGHT = metrics.gauge(
+    "krishi_password_hash_inflight", "Password hash/verify jobs queued or running",
+    multiprocess="sum"
+)
+REJECTED = metrics.counter(
+    "krishi_password_hash_rejected_total", "Hash jobs refused because the pool queue was full"
+)
+
+
+class HashPoolBusy(Exception):
+    pass
+
+
+# ----------------------------------------------------
+# WORK DONE IN THE POOL PROCESSES
+# ----------------------------------------------------
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify(stored_hash, password, method, method_prefix):
+    """(ok, replacement hash or None); rehash happens in the same round trip."""
+    if not stored_hash or not check_password_hash(stored_hash, password):
+        return False, None
+    if stored_hash.split("$", 1)[0] != method_prefix:
+        return True, generate_password_hash(password, method=method)
+    return True, None
+
+
+@functools.lru_cache(maxsize=1)
+def method_prefix():
+    # werkzeug expands short names ("scrypt") to their full parameter string
+    return generate_password_hash("", method=HASH_METHOD).split("$", 1)[0]
+
+
+# ----------------------------------------------------
+# POOL (one per process; gunicorn workers build their own after fork)
+# ----------------------------------------------------
+_state = {"pid": None, "pool": None, "slots": None}
+_lock = threading.Lock()
+
+
+def _get_pool():
+    pid = os.getpid()
+    if _state["pid"] != pid:
+        with _lock:
+            if _state["pid"] != pid:
+                # spawn: forking a threaded web worker can deadlock the child
+                ctx = multiprocessing.get_context("spawn")
+                _state["pool"] = (
+                    ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=ctx)
+                    if HASH_WORKERS > 0 else None
+                )
+                _state["slots"] = threading.BoundedSemaphore(HASH_QUEUE)
+                _state["pid"] = pid
+    return _state["pool"], _state["slots"]
+
+
+def _acquire():
+    pool, slots = _get_pool()
+    if not slots.acquire(blocking=False):
+        REJECTED.inc()
+        raise HashPoolBusy()
+    INFLIGHT.inc(amount=1)
+
+    def release(_future=None):
+        INFLIGHT.inc(amount=-1)
+        slots.release()
+    return pool, release
+
+
+def _submit(pool, release, fn, args):
+    # The slot follows the job, not the caller: a request that gives up on
+    # timeout leaves its job running in the pool, and freeing the slot then
+    # would let a storm queue work without bound.
+    try:
+        future = pool.submit(fn, *args)
+    except BaseException:
+        release()
+        raise
+    future.add_done_callback(release)
+    return future
+
+
+def _run(fn, *args):
+    pool, release = _acquire()
+    with metrics.stage("password_hash"):
+        if pool is None:
+            try:
+                return fn(*args)
+            finally:
+                release()
+        try:
+            return _submit(pool, release, fn, args).result(timeout=HASH_TIMEOUT)
+        except FutureTimeout:
+            raise HashPoolBusy()
+
+
+async def _run_async(fn, *args):
+    # same pool and queue bound; the event loop waits on the future, not a thread
+    pool, release = _acquire()
+    with metrics.stage("password_hash"):
+        if pool is None:
+            try:
+                return fn(*args)
+            finally:
+                release()
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(_submit(pool, release, fn, args)), HASH_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HashPoolBusy()
+
+
+def hash_password(password):
+    return _run(_hash, password, HASH_METHOD)
+
+
+def verify_password(stored_hash, password):
+    """Returns (ok, new_hash). new_hash is set when the stored hash should be replaced."""
+    return _run(_verify, stored_hash, password, HASH_METHOD, method_prefix())
+
+
+async def hash_password_async(password):
+    return await _run_async(_hash, password, HASH_METHOD)
+
+
+async def verify_password_async(stored_hash, password):
+    return await _run_async(_verify, stored_hash, password, HASH_METHOD, method_prefix())
+
+
+def warmup():
+    """Start the pool processes now rather than on the first login."""
+    pool, _ = _get_pool()
+    method_prefix()
+    if pool is not None:
+        list(pool.map(_hash, ["warmup"] * HASH_WORKERS, [HASH_METHOD] * HASH_WORKERS))
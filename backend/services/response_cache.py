@@ -0,0 +1,173 @@
+# backend/services/response_cache.py
+import hashlib
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+from difflib import get_close_matches
+
+from services.intent import tokenize, singular
+
+# Filler words that don't change what a farmer is asking for
+FILLER_WORDS = {
+    "please", "pls", "plz", "tell", "me", "can", "you", "could", "would",
+    "what", "whats", "is", "are", "the", "a", "an", "of", "for", "my",
+    "i", "to", "do", "does", "kindly", "hi", "hello", "sir", "madam",
+}
+
+
+# A near-duplicate must agree on these exactly: "irrigate" vs "not irrigate"
+# is one word apart and scores well above the threshold
+NEGATION_WORDS = {
+    "no", "not", "never", "dont", "don", "doesnt", "didnt", "cant", "cannot",
+    "shouldnt", "without", "avoid", "stop", "nahi", "mat",
+}
+
+
+def normalize(message):
+    tokens = [singular(t) for t in tokenize(message)]
+    return " ".join(t for t in tokens if t not in FILLER_WORDS)
+
+
+def fingerprint(text):
+    return hashlib.blake2b((text or "").encode(), digest_size=8).hexdigest()
+
+
+def ngram_vector(text, n=3):
+    padded = f" {text} "
+    grams = Counter(padded[i:i + n] for i in range(len(padded) - n + 1))
+    norm = math.sqrt(sum(c * c for c in grams.values())) or 1.0
+    return grams, norm
+
+
+def same_question(text, other):
+    """
+    Guard for a trigram near-hit: same negations, and no content word on
+    either side without a close spelling on the other ("tomatos" matches
+    "tomato"; "cotton" does not match "chilli").
+    """
+    a, b = set(text.split()), set(other.split())
+    if a & NEGATION_WORDS != b & NEGATION_WORDS:
+        return False
+    for mine, theirs in ((a - b, b), (b - a, a)):
+        for token in mine:
+            if len(token) > 2 and not get_close_matches(token, theirs, n=1, cutoff=0.8):
+                return False
+    return True
+
+
+def cosine(a, b):
+    va, na = a
+    vb, nb = b
+    if len(va) > len(vb):
+        va, vb = vb, va
+    dot = sum(c * vb.get(g, 0) for g, c in va.items())
+    return dot / (na * nb)
+
+
+class ResponseCache:
+    """
+    Reply cache keyed on (normalized text, intent, tool fingerprint, subject),
+    where subject is the (commodity, location) the intent step extracted.
+
+    Exact hits are a dict lookup. Near-duplicates ("tomato price karnataka"
+    vs "price of tomatoes in karnataka") are found by cosine similarity
+    over character trigram vectors, scanning only entries that share the
+    same intent, tool fingerprint and subject, so a reply is never reused
+    against different market data or for a different crop or place; a
+    candidate must also pass same_question(). Entries carry tags (e.g.
+    "mandi") so a snapshot refresh can drop everything derived from the
+    old data.
+    """
+
+    def __init__(self, max_entries=5000, ttl_seconds=6 * 3600,
+                 threshold=0.85, max_bucket_scan=256):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.max_bucket_scan = max_bucket_scan
+
+        self._entries = OrderedDict()   # key -> (reply, vector, tags, created)
+        self._buckets = {}              # (intent, tool_fp) -> OrderedDict of keys
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(message, intent, tool_result, subject=("", "")):
+        text = normalize(message)
+        subject = tuple((part or "").strip().lower() for part in subject)
+        return (text, intent, fingerprint(tool_result), subject), text
+
+    def get(self, message, intent, tool_result, subject=("", "")):
+        key, text = self.make_key(message, intent, tool_result, subject)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[3] <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+            bucket = self._buckets.get(key[1:])
+            if bucket:
+                vector = ngram_vector(text)
+                best, best_score = None, self.threshold
+                # newest entries first; bounded so a hot bucket stays cheap
+                for i, other in enumerate(reversed(bucket)):
+                    if i >= self.max_bucket_scan:
+                        break
+                    cand = self._entries.get(other)
+                    if not cand or now - cand[3] > self.ttl_seconds:
+                        continue
+                    score = cosine(vector, cand[1])
+                    if score >= best_score and same_question(text, other[0]):
+                        best, best_score = other, score
+                if best is not None:
+                    self._entries.move_to_end(best)
+                    self.near_hits += 1
+                    return self._entries[best][0]
+
+            self.misses += 1
+            return None
+
+    def put(self, message, intent, tool_result, reply, tags=(), subject=("", "")):
+        key, text = self.make_key(message, intent, tool_result, subject)
+        with self._lock:
+            self._entries[key] = (reply, ngram_vector(text), frozenset(tags), time.time())
+            self._entries.move_to_end(key)
+            bucket = self._buckets.setdefault(key[1:], OrderedDict())
+            bucket[key] = None
+            bucket.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                old, _ = self._entries.popitem(last=False)
+                self._drop_from_bucket(old)
+
+    def invalidate_tag(self, tag):
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if tag in e[2]]
+            for k in stale:
+                del self._entries[k]
+                self._drop_from_bucket(k)
+        return len(stale)
+
+    def _drop_from_bucket(self, key):
+        bucket = self._buckets.get(key[1:])
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self._buckets[key[1:]]
+
+    def stats(self):
+        lookups = self.hits + self.near_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.near_hits) / lookups, 4) if lookups else 0.0,
+        }
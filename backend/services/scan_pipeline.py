@@ -0,0 +1,105 @@
+# backend/services/scan_pipeline.py
+#
+# One decoded image, two models: the crop classifier runs first and decides
+# whether (and for which classes) the disease detector needs to run.
+import functools
+import os
+
+import numpy as np
+
+from models.crop_disease.predict import MODEL as DISEASE_MODEL, predict_image
+from models.crops_classification.predict import classify_image
+from services import metrics
+
+# A "<crop>___healthy" prediction at or above this confidence skips disease detection
+HEALTHY_SKIP_CONF = float(os.getenv("KRISHI_SCAN_HEALTHY_SKIP", "0.85"))
+DETECT_CONF = float(os.getenv("KRISHI_SCAN_DETECT_CONF", "0.30"))
+
+# classifier labels that mean "not a crop leaf at all"
+REJECT_LABELS = {"not_leaf", "background", "non_leaf"}
+
+SCAN_PATHS = metrics.counter(
+    "krishi_scan_pipeline_total", "/scan requests by disease-detection path", ("path",)
+)
+
+
+def decode_image(data):
+    """Upload bytes -> BGR uint8 array, the layout ultralytics takes directly."""
+    import cv2
+
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Unreadable image")
+    return image
+
+
+def split_label(label):
+    """PlantVillage style 'Tomato___Late_blight' -> ('Tomato', 'Late_blight')."""
+    crop, sep, condition = label.partition("___")
+    return (crop, condition) if sep else (label, "")
+
+
+def _norm(text):
+    return "".join(c for c in text.lower() if c.isalnum())
+
+
+@functools.lru_cache(maxsize=256)
+def _classes_for_crop(crop, names_items):
+    key = _norm(crop)
+    ids = [i for i, name in names_items if key and key in _norm(name)]
+    return tuple(ids) or None
+
+
+def disease_classes_for(crop, names):
+    """Detector class ids whose label mentions the crop; None = no match, run all."""
+    return _classes_for_crop(crop, tuple(sorted(names.items())))
+
+
+def _done(out, path):
+    out["disease_model"] = path
+    SCAN_PATHS.inc(path)
+    return out
+
+
+def run_scan(image):
+    """
+    Returns {crop_type, condition, classification, detections, confidence,
+    disease, disease_confidence, disease_model}. confidence is always the
+    classifier's (it goes with classification["label"]); disease_confidence
+    is the score behind disease: the top detector box, or the classifier's
+    when no box was found and its condition stands in. disease_model is
+    one of "rejected", "skipped" (confidently healthy), "specialized"
+    (restricted to the crop's classes) or "full".
+    """
+    classification = classify_image(image)
+    crop, condition = split_label(classification["label"])
+    out = {
+        "crop_type": crop,
+        "condition": condition or None,
+        "classification": classification,
+        "detections": [],
+        "confidence": classification["confidence"],
+        "disease": None,
+        "disease_confidence": None,
+    }
+
+    if classification["label"].lower() in REJECT_LABELS:
+        out["crop_type"] = None
+        return _done(out, "rejected")
+
+    healthy = condition.lower() == "healthy"
+    if healthy and classification["confidence"] >= HEALTHY_SKIP_CONF:
+        return _done(out, "skipped")
+
+    classes = disease_classes_for(crop, DISEASE_MODEL.get().names)
+    detections = predict_image(image, DETECT_CONF, classes=list(classes) if classes else None)
+    out["detections"] = detections
+
+    if detections:
+        top = max(detections, key=lambda d: d["confidence"])
+        out["disease"], out["disease_confidence"] = top["label"], top["confidence"]
+    elif condition and not healthy:
+        # detector found no box; fall back to the classifier's PlantVillage condition
+        out["disease"], out["disease_confidence"] = condition, classification["confidence"]
+
+    return _done(out, "specialized" if classes else "full")
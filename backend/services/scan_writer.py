@@ -0,0 +1,124 @@
+# backend/services/scan_writer.py
+import atexit
+import os
+import queue
+import threading
+import time
+
+from db.config import get_db
+from db.crop_scans import insert_scans
+from services import metrics
+
+BATCH_SIZE = int(os.getenv("KRISHI_SCAN_BATCH", "200"))
+# Longest a scan row waits before its batch is written
+MAX_DELAY = float(os.getenv("KRISHI_SCAN_FLUSH_MS", "250")) / 1000
+QUEUE_SIZE = int(os.getenv("KRISHI_SCAN_QUEUE", "10000"))
+
+BATCH_ROWS = metrics.histogram(
+    "krishi_scan_batch_rows", "Rows per crop_scans batch insert",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 200, 500),
+)
+DROPPED = metrics.counter(
+    "krishi_scan_rows_failed_total", "crop_scans rows that could not be written"
+)
+
+
+class ScanWriter:
+    """
+    Buffers crop_scans rows and writes them with one executemany per batch
+    (BATCH_SIZE rows or MAX_DELAY seconds, whichever comes first) from a
+    background thread, so scan requests don't each pay a commit.
+    If the queue is full the row is written inline instead of dropped.
+
+    The trade-off: a queued row shows up in /farmer/<id>/scans up to
+    MAX_DELAY after the scan response, and rows still queued when a worker
+    is killed (SIGKILL, gunicorn timeout) are lost; atexit only covers a
+    clean exit. Callers that need the row durable, or read history right
+    after a scan, pass wait=True.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, max_delay=MAX_DELAY, queue_size=QUEUE_SIZE):
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_thread(self):
+        # gunicorn workers fork after preload; each needs its own flusher
+        pid = os.getpid()
+        if self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != pid or not self._thread.is_alive():
+                if self._pid != pid:
+                    self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._thread = threading.Thread(target=self._run, name="scan-writer", daemon=True)
+                self._thread.start()
+                self._pid = pid
+
+    def submit(self, farmer_id, image_path, crop_type, disease, confidence, wait=False):
+        """Queue a row, or with wait=True write it now; returns False if a write here failed."""
+        row = (farmer_id, image_path, crop_type, disease, confidence)
+        if wait:
+            return self._write([row])
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            return self._write([row])
+        return True
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _insert(self, rows):
+        db = get_db()
+        try:
+            insert_scans(db, rows)
+        finally:
+            db.close()
+
+    def _write(self, rows):
+        """Insert rows as one batch, falling back to one row at a time; True if all were written."""
+        started = time.perf_counter()
+        try:
+            self._insert(rows)
+        except Exception as e:
+            if len(rows) == 1:
+                DROPPED.inc()
+                print("crop_scans insert failed:", e)
+                return False
+            # one bad row (a farmer that no longer exists, ...) must not
+            # take the other farmers' scans down with it
+            print(f"crop_scans batch insert of {len(rows)} rows failed, retrying row by row:", e)
+            return all([self._write([row]) for row in rows])
+        BATCH_ROWS.observe(value=len(rows))
+        metrics.observe_stage("db", time.perf_counter() - started, route="scan-writer")
+        return True
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far is written (shutdown, tests)."""
+        if self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+SCAN_WRITER = ScanWriter()
+atexit.register(SCAN_WRITER.flush)
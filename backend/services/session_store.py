@@ -0,0 +1,181 @@
+# backend/services/session_store.py
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_DB_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "chat_sessions.db"
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    session_id TEXT PRIMARY KEY,
+    messages   TEXT NOT NULL,
+    size       INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chat_sessions_updated ON chat_sessions(updated_at);
+"""
+
+
+def estimate_tokens(message):
+    # ~4 chars per token for English/Hinglish text plus per-message overhead
+    return len(message.get("content") or "") // 4 + 4
+
+
+def trim_to_budget(messages, token_budget):
+    """Keep the newest messages that fit in token_budget (always keep the last one)."""
+    kept = []
+    used = 0
+    for m in reversed(messages):
+        cost = estimate_tokens(m)
+        if kept and used + cost > token_budget:
+            break
+        kept.append(m)
+        used += cost
+    kept.reverse()
+    return kept
+
+
+class SessionStore:
+    """
+    Chat history shared by every worker through one SQLite (WAL) file.
+
+    Nothing is cached in-process, so worker memory stays flat regardless of
+    how many sessions exist. The file itself is bounded by TTL expiry,
+    a session-count cap and a byte cap, evicting least recently used first.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, ttl_seconds=7 * 24 * 3600,
+                 max_sessions=200_000, max_bytes=256 * 1024 * 1024,
+                 token_budget=1500, evict_every=500):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.token_budget = token_budget
+        self.evict_every = evict_every
+
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # schema via a throwaway connection so nothing is inherited by
+        # forked workers when the app is preloaded in a gunicorn master
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.close()
+
+    # ----------------------------------------------------
+    # CONNECTIONS (one per thread, per process)
+    # ----------------------------------------------------
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # ----------------------------------------------------
+    # READ / WRITE
+    # ----------------------------------------------------
+    def get(self, session_id):
+        row = self._conn().execute(
+            "SELECT messages, updated_at FROM chat_sessions WHERE session_id=?",
+            (session_id,)
+        ).fetchone()
+        if not row:
+            return []
+        if time.time() - row[1] > self.ttl_seconds:
+            return []
+        return json.loads(row[0])
+
+    def append(self, session_id, *messages):
+        conn = self._conn()
+        now = time.time()
+
+        # BEGIN IMMEDIATE takes the write lock up front so two workers
+        # appending to the same session can't lose each other's turns
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT messages, updated_at FROM chat_sessions WHERE session_id=?",
+                (session_id,)
+            ).fetchone()
+            history = []
+            if row and now - row[1] <= self.ttl_seconds:
+                history = json.loads(row[0])
+
+            history = trim_to_budget(history + list(messages), self.token_budget)
+            blob = json.dumps(history, separators=(",", ":"))
+
+            conn.execute(
+                "INSERT INTO chat_sessions (session_id, messages, size, updated_at) "
+                "VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET "
+                "messages=excluded.messages, size=excluded.size, updated_at=excluded.updated_at",
+                (session_id, blob, len(blob), now)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        with self._writes_lock:
+            self._writes += 1
+            due = self._writes % self.evict_every == 0
+        if due:
+            self.evict()
+
+        return history
+
+    def clear(self, session_id):
+        self._conn().execute("DELETE FROM chat_sessions WHERE session_id=?", (session_id,))
+
+    # ----------------------------------------------------
+    # EVICTION (TTL, then LRU by count and bytes)
+    # ----------------------------------------------------
+    def evict(self):
+        conn = self._conn()
+        conn.execute(
+            "DELETE FROM chat_sessions WHERE updated_at < ?",
+            (time.time() - self.ttl_seconds,)
+        )
+
+        count, total = conn.execute(
+            "SELECT COUNT(*), TOTAL(size) FROM chat_sessions"
+        ).fetchone()
+
+        if count > self.max_sessions:
+            conn.execute(
+                "DELETE FROM chat_sessions WHERE session_id IN ("
+                "SELECT session_id FROM chat_sessions ORDER BY updated_at LIMIT ?)",
+                (count - self.max_sessions,)
+            )
+
+        if total > self.max_bytes:
+            # drop the oldest sessions until the byte cap is met
+            avg = max(1, total / max(1, count))
+            excess = int((total - self.max_bytes) / avg) + 1
+            conn.execute(
+                "DELETE FROM chat_sessions WHERE session_id IN ("
+                "SELECT session_id FROM chat_sessions ORDER BY updated_at LIMIT ?)",
+                (excess,)
+            )
+
+    def stats(self):
+        count, total = self._conn().execute(
+            "SELECT COUNT(*), TOTAL(size) FROM chat_sessions"
+        ).fetchone()
+        return {"sessions": count, "bytes": int(total)}
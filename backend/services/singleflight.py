@@ -0,0 +1,127 @@
+# backend/services/singleflight.py
+#
+# Collapse concurrent identical calls into one execution. The first caller
+# for a key runs the function; everyone who asks for the same key while it
+# is running waits and gets the same result (or the same exception).
+# Nothing is cached once the call returns.
+import asyncio
+import functools
+import threading
+
+from services import metrics
+
+CALLS = metrics.counter(
+    "krishi_singleflight_calls_total", "Coalesced calls by group and role (leader ran it, shared waited)",
+    ("group", "role"),
+)
+RATIO = metrics.gauge(
+    "krishi_singleflight_coalescing_ratio", "Share of calls served by another caller's execution",
+    ("group",),
+)
+IN_FLIGHT = metrics.gauge(
+    "krishi_singleflight_in_flight", "Keys currently executing", ("group",),
+    multiprocess="sum"
+)
+
+GROUPS = {}
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Thread flavour: SingleFlight("mandi").do(key, fn, *args) -> fn(*args)."""
+
+    def __init__(self, group):
+        self.group = group
+        self._calls = {}
+        self._lock = threading.Lock()
+        GROUPS[group] = self
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            CALLS.inc(self.group, "shared")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        CALLS.inc(self.group, "leader")
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """asyncio flavour: await AsyncSingleFlight("openai").do(key, coro_fn, *args)."""
+
+    def __init__(self, group):
+        self.group = group
+        self._tasks = {}
+        GROUPS[group] = self
+
+    async def do(self, key, coro_fn, *args, **kwargs):
+        # one loop per worker thread under some servers; never share across loops
+        slot = (id(asyncio.get_running_loop()), key)
+        task = self._tasks.get(slot)
+        if task is None:
+            CALLS.inc(self.group, "leader")
+            task = asyncio.ensure_future(coro_fn(*args, **kwargs))
+            self._tasks[slot] = task
+            task.add_done_callback(lambda _: self._tasks.pop(slot, None))
+        else:
+            CALLS.inc(self.group, "shared")
+        # a cancelled waiter must not cancel the call everyone else is waiting on
+        return await asyncio.shield(task)
+
+    def in_flight(self):
+        return len(self._tasks)
+
+
+def coalesced(flight, key_fn=None):
+    """Decorator: route calls through flight, keyed on key_fn(*args, **kwargs) (default: the args)."""
+    def wrap(fn):
+        def key_of(args, kwargs):
+            return key_fn(*args, **kwargs) if key_fn else (args, tuple(sorted(kwargs.items())))
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                return await flight.do(key_of(args, kwargs), fn, *args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return flight.do(key_of(args, kwargs), fn, *args, **kwargs)
+        return wrapper
+    return wrap
+
+
+@metrics.register_collector
+def collect_coalescing():
+    for group, flight in list(GROUPS.items()):
+        leader, shared = CALLS.value(group, "leader"), CALLS.value(group, "shared")
+        RATIO.set(group, value=round(shared / (leader + shared), 4) if leader + shared else 0.0)
+        IN_FLIGHT.set(group, value=flight.in_flight())
@@ -0,0 +1,292 @@
+# backend/services/upload_store.py
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+
+from services import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: every process may sweep
+    fcntl = None
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "uploads")
+
+UPLOAD_ROOT = os.getenv("KRISHI_UPLOAD_DIR", DEFAULT_ROOT)
+RETENTION_DAYS = float(os.getenv("KRISHI_UPLOAD_RETENTION_DAYS", "90"))  # 0 = keep forever
+QUOTA_MB = float(os.getenv("KRISHI_UPLOAD_QUOTA_MB", "20480"))          # 0 = unlimited
+SWEEP_SECONDS = float(os.getenv("KRISHI_UPLOAD_SWEEP_SECONDS", "3600"))
+THUMB_SIZE = int(os.getenv("KRISHI_UPLOAD_THUMB_PX", "256"))
+
+# magic bytes -> MIME type; what the bytes are, whatever the filename said
+_MAGIC = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"BM", "image/bmp"),
+    (b"GIF8", "image/gif"),
+)
+
+STORED = metrics.counter(
+    "krishi_uploads_total", "Uploaded images by outcome", ("outcome",)
+)
+SWEPT = metrics.counter(
+    "krishi_uploads_swept_total", "Stored images removed by the sweeper", ("reason",)
+)
+STORE_BYTES = metrics.gauge(
+    "krishi_upload_store_bytes", "Bytes in the upload store at the last sweep",
+    multiprocess="max"
+)
+
+
+def sniff_mimetype(head):
+    """MIME type from an image's first bytes; None when unrecognised."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for magic, mimetype in _MAGIC:
+        if head.startswith(magic):
+            return mimetype
+    return None
+
+
+class StoredImage:
+    def __init__(self, key, path, thumb_path, size, created, ext=None, mimetype=None):
+        self.key = key              # "ab/cd/<sha256>", what crop_scans.image_path stores
+        self.path = path
+        self.thumb_path = thumb_path
+        self.size = size
+        self.created = created      # False when the same bytes were already stored
+        self.ext = ext              # as uploaded; metadata only, never part of the key
+        self.mimetype = mimetype    # sniffed from the content
+
+
+class UploadStore:
+    """
+    Content-addressed image store.
+
+    Files live at objects/<h[0:2]>/<h[2:4]>/<sha256>, so identical uploads
+    are kept once whatever they were called, and no directory grows past a
+    few dozen entries even at millions of images (65,536 leaf shards). The
+    type is sniffed from the bytes when served. A JPEG thumbnail is written
+    to thumbs/ with the same layout at ingest, or on a re-upload that finds
+    it missing.
+
+    Re-uploading an image refreshes its mtime. The sweeper removes objects
+    older than the retention window, then the least recently stored ones
+    until the store is back under its byte quota. Only one process sweeps
+    at a time (flock on .sweep.lock).
+    """
+
+    def __init__(self, root=UPLOAD_ROOT, retention_days=RETENTION_DAYS, quota_mb=QUOTA_MB,
+                 sweep_seconds=SWEEP_SECONDS, thumb_size=THUMB_SIZE):
+        self.root = root
+        self.objects = os.path.join(root, "objects")
+        self.thumbs = os.path.join(root, "thumbs")
+        self.tmp = os.path.join(root, "tmp")
+        self.retention_seconds = retention_days * 86400
+        self.quota_bytes = quota_mb * 1024 * 1024
+        self.sweep_seconds = sweep_seconds
+        self.thumb_size = thumb_size
+        self._sweeper_pid = None
+        self._lock = threading.Lock()
+
+    # ----------------------------------------------------
+    # PATHS
+    # ----------------------------------------------------
+    def path_for(self, key):
+        return os.path.join(self.objects, *key.split("/"))
+
+    def thumb_for(self, key):
+        stem = key.rsplit(".", 1)[0]
+        return os.path.join(self.thumbs, *stem.split("/")) + ".jpg"
+
+    @staticmethod
+    def valid_key(key):
+        parts = key.split("/")
+        if len(parts) != 3 or len(parts[0]) != 2 or len(parts[1]) != 2:
+            return False
+        # "<sha256>", or "<sha256>.<ext>" for objects stored before keys dropped the extension
+        name, dot, ext = parts[2].partition(".")
+        return (len(name) == 64 and all(c in "0123456789abcdef" for c in name)
+                and (not dot or ext.isalnum()))
+
+    def mimetype_for(self, key):
+        with open(self.path_for(key), "rb") as f:
+            return sniff_mimetype(f.read(16)) or "application/octet-stream"
+
+    # ----------------------------------------------------
+    # INGEST
+    # ----------------------------------------------------
+    def put(self, stream, ext=None):
+        """
+        Store a file-like object (werkzeug FileStorage works); returns StoredImage.
+        ext is the client's file extension, kept as metadata only: the key is
+        the content hash alone, so the same bytes under two names dedupe.
+        """
+        self._ensure_sweeper()
+        ext = (ext or "").lower().lstrip(".") or None
+        os.makedirs(self.tmp, exist_ok=True)
+
+        # hash while spooling to a temp file in the same filesystem so the
+        # final step is an atomic rename
+        h = hashlib.sha256()
+        size = 0
+        head = b""
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in iter(lambda: stream.read(1 << 16), b""):
+                    if not head:
+                        head = chunk[:16]
+                    h.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+
+            digest = h.hexdigest()
+            key = f"{digest[0:2]}/{digest[2:4]}/{digest}"
+            path = self.path_for(key)
+            mimetype = sniff_mimetype(head)
+
+            if os.path.exists(path):
+                os.utime(path)
+                thumb = self.thumb_for(key)
+                # the first ingest's thumbnail may have failed or been lost
+                if not os.path.exists(thumb):
+                    self._write_thumbnail(path, thumb)
+                STORED.inc("deduplicated")
+                return StoredImage(key, path, thumb, size, False, ext, mimetype)
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+            tmp_path = None
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        thumb = self.thumb_for(key)
+        self._write_thumbnail(path, thumb)
+        STORED.inc("stored")
+        return StoredImage(key, path, thumb, size, True, ext, mimetype)
+
+    def _write_thumbnail(self, path, thumb):
+        try:
+            from PIL import Image
+
+            img = Image.open(path)
+            img.draft("RGB", (self.thumb_size, self.thumb_size))
+            img = img.convert("RGB")
+            img.thumbnail((self.thumb_size, self.thumb_size))
+            os.makedirs(os.path.dirname(thumb), exist_ok=True)
+            buf = io.BytesIO()
+            img.save(buf, "JPEG", quality=80)
+            tmp = thumb + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(buf.getvalue())
+            os.replace(tmp, thumb)
+        except Exception as e:
+            print("Thumbnail failed for", path, e)
+
+    # ----------------------------------------------------
+    # RETENTION / QUOTA
+    # ----------------------------------------------------
+    def _ensure_sweeper(self):
+        if self.sweep_seconds <= 0 or self._sweeper_pid == os.getpid():
+            return
+        with self._lock:
+            if self._sweeper_pid != os.getpid():
+                threading.Thread(target=self._sweep_loop, name="upload-sweeper", daemon=True).start()
+                self._sweeper_pid = os.getpid()
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(self.sweep_seconds)
+            try:
+                self.sweep()
+            except Exception as e:
+                print("Upload sweep failed:", e)
+
+    def _iter_objects(self):
+        if not os.path.isdir(self.objects):
+            return
+        for a in os.scandir(self.objects):
+            if not a.is_dir():
+                continue
+            for b in os.scandir(a.path):
+                if not b.is_dir():
+                    continue
+                # one leaf shard (a few dozen files) at a time, so callers
+                # can delete while iterating
+                for entry in list(os.scandir(b.path)):
+                    if entry.is_file():
+                        try:
+                            st = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        key = f"{a.name}/{b.name}/{entry.name}"
+                        yield key, entry.path, st.st_mtime, st.st_size
+
+    def _remove(self, key, path, reason):
+        for p in (path, self.thumb_for(key)):
+            try:
+                os.remove(p)
+            except FileNotFoundError:
+                pass
+        SWEPT.inc(reason)
+
+    def sweep(self, now=None):
+        """
+        Two streaming passes, constant memory regardless of file count:
+        1) total bytes per hour of mtime, 2) delete everything older than
+        the retention cutoff or the hour that brings the store back under
+        90% of quota. Returns the number of objects removed.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        lock = open(os.path.join(self.root, ".sweep.lock"), "w")
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return 0  # another worker is sweeping
+
+            now = now or time.time()
+            retention_cutoff = now - self.retention_seconds if self.retention_seconds > 0 else None
+
+            by_hour, total = {}, 0
+            for _, _, mtime, size in self._iter_objects():
+                if retention_cutoff is not None and mtime < retention_cutoff:
+                    continue  # goes anyway; must not count towards the quota
+                hour = int(mtime // 3600)
+                by_hour[hour] = by_hour.get(hour, 0) + size
+                total += size
+
+            quota_cutoff = None
+            if self.quota_bytes > 0 and total > self.quota_bytes:
+                excess = total - self.quota_bytes * 0.9
+                for hour in sorted(by_hour):
+                    excess -= by_hour[hour]
+                    if excess <= 0:
+                        quota_cutoff = (hour + 1) * 3600
+                        break
+
+            removed, remaining = 0, total
+            if retention_cutoff is not None or quota_cutoff is not None:
+                for key, path, mtime, size in self._iter_objects():
+                    if retention_cutoff is not None and mtime < retention_cutoff:
+                        self._remove(key, path, "retention")
+                    elif quota_cutoff is not None and mtime < quota_cutoff:
+                        self._remove(key, path, "quota")
+                        remaining -= size
+                    else:
+                        continue
+                    removed += 1
+
+            STORE_BYTES.set(value=remaining)
+            return removed
+        finally:
+            lock.close()
+
+
+UPLOAD_STORE = UploadStore()
@@ -0,0 +1,15 @@
+# backend/wsgi.py
+import os
+
+from app import create_app
+from services import model_registry
+
+# Production entry point (see gunicorn.conf.py). Models are loaded
+# synchronously here rather than in a warmup thread: with preload_app the
+# master imports this module once, loads every read-only weight file, and
+# forked workers share those pages copy-on-write.
+app = create_app({"WARMUP_MODELS": False})
+
+if os.getenv("KRISHI_PRELOAD_MODELS", "1") == "1":
+    only = os.getenv("KRISHI_PRELOAD_ONLY")
+    model_registry.warmup(only.split(",") if only else None)
@@ -0,0 +1,139 @@
+"""
+Tail latency under overload, with and without per-model admission control.
+
+    python bench/admission_overload.py                     # 4x overload, 10 s
+    python bench/admission_overload.py --overload 2 --service-ms 120 --slots 4
+
+One model with --slots cores' worth of forward passes, each taking
+--service-ms when it has a core to itself. Requests arrive open-loop as a
+Poisson stream at --overload times capacity, 10% in the alert lane and 10%
+in the history lane. The same arrival schedule is served twice:
+
+  unlimited   every request starts its forward pass on arrival and the
+              cores are shared between everything running (processor
+              sharing) -- what happens today. Simulated exactly; running
+              it for real on a small box also starves the load generator.
+  admission   real threads through services.admission.Limiter
+              (concurrency --slots, bounded queue, --deadline-ms budget).
+              Never more than --slots passes at once, so a pass is a plain
+              sleep of --service-ms.
+
+Prints p50/p99 of the requests that got an answer and the share shed with
+503, per lane. Exits 1 when admitted p99 exceeds the deadline or alerts
+are shed more often than history requests.
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+sys.path.insert(0, BENCH_DIR)
+
+from load_test import percentile  # noqa: E402
+from services.admission import LANES, Limiter, Overloaded  # noqa: E402
+
+
+def schedule(rate, duration, rng):
+    t, out = 0.0, []
+    while True:
+        t += rng.expovariate(rate)
+        if t >= duration:
+            return out
+        x = rng.random()
+        out.append((t, "alert" if x < 0.1 else "history" if x < 0.2 else "interactive"))
+
+
+def processor_sharing(arrivals, service, slots):
+    """Latency of every request when all of them run at once on `slots` cores."""
+    results, active = [], {}        # request index -> remaining work (seconds)
+    now, i = 0.0, 0
+    while i < len(arrivals) or active:
+        rate = min(1.0, slots / len(active)) if active else 0.0
+        next_done = now + min(active.values()) / rate if active else float("inf")
+        next_arrival = arrivals[i][0] if i < len(arrivals) else float("inf")
+        step = min(next_done, next_arrival) - now
+        for j in active:
+            active[j] -= step * rate
+        now += step
+        if next_arrival <= next_done:
+            active[i] = service
+            i += 1
+        for j in [j for j, left in active.items() if left <= 1e-12]:
+            del active[j]
+            results.append((arrivals[j][1], now - arrivals[j][0]))
+    return results
+
+
+def with_admission(arrivals, service, limiter, deadline_s):
+    results = []        # (lane, latency or None when shed)
+    lock = threading.Lock()
+
+    def request(lane):
+        started = time.perf_counter()
+        try:
+            with limiter.slot(lane, started + deadline_s):
+                time.sleep(service)
+            latency = time.perf_counter() - started
+        except Overloaded:
+            latency = None
+        with lock:
+            results.append((lane, latency))
+
+    threads = []
+    origin = time.perf_counter()
+    for at, lane in arrivals:
+        delay = origin + at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        t = threading.Thread(target=request, args=(lane,), daemon=True)
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+    return results
+
+
+def report(name, results):
+    print(f"\n{name}")
+    summary = {}
+    for lane in ("all",) + LANES:
+        picked = [lat for ln, lat in results if lane == "all" or ln == lane]
+        served = sorted(lat for lat in picked if lat is not None)
+        shed = 1 - len(served) / len(picked) if picked else 0.0
+        p50 = percentile(served, 0.5) * 1000 if served else float("nan")
+        p99 = percentile(served, 0.99) * 1000 if served else float("nan")
+        summary[lane] = (p99, shed)
+        print(f"  {lane:<12} n={len(picked):5d}  p50 {p50:9.1f} ms  p99 {p99:9.1f} ms  shed {shed:6.1%}")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--service-ms", type=float, default=60)
+    parser.add_argument("--slots", type=int, default=2)
+    parser.add_argument("--overload", type=float, default=4.0)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--deadline-ms", type=float, default=1000)
+    parser.add_argument("--queue", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=20240611)
+    args = parser.parse_args()
+
+    service = args.service_ms / 1000
+    rate = args.overload * args.slots / service
+    arrivals = schedule(rate, args.duration, random.Random(args.seed))
+    print(f"{args.slots} slots x {args.service_ms:g} ms -> capacity {args.slots / service:.0f} req/s; "
+          f"offering {rate:.0f} req/s ({args.overload:g}x) for {args.duration:g} s, {len(arrivals)} requests")
+
+    report("unlimited (processor sharing)", processor_sharing(arrivals, service, args.slots))
+
+    limiter = Limiter("bench", concurrency=args.slots, queue_size=args.queue)
+    admitted = report("admission", with_admission(arrivals, service, limiter, args.deadline_ms / 1000))
+
+    ok = admitted["all"][0] <= args.deadline_ms and admitted["alert"][1] <= admitted["history"][1]
+    print(f"\nadmitted p99 {admitted['all'][0]:.1f} ms vs deadline {args.deadline_ms:g} ms: {'OK' if ok else 'FAIL'}")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,128 @@
+"""
+Price-alert engine benchmark: 1M subscriptions against a snapshot refresh.
+
+    python bench/alert_engine.py                       # 1M alerts, 1% of quotes move
+    python bench/alert_engine.py --alerts 200000 --changed 0.05 --db
+
+Synthesizes subscriptions over the (commodity, state, district) keys in
+xyz.json and a second snapshot where a fraction of the market quotes move
+by up to +-15%. Times index build, snapshot diff (services.mandi_store) and matching, and compares
+matching against the naive "every alert against every changed quote" scan
+on a sample. With --db the full engine path (keyset load from SQLite,
+active check, outbox insert) is timed too.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+os.environ.setdefault("KRISHI_DB_BACKEND", "sqlite")
+
+from services.alerts import AlertEngine, AlertIndex, quote_moves  # noqa: E402
+from services.mandi_store import MandiStore  # noqa: E402
+
+
+def synth_alerts(records, n, rng):
+    keys = sorted({(r["commodity"], r["state"], r["district"]) for r in records})
+    districts, prices = {}, {}
+    for commodity, state, district in keys:
+        districts.setdefault((commodity, state), []).append(district)
+    for r in records:
+        prices.setdefault((r["commodity"], r["state"], r["district"]), int(r["modal_price"] or 0) or 1000)
+    for alert_id in range(1, n + 1):
+        commodity, state, district = rng.choice(keys)
+        if rng.random() < 0.2:
+            district = ""
+        kind = rng.choice(("above", "below", "change"))
+        base = prices[(commodity, state, district or rng.choice(districts[(commodity, state)]))]
+        if kind == "change":
+            threshold = rng.choice((2.0, 5.0, 10.0, 20.0))
+        else:
+            threshold = round(base * rng.uniform(0.85, 1.15))
+        yield alert_id, commodity, state, district, kind, threshold
+
+
+def moved_snapshot(records, fraction, rng):
+    out = []
+    for r in records:
+        if rng.random() < fraction and (r.get("modal_price") or "0").isdigit():
+            r = dict(r, modal_price=str(max(1, round(int(r["modal_price"]) * rng.uniform(0.85, 1.15)))))
+        out.append(r)
+    return out
+
+
+def naive_match(alerts, changes):
+    fired = set()
+    for alert_id, commodity, state, district, kind, threshold in alerts:
+        for (c, s, d, _), old, new, _ in changes:
+            if c != commodity or s != state or (district and d != district):
+                continue
+            if (kind == "above" and old < threshold <= new) or (kind == "below" and new <= threshold < old) \
+                    or (kind == "change" and abs(new - old) / old * 100 >= threshold):
+                fired.add(alert_id)
+    return fired
+
+
+def timed(label, fn):
+    started = time.perf_counter()
+    result = fn()
+    print(f"{label:<34} {(time.perf_counter() - started) * 1000:9.1f} ms")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--alerts", type=int, default=1_000_000)
+    parser.add_argument("--changed", type=float, default=0.01)
+    parser.add_argument("--db", action="store_true", help="also time the full SQLite-backed engine path")
+    parser.add_argument("--seed", type=int, default=20240611)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with open(os.path.join(ROOT, "xyz.json")) as f:
+        before = json.load(f)["records"]
+    after = moved_snapshot(before, args.changed, rng)
+
+    alerts = timed(f"synthesize {args.alerts:,} alerts", lambda: list(synth_alerts(before, args.alerts, rng)))
+    index = AlertIndex()
+    timed("build interval index", lambda: index.add_many(alerts))
+
+    store = MandiStore()
+    store.load(before)
+    diff = timed("diff + apply snapshot", lambda: store.load(after))
+    changes = quote_moves(diff)
+    fired = timed("match changed quotes", lambda: index.match(changes))
+    print(f"{len(store.latest_quotes()):,} quotes, {len(changes):,} moved, {len(fired):,} alerts fired")
+
+    sample = alerts[:20000]
+    sample_ids = {a[0] for a in sample}
+    naive = timed(f"naive scan ({len(sample):,} alerts)", lambda: naive_match(sample, changes))
+    assert naive == sample_ids & set(fired), "index and naive scan disagree"
+    print("naive scan agrees with the index on the sample")
+
+    if args.db:
+        from db.migrations import migrate
+        from db.sqlite_compat import connect
+
+        path = os.path.join(tempfile.mkdtemp(prefix="krishi-alerts-"), "bench.db")
+        conn = connect(path)
+        migrate(conn, backend="sqlite")
+        cur = conn.cursor()
+        timed("insert alerts into SQLite", lambda: (cur.executemany(
+            "INSERT INTO price_alerts (id, farmer_id, commodity, state, district, kind, threshold) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            [(a[0], a[0] % 50000 + 1) + a[1:] for a in alerts],
+        ), conn.commit()))
+
+        engine = AlertEngine(db_factory=lambda: connect(path), lock_path=path + ".lock")
+        written = timed("engine refresh (full load + match)", lambda: engine.on_diff(diff))
+        print(f"{written:,} outbox rows")
+        again = store.load(moved_snapshot(after, args.changed, rng))
+        written = timed("next refresh (incremental load)", lambda: engine.on_diff(again))
+        print(f"{written:,} outbox rows")
@@ -0,0 +1,176 @@
+"""
+Smoke test of the ASGI serving path (asgi.py) against the local stand-ins.
+
+    python bench/asgi_smoke.py
+    python bench/asgi_smoke.py --mode wsgi          # same checks on the gthread path
+
+Starts the fake data.gov.in / OpenAI servers and a seeded SQLite database
+(as run_bench.py does), boots the backend under gunicorn with
+KRISHI_SERVER=asgi and checks, over HTTP:
+
+  /market, /market/meta, /market/nearby, /market/export   async market routes
+  /register + /login                                      async auth (hash pool)
+  /farmer/<id>, /farmer/<id>/scans                        async DB pool
+  /chatbot, /chatbot/stream                               async OpenAI client, SSE
+  /health/live, /health/ready, /market/alerts, /metrics   Flask fallback via Dispatcher
+
+and that Dispatcher sends each path to the app it should. Exits 1 on the
+first failure.
+"""
+import argparse
+import gzip
+import http.client
+import json
+import os
+import sys
+import tempfile
+import uuid
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+BACKEND = os.path.join(ROOT, "backend")
+sys.path.insert(0, BENCH_DIR)
+
+import fake_datagov  # noqa: E402
+import fake_openai  # noqa: E402
+from async_capacity import start_server, stop_server  # noqa: E402
+from run_bench import BENCH_PASSWORD, free_port, seed_database  # noqa: E402
+
+ASYNC_PATHS = [("GET", "/market"), ("GET", "/market/export"), ("POST", "/login"),
+               ("POST", "/chatbot/stream"), ("GET", "/farmer/1")]
+FLASK_PATHS = [("GET", "/health/live"), ("GET", "/metrics"), ("POST", "/market/alerts"),
+               ("POST", "/crop/scan")]
+
+
+class Failed(Exception):
+    pass
+
+
+def call(port, method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    headers = dict(headers or {})
+    if body is not None and not isinstance(body, bytes):
+        body = json.dumps(body).encode()
+        headers.setdefault("Content-Type", "application/json")
+    conn.request(method, path, body=body, headers=headers)
+    response = conn.getresponse()
+    data = response.read()
+    conn.close()
+    return response, data
+
+
+def expect(name, response, data, status=200):
+    if response.status != status:
+        raise Failed(f"{name}: HTTP {response.status}, wanted {status}: {data[:300]!r}")
+    print(f"  ok  {name}  ({response.status}, {len(data)} bytes)")
+
+
+def check_dispatch():
+    """In-process: which app each path is routed to."""
+    from asgi import app
+
+    for method, path in ASYNC_PATHS:
+        if not app.is_async({"path": path, "method": method}):
+            raise Failed(f"dispatcher: {method} {path} should go to the Quart app")
+    for method, path in FLASK_PATHS:
+        if app.is_async({"path": path, "method": method}):
+            raise Failed(f"dispatcher: {method} {path} should fall back to Flask")
+    print(f"  ok  dispatcher routes {len(ASYNC_PATHS)} paths to Quart, {len(FLASK_PATHS)} to Flask")
+
+
+def check_http(port):
+    r, d = call(port, "GET", "/market?commodity=Onion&state=Maharashtra")
+    expect("GET /market", r, d)
+    if not json.loads(d)["markets"]:
+        raise Failed("/market returned no markets")
+
+    r, d = call(port, "GET", "/market/meta")
+    expect("GET /market/meta", r, d)
+    r, d = call(port, "GET", "/market/nearby?commodity=Onion&state=Maharashtra&district=Pune&radius_km=300")
+    expect("GET /market/nearby", r, d)
+
+    r, d = call(port, "GET", "/market/export?format=csv&fields=commodity,market,modal_price&state=Kerala",
+                headers={"Accept-Encoding": "gzip"})
+    expect("GET /market/export (gzip csv)", r, d)
+    rows = gzip.decompress(d).decode().splitlines()
+    if rows[0] != "commodity,market,modal_price" or len(rows) < 2:
+        raise Failed(f"/market/export: unexpected body {rows[:3]}")
+
+    email = f"smoke-{uuid.uuid4().hex[:8]}@bench.local"
+    r, d = call(port, "POST", "/register", {"name": "Smoke", "email": email, "password": "smoke-pass-123",
+                                            "phone": "9000000000", "location": "Pune"})
+    expect("POST /register", r, d, 201)
+    r, d = call(port, "POST", "/login", {"email": email, "password": "smoke-pass-123"})
+    expect("POST /login (new farmer)", r, d)
+    r, d = call(port, "POST", "/login", {"email": "farmer1@bench.local", "password": BENCH_PASSWORD})
+    expect("POST /login (seeded farmer)", r, d)
+    r, d = call(port, "POST", "/login", {"email": "farmer1@bench.local", "password": "wrong"})
+    expect("POST /login (wrong password)", r, d, 401)
+
+    r, d = call(port, "GET", "/farmer/1")
+    expect("GET /farmer/1", r, d)
+    r, d = call(port, "GET", "/farmer/1/scans?limit=5")
+    expect("GET /farmer/1/scans", r, d)
+
+    r, d = call(port, "POST", "/chatbot", {"message": "best fertilizer for wheat", "session_id": "smoke"})
+    expect("POST /chatbot", r, d)
+    r, d = call(port, "POST", "/chatbot/stream", {"message": "onion rate in Maharashtra mandi",
+                                                  "session_id": "smoke-stream"})
+    expect("POST /chatbot/stream", r, d)
+    events = [line.split(": ", 1)[1] for line in d.decode().splitlines() if line.startswith("event: ")]
+    if "token" not in events or events[-1] != "done":
+        raise Failed(f"/chatbot/stream: events {events[:5]}...{events[-2:]}")
+
+    r, d = call(port, "GET", "/health/live")
+    expect("GET /health/live (Flask)", r, d)
+    r, d = call(port, "GET", "/health/ready")
+    expect("GET /health/ready (Flask)", r, d)
+    r, d = call(port, "GET", "/market/alerts?farmer_id=1")
+    expect("GET /market/alerts (Flask)", r, d)
+    r, d = call(port, "GET", "/metrics")
+    expect("GET /metrics (Flask)", r, d)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--mode", choices=("asgi", "wsgi"), default="asgi")
+    parser.add_argument("--seed", type=int, default=20240611)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="krishi-smoke-")
+    datagov_port, openai_port = free_port(), free_port()
+    fake_datagov.serve(port=datagov_port)
+    fake_openai.serve(port=openai_port, first_token_ms=20, token_ms=2)
+    db_path = os.path.join(workdir, "farmer.db")
+    env = dict(
+        os.environ,
+        DATA_GOV_API_KEY="bench",
+        DATA_GOV_BASE_URL=f"http://127.0.0.1:{datagov_port}/resource/mandi",
+        OPENAI_API_KEY="bench",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{openai_port}/v1",
+        KRISHI_DB_BACKEND="sqlite",
+        KRISHI_SQLITE_PATH=db_path,
+        CHAT_SESSION_DB=os.path.join(workdir, "chat_sessions.db"),
+        KRISHI_PRELOAD_MODELS="0",
+        KRISHI_FAST_START="1",
+        KRISHI_HASH_WORKERS="0",
+        KRISHI_MANDI_REFRESH_SECONDS="0",
+    )
+    os.environ.update(env)
+    seed_database(db_path, args.seed)
+
+    try:
+        if args.mode == "asgi":
+            sys.path.insert(0, BACKEND)
+            os.chdir(BACKEND)
+            check_dispatch()
+        port = free_port()
+        proc = start_server(args.mode, 1, 4, port, env)
+        try:
+            check_http(port)
+        finally:
+            stop_server(proc)
+    except Failed as e:
+        print(f"FAIL {e}")
+        sys.exit(1)
+    print(f"{args.mode}: all checks passed")
@@ -0,0 +1,227 @@
+"""
+Concurrent-connection capacity of the sync (gthread) and async (ASGI) serving paths.
+
+    python bench/async_capacity.py                                # /chatbot, 500 ms upstream
+    python bench/async_capacity.py --route farmer --levels 64 256 1024
+    python bench/async_capacity.py --memory-mb 768 --workers 2 --json bench/async_capacity.json
+
+Starts the fake OpenAI / data.gov.in stand-ins and a seeded SQLite database
+(as run_bench.py does), then boots the backend under gunicorn once per mode
+and level:
+
+  wsgi    worker_class gthread; each worker gets ceil(level / workers)
+          threads, the only way the sync path can hold that many requests
+  asgi    KRISHI_SERVER=asgi (uvicorn workers, asgi.py)
+
+Each level keeps `level` client connections busy (closed loop, keep-alive)
+for --warmup untimed seconds, then --duration measured ones, and records
+req/s, p50/p99, errors and the servers' summed RSS. A level passes when p99 stays under --slo-ms, nothing
+failed and RSS stays inside --memory-mb; a mode's capacity is its highest
+passing level. /chatbot messages are unique so every one pays the upstream
+latency instead of hitting the response cache.
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+BACKEND = os.path.join(ROOT, "backend")
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, BACKEND)
+
+import fake_datagov  # noqa: E402
+import fake_openai  # noqa: E402
+from load_test import child_pids, memory_kb, percentile  # noqa: E402
+from run_bench import N_FARMERS, free_port, seed_database  # noqa: E402
+
+
+# ----------------------------------------------------
+# SERVER
+# ----------------------------------------------------
+def start_server(mode, workers, threads, port, env):
+    env = dict(env, PORT=str(port), WEB_CONCURRENCY=str(workers),
+               KRISHI_HTTP_THREADS=str(threads), KRISHI_SERVER=mode)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--access-logfile", "/dev/null"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{mode} server exited: {proc.stderr.read().decode()[-2000:]}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/health/live")
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            time.sleep(0.5)
+    proc.kill()
+    raise RuntimeError(f"{mode} server did not come up")
+
+
+def stop_server(proc):
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def server_rss_mb(pid):
+    return round(sum(memory_kb(p).get("VmRSS", 0) for p in [pid] + child_pids(pid)) / 1024, 1)
+
+
+# ----------------------------------------------------
+# LOAD
+# ----------------------------------------------------
+def make_request(route, rng):
+    if route == "chatbot":
+        body = json.dumps({"message": f"how do I look after my field {uuid.uuid4().hex}",
+                           "session_id": uuid.uuid4().hex}).encode()
+        return "POST", "/chatbot", body
+    if route == "farmer":
+        return "GET", f"/farmer/{rng.randint(1, N_FARMERS)}", None
+    return "GET", "/market?commodity=Onion&state=Maharashtra", None
+
+
+def run_level(port, route, connections, duration, seed, pid, warmup=0):
+    """
+    Closed loop over `connections` keep-alive connections. Requests started in
+    the first `warmup` seconds (connects, pool fills, first snapshot) are
+    not counted, so every level is measured at a steady state.
+    """
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    measure_at = time.perf_counter() + warmup
+    stop_at = measure_at + duration
+    peak = [0.0]
+
+    def client(i):
+        rng = random.Random(seed + i)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        while time.perf_counter() < stop_at:
+            method, path, body = make_request(route, rng)
+            started = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                ok = response.status < 500
+            except (OSError, http.client.HTTPException):
+                ok = False
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            if started < measure_at:
+                continue
+            with lock:
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors[0] += 1
+        conn.close()
+
+    def sample_memory():
+        time.sleep(warmup)
+        while time.perf_counter() < stop_at:
+            peak[0] = max(peak[0], server_rss_mb(pid))
+            time.sleep(0.5)
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(connections)]
+    threads.append(threading.Thread(target=sample_memory, daemon=True))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    return {
+        "connections": connections,
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+        "rss_mb": peak[0],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--route", choices=("chatbot", "farmer", "market"), default="chatbot")
+    parser.add_argument("--levels", nargs="*", type=int, default=[16, 64, 256, 512, 1024])
+    parser.add_argument("--modes", nargs="*", choices=("wsgi", "asgi"), default=["wsgi", "asgi"])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--upstream-ms", type=int, default=500, help="fake OpenAI latency")
+    parser.add_argument("--slo-ms", type=float, help="p99 bound for a passing level (default 2x upstream)")
+    parser.add_argument("--memory-mb", type=float, default=1024)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--warmup", type=float, default=3, help="untimed seconds at full concurrency first")
+    parser.add_argument("--seed", type=int, default=20240611)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+    slo_ms = args.slo_ms or 2 * args.upstream_ms
+
+    workdir = tempfile.mkdtemp(prefix="krishi-capacity-")
+    datagov_port, openai_port = free_port(), free_port()
+    fake_datagov.serve(port=datagov_port)
+    fake_openai.serve(port=openai_port, first_token_ms=args.upstream_ms, token_ms=0)
+    db_path = os.path.join(workdir, "farmer.db")
+    seed_database(db_path, args.seed)
+
+    env = dict(
+        os.environ,
+        DATA_GOV_API_KEY="bench",
+        DATA_GOV_BASE_URL=f"http://127.0.0.1:{datagov_port}/resource/mandi",
+        OPENAI_API_KEY="bench",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{openai_port}/v1",
+        KRISHI_DB_BACKEND="sqlite",
+        KRISHI_SQLITE_PATH=db_path,
+        CHAT_SESSION_DB=os.path.join(workdir, "chat_sessions.db"),
+        KRISHI_PRELOAD_MODELS="0",
+        KRISHI_FAST_START="1",
+        KRISHI_HASH_WORKERS="0",
+        KRISHI_MANDI_REFRESH_SECONDS="0",
+    )
+
+    results = {}
+    for mode in args.modes:
+        results[mode] = []
+        for level in args.levels:
+            port = free_port()
+            threads = math.ceil(level / args.workers) if mode == "wsgi" else 4
+            proc = start_server(mode, args.workers, threads, port, env)
+            try:
+                row = run_level(port, args.route, level, args.duration, args.seed, proc.pid, args.warmup)
+            finally:
+                stop_server(proc)
+            row["threads_per_worker"] = threads if mode == "wsgi" else None
+            row["passed"] = (not row["errors"] and row["p99_ms"] is not None
+                             and row["p99_ms"] <= slo_ms and row["rss_mb"] <= args.memory_mb)
+            results[mode].append(row)
+            print(f"{mode:5s} {level:5d} conns  {row['rps']:8.1f} req/s  p50 {row['p50_ms']} ms  "
+                  f"p99 {row['p99_ms']} ms  errors {row['errors']}  rss {row['rss_mb']} MB  "
+                  f"{'ok' if row['passed'] else 'FAIL'}")
+            if not row["passed"]:
+                break
+
+    print(f"\n/{args.route}, {args.workers} workers, upstream {args.upstream_ms} ms, "
+          f"p99 <= {slo_ms:g} ms, RSS <= {args.memory_mb:g} MB")
+    for mode, rows in results.items():
+        passing = [r["connections"] for r in rows if r["passed"]]
+        print(f"  {mode:5s} capacity: {max(passing) if passing else 0} concurrent connections")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
@@ -0,0 +1,155 @@
+"""
+Cold start of the Flask app: import cost and time to the first /health/live.
+
+    python bench/cold_start.py
+    python bench/cold_start.py --backend /path/to/other/checkout/backend --runs 5
+
+For each run, in fresh processes:
+
+  import app     python -X importtime -c "import app": wall time and the
+                 summed cumulative time of the top-level imports, plus the
+                 heaviest second-level ones
+  build app      import plus app construction (create_app() when the
+                 module has one, else its module-level app)
+  first live     process start until /health/live answers over HTTP on the
+                 dev server; any response counts, so trees without the
+                 route are measured to "serving requests"
+  ready          until /health/ready returns 200 (models warm), when the
+                 tree has that route
+
+Model weights that are not checked in (best.pt, yolov8n.pt, the ImageNet
+EfficientNet) must be on disk for trees that load them at import.
+"""
+import argparse
+import http.client
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from run_bench import free_port  # noqa: E402
+
+IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+BUILD_APP = (
+    "import app as m\n"
+    "a = m.create_app() if hasattr(m, 'create_app') else m.app\n"
+)
+SERVE_APP = BUILD_APP + "a.run(port={port}, debug=False, use_reloader=False)\n"
+
+
+def import_profile(cwd, env):
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"],
+                          cwd=cwd, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if proc.returncode:
+        raise SystemExit(f"import app failed:\n{proc.stderr[-2000:]}")
+    top, children = [], []
+    for line in proc.stderr.splitlines():
+        m = IMPORTTIME_RE.match(line)
+        if not m:
+            continue
+        # one space before a top-level name, two more per nesting level
+        if len(m.group(3)) == 1:
+            top.append(int(m.group(2)))
+        elif len(m.group(3)) == 3:
+            children.append((int(m.group(2)), m.group(4)))
+    return wall, sum(top) / 1e6, sorted(children, reverse=True)[:5]
+
+
+def build_time(cwd, env):
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", BUILD_APP], cwd=cwd, env=env, capture_output=True, text=True)
+    if proc.returncode:
+        raise SystemExit(f"building the app failed:\n{proc.stderr[-2000:]}")
+    return time.perf_counter() - started
+
+
+def get(port, path):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        conn.request("GET", path)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def serve_times(cwd, env, timeout):
+    port = free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", SERVE_APP.format(port=port)], cwd=cwd, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    live = ready = None
+    try:
+        while time.perf_counter() - started < timeout and proc.poll() is None:
+            try:
+                if live is None:
+                    get(port, "/health/live")
+                    live = time.perf_counter() - started
+                status = get(port, "/health/ready")
+                if status == 404:
+                    break
+                if status == 200:
+                    ready = time.perf_counter() - started
+                    break
+            except OSError:
+                pass
+            time.sleep(0.01)
+    finally:
+        proc.terminate()
+        proc.wait()
+    return live, ready
+
+
+def fmt(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return "     n/a"
+    return f"{statistics.median(values):7.2f}s (min {min(values):.2f}, max {max(values):.2f})"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--backend", default=os.path.join(ROOT, "backend"))
+    parser.add_argument("--cwd", default=None, help="working directory (default: --backend)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    cwd = args.cwd or args.backend
+    env = dict(
+        os.environ,
+        PYTHONPATH=args.backend,
+        # older trees build the OpenAI client at import; nothing is called
+        OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "bench"),
+        DATA_GOV_API_KEY=os.environ.get("DATA_GOV_API_KEY", "bench"),
+        KRISHI_MANDI_REFRESH_SECONDS="0",
+    )
+
+    imports, summed, builds, lives, readies = [], [], [], [], []
+    heaviest = []
+    for _ in range(args.runs):
+        wall, total, heaviest = import_profile(cwd, env)
+        imports.append(wall)
+        summed.append(total)
+        builds.append(build_time(cwd, env))
+        live, ready = serve_times(cwd, env, args.timeout)
+        lives.append(live)
+        readies.append(ready)
+
+    print(f"{args.backend}, {args.runs} runs (median)")
+    print(f"import app     {fmt(imports)}   importtime total {statistics.median(summed):.2f}s")
+    for us, name in heaviest:
+        print(f"                 {us / 1e6:6.2f}s  {name}")
+    print(f"build app      {fmt(builds)}")
+    print(f"first live     {fmt(lives)}")
+    print(f"ready          {fmt(readies)}")
@@ -0,0 +1,114 @@
+"""
+Wall time of prepare_dataset.py on a large PlantVillage-style tree.
+
+    python bench/dataset_prep.py                         # 50k images, 38 classes
+    python bench/dataset_prep.py --images 10000 --workers 4
+
+Writes a synthetic raw tree (256x256 JPEGs like PlantVillage's, each one
+distinct, plus 1% byte-identical copies) under --work, then times:
+
+  first run     hash, dedup, split and resize everything
+  rerun         nothing changed: scan + manifest only
+  incremental   after adding 1% new images and deleting 1%
+
+The tree is kept between invocations, so only the first one pays for
+generating it.
+"""
+import argparse
+import functools
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT, "backend", "models", "crops_classification"))
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+import prepare_dataset  # noqa: E402
+
+
+def write_image(path, rng):
+    img = Image.new("RGB", (256, 256), tuple(rng.randrange(40, 120) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(6):
+        x, y = rng.randrange(200), rng.randrange(200)
+        draw.ellipse((x, y, x + rng.randrange(20, 56), y + rng.randrange(20, 56)),
+                     fill=tuple(rng.randrange(256) for _ in range(3)))
+    img.save(path, "JPEG", quality=90)
+
+
+def class_dirs(src, classes):
+    return [os.path.join(src, "color", f"Crop{c // 4}___Condition_{c % 4}") for c in range(classes)]
+
+
+def build_tree(src, images, classes, rng):
+    dirs = class_dirs(src, classes)
+    for i in range(images):
+        cls_dir = dirs[i % classes]
+        os.makedirs(cls_dir, exist_ok=True)
+        write_image(os.path.join(cls_dir, f"img_{i:06d}.jpg"), rng)
+    # byte-identical copies under other names, as in the raw dataset
+    for i in rng.sample(range(images), images // 100):
+        cls_dir = dirs[i % classes]
+        shutil.copyfile(os.path.join(cls_dir, f"img_{i:06d}.jpg"), os.path.join(cls_dir, f"copy_{i:06d}.jpg"))
+
+
+def timed(label, fn):
+    started = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - started
+    print(f"{label:12s} {seconds:8.1f} s")
+    return seconds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--images", type=int, default=50_000)
+    parser.add_argument("--classes", type=int, default=38)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--work", default=os.path.join(tempfile.gettempdir(), "krishi-dataset-prep"))
+    parser.add_argument("--seed", type=int, default=20240611)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    src = os.path.join(args.work, f"raw-{args.images}")
+    out = os.path.join(args.work, "out")
+    # keep the checked-in data.yml untouched
+    prepare_dataset.write_data_yml = functools.partial(
+        prepare_dataset.write_data_yml, path=os.path.join(args.work, "data.yml"))
+    if not os.path.isdir(src):
+        started = time.perf_counter()
+        build_tree(src, args.images, args.classes, rng)
+        print(f"generated {args.images:,} images in {time.perf_counter() - started:.0f} s -> {src}")
+    shutil.rmtree(out, ignore_errors=True)
+
+    print(f"{args.images:,} images, {args.classes} classes, {args.workers or os.cpu_count()} workers")
+    run = lambda: prepare_dataset.prepare(src, out, workers=args.workers)  # noqa: E731
+    timed("first run", run)
+    timed("rerun", run)
+
+    # 1% new, 1% deleted; restored afterwards so the tree stays reusable
+    dirs = class_dirs(src, args.classes)
+    added = []
+    for i in range(args.images // 100):
+        path = os.path.join(dirs[i % len(dirs)], f"new_{i:06d}.jpg")
+        write_image(path, rng)
+        added.append(path)
+    stash = os.path.join(args.work, "stash")
+    os.makedirs(stash, exist_ok=True)
+    removed = []
+    for i in rng.sample(range(args.images), args.images // 100):
+        orig = os.path.join(dirs[i % len(dirs)], f"img_{i:06d}.jpg")
+        removed.append((orig, os.path.join(stash, os.path.basename(orig))))
+        shutil.move(*removed[-1])
+    timed("incremental", run)
+
+    for path in added:
+        os.remove(path)
+    for orig, stashed in removed:
+        shutil.move(stashed, orig)
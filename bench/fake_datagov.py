@@ -0,0 +1,100 @@
+"""
+Local stand-in for the data.gov.in mandi price resource.
+
+    python bench/fake_datagov.py --port 8090
+    DATA_GOV_BASE_URL=http://127.0.0.1:8090/resource/mandi DATA_GOV_API_KEY=bench ...
+
+Serves the bundled xyz.json snapshot (optionally replicated --scale times
+with distinct market names) and honours the limit/offset query params the
+real API uses.
+"""
+import argparse
+import copy
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SNAPSHOT_PATH = os.path.join(ROOT, "xyz.json")
+
+
+def load_snapshot(path=SNAPSHOT_PATH, scale=1):
+    with open(path) as f:
+        snapshot = json.load(f)
+
+    records = snapshot.get("records", [])
+    if scale > 1:
+        scaled = list(records)
+        for i in range(1, scale):
+            for r in records:
+                r = dict(r)
+                r["market"] = f"{r['market']} #{i}"
+                scaled.append(r)
+        records = scaled
+
+    snapshot = copy.copy(snapshot)
+    snapshot["records"] = records
+    snapshot["total"] = len(records)
+    return snapshot
+
+
+def make_handler(snapshot, latency_ms=0):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if not url.path.startswith("/resource/"):
+                self.send_error(404)
+                return
+
+            params = parse_qs(url.query)
+            if not params.get("api-key"):
+                self.send_error(403)
+                return
+
+            limit = int((params.get("limit") or ["10"])[0])
+            offset = int((params.get("offset") or ["0"])[0])
+            records = snapshot["records"][offset:offset + limit]
+
+            body = dict(snapshot)
+            body.update({"records": records, "count": len(records),
+                         "limit": str(limit), "offset": str(offset)})
+            payload = json.dumps(body).encode()
+
+            if latency_ms:
+                time.sleep(latency_ms / 1000)
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return Handler
+
+
+def serve(host="127.0.0.1", port=8090, scale=1, latency_ms=0):
+    server = ThreadingHTTPServer((host, port), make_handler(load_snapshot(scale=scale), latency_ms))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--latency-ms", type=int, default=0)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(
+        (args.host, args.port),
+        make_handler(load_snapshot(scale=args.scale), args.latency_ms)
+    )
+    print(f"Fake data.gov.in on http://{args.host}:{args.port}/resource/mandi")
+    server.serve_forever()
@@ -0,0 +1,121 @@
+"""
+Minimal OpenAI-compatible chat completions server for local testing.
+
+    python bench/fake_openai.py --port 8089 --first-token-ms 300 --token-ms 20
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=test python backend/app.py
+
+Supports POST /v1/chat/completions with and without "stream": true.
+The reply echoes the last user message so responses are deterministic.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY_TEMPLATE = "KrishiSarthi test reply about: {message}. Water early, check soil moisture."
+
+
+def reply_for(body):
+    messages = body.get("messages") or []
+    last_user = next(
+        (m.get("content", "") for m in reversed(messages) if m.get("role") == "user"),
+        ""
+    )
+    # intent prompts expect JSON back
+    system = " ".join(m.get("content", "") for m in messages if m.get("role") == "system")
+    if "Return ONLY JSON" in system:
+        return json.dumps({"intent": "general", "commodity": "", "location": ""})
+    return REPLY_TEMPLATE.format(message=last_user[:80])
+
+
+def make_handler(first_token_ms, token_ms):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self.send_error(404)
+                return
+
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            text = reply_for(body)
+            model = body.get("model", "gpt-4o-mini")
+            created = int(time.time())
+
+            time.sleep(first_token_ms / 1000)
+
+            if not body.get("stream"):
+                payload = json.dumps({
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": text},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+
+            def chunk(delta, finish=None):
+                data = json.dumps({
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]
+                })
+                self.wfile.write(f"data: {data}\n\n".encode())
+                self.wfile.flush()
+
+            chunk({"role": "assistant", "content": ""})
+            for i, word in enumerate(text.split(" ")):
+                if i:
+                    time.sleep(token_ms / 1000)
+                chunk({"content": word if i == 0 else " " + word})
+            chunk({}, finish="stop")
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+    return Handler
+
+
+def serve(host="127.0.0.1", port=8089, first_token_ms=300, token_ms=20):
+    server = ThreadingHTTPServer((host, port), make_handler(first_token_ms, token_ms))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--first-token-ms", type=int, default=300)
+    parser.add_argument("--token-ms", type=int, default=20)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(
+        (args.host, args.port), make_handler(args.first_token_ms, args.token_ms)
+    )
+    print(f"Fake OpenAI server on http://{args.host}:{args.port}/v1")
+    server.serve_forever()
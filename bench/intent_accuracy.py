@@ -0,0 +1,74 @@
+"""
+Accuracy of the local chatbot intent classifier (services/intent.py).
+
+    python bench/intent_accuracy.py
+    python bench/intent_accuracy.py --sample my_labels.csv --snapshot other.json
+
+Runs classify() over a hand-labelled sample (bench/intent_sample.csv:
+message, intent, commodity, location) against the gazetteer built from a
+mandi snapshot (xyz.json by default). An empty commodity or location in
+the sample means "not checked". Reports intent accuracy, intent+entity
+accuracy, how many messages would go to the LLM fallback (ambiguous), and
+the per-message cost. Every miss and every fallback is listed.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+from services.intent import Gazetteer, classify  # noqa: E402
+
+
+def load_sample(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sample", default=os.path.join(BENCH_DIR, "intent_sample.csv"))
+    parser.add_argument("--snapshot", default=os.path.join(ROOT, "xyz.json"))
+    parser.add_argument("--repeat", type=int, default=200, help="passes for the timing")
+    args = parser.parse_args()
+
+    with open(args.snapshot) as f:
+        records = json.load(f)["records"]
+    sample = load_sample(args.sample)
+
+    intent_ok = all_ok = 0
+    fallbacks = []
+    for row in sample:
+        got = classify(row["message"], records)
+        good_intent = got["intent"] == row["intent"]
+        good_entities = all(not row[k] or got[k] == row[k] for k in ("commodity", "location"))
+        intent_ok += good_intent
+        all_ok += good_intent and good_entities
+        if not (good_intent and good_entities):
+            print(f"  miss      {row['message']!r}: wanted {row['intent']}/{row['commodity']}/"
+                  f"{row['location']}, got {got['intent']}/{got['commodity']}/{got['location']}")
+        if got["ambiguous"]:
+            fallbacks.append(row["message"])
+            print(f"  fallback  {row['message']!r}")
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        for row in sample:
+            classify(row["message"], records)
+    per_message = (time.perf_counter() - started) / (args.repeat * len(sample))
+
+    started = time.perf_counter()
+    Gazetteer(records)
+    build = time.perf_counter() - started
+
+    n = len(sample)
+    print(f"{n} messages, {len(records):,} snapshot records")
+    print(f"intent            {intent_ok}/{n}")
+    print(f"intent+entities   {all_ok}/{n}")
+    print(f"LLM fallback      {len(fallbacks)}/{n}")
+    print(f"classify()        {per_message * 1e6:.1f} us/message; gazetteer build {build * 1000:.0f} ms")
@@ -0,0 +1,195 @@
+"""
+Closed-loop load test for the image endpoints of a running backend.
+
+    cd backend && gunicorn -c gunicorn.conf.py &
+    python bench/load_test.py --url http://127.0.0.1:5000 --concurrency 8 --duration 30
+
+Posts the bundled PlantVillage / soil sample images to /classify,
+/scan-crop, /soil/analyze and /wildlife/detect and prints requests/s and
+latency percentiles per endpoint. With --master-pid (or by finding the
+gunicorn master automatically) it also prints RSS and PSS for every
+worker; PSS counts shared copy-on-write pages once, so it shows how much
+of the preloaded model memory the workers actually share. For a
+single-process server (the dev server) pass its pid as --master-pid.
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LEAF_IMAGES = glob.glob(os.path.join(
+    ROOT, "backend", "models", "crops_classification", "data", "PlantVillage", "*", "*", "*.jpeg"
+))
+SOIL_IMAGES = glob.glob(os.path.join(ROOT, "training", "soil_dataset", "*", "*.jpeg"))
+
+ENDPOINTS = {
+    "/classify": (LEAF_IMAGES, {}),
+    "/scan-crop": (LEAF_IMAGES, {}),
+    "/soil/analyze": (SOIL_IMAGES, {"ph": "6.8", "color": "brown"}),
+    "/wildlife/detect": (LEAF_IMAGES + SOIL_IMAGES, {}),
+}
+
+
+def multipart(path, fields):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n{value}\r\n".encode()
+        )
+    with open(path, "rb") as f:
+        data = f.read()
+    parts.append(
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"image\"; "
+        f"filename=\"{os.path.basename(path)}\"\r\nContent-Type: image/jpeg\r\n\r\n".encode()
+        + data + b"\r\n"
+    )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    idx = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def run_endpoint(base_url, endpoint, concurrency, duration, seed):
+    images, fields = ENDPOINTS[endpoint]
+    if not images:
+        return {"endpoint": endpoint, "error": "no sample images found"}
+
+    bodies = [multipart(p, fields) for p in images]
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(i):
+        # one generator per thread: a shared Random interleaves draws in
+        # scheduling order, so the same seed gave a different mix each run
+        rng = random.Random(seed + i)
+        local = []
+        local_errors = 0
+        while time.perf_counter() < deadline:
+            body, ctype = bodies[rng.randrange(len(bodies))]
+            req = urllib.request.Request(
+                base_url + endpoint, data=body, headers={"Content-Type": ctype}
+            )
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(req, timeout=120) as r:
+                    r.read()
+            except (urllib.error.URLError, OSError):
+                local_errors += 1
+                continue
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1) if latencies else None,
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+    }
+
+
+# ----------------------------------------------------
+# WORKER MEMORY (Linux /proc)
+# ----------------------------------------------------
+def find_gunicorn_master():
+    try:
+        out = subprocess.run(
+            ["pgrep", "-o", "-f", "gunicorn"], capture_output=True, text=True
+        ).stdout.split()
+        return int(out[0]) if out else None
+    except (OSError, ValueError):
+        return None
+
+
+def child_pids(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def memory_kb(pid):
+    mem = {}
+    for path, keys in ((f"/proc/{pid}/status", ("VmRSS",)),
+                       (f"/proc/{pid}/smaps_rollup", ("Pss",))):
+        try:
+            with open(path) as f:
+                for line in f:
+                    key = line.split(":", 1)[0]
+                    if key in keys:
+                        mem[key] = int(line.split()[1])
+        except OSError:
+            pass
+    return mem
+
+
+def worker_memory(master_pid):
+    if not master_pid:
+        return []
+    # a single-process server (python app.py) has no workers: report itself
+    return [
+        {"pid": pid, "rss_mb": round(m.get("VmRSS", 0) / 1024, 1),
+         "pss_mb": round(m.get("Pss", 0) / 1024, 1)}
+        for pid in child_pids(master_pid) or [master_pid]
+        for m in [memory_kb(pid)]
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--endpoints", nargs="*", default=list(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--master-pid", type=int)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    master = args.master_pid or find_gunicorn_master()
+    results = {"endpoints": [], "workers_before": worker_memory(master)}
+
+    for ep in args.endpoints:
+        res = run_endpoint(args.url, ep, args.concurrency, args.duration, args.seed)
+        results["endpoints"].append(res)
+        print(json.dumps(res))
+
+    results["workers_after"] = worker_memory(master)
+    for w in results["workers_after"]:
+        print(f"worker {w['pid']}: RSS {w['rss_mb']} MB, PSS {w['pss_mb']} MB")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
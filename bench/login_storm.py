@@ -0,0 +1,137 @@
+"""
+Login-storm benchmark: many farmers hitting /login at once.
+
+    python bench/login_storm.py                          # inline vs pool, c=8,32,64
+    python bench/login_storm.py --modes pool --hash-workers 8 --concurrency 128
+
+Each mode runs in a fresh process (the hashing settings are read at import)
+against the same seeded SQLite stack as run_bench.py. "inline" hashes in
+the request thread (KRISHI_HASH_WORKERS=0); "pool" uses the bounded
+process pool. Reports req/s, p50/p95/p99 and how many requests were shed
+with 503.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from load_test import percentile  # noqa: E402
+
+
+def storm(base_url, emails, password, concurrency, duration, seed):
+    rng = random.Random(seed)
+    bodies = [json.dumps({"email": rng.choice(emails), "password": password}).encode()
+              for _ in range(256)]
+    latencies, shed, errors = [], [0], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(i):
+        local, local_shed, local_err = [], 0, 0
+        n = i
+        while time.perf_counter() < deadline:
+            req = urllib.request.Request(
+                base_url + "/login", data=bodies[n % len(bodies)], method="POST",
+                headers={"Content-Type": "application/json"},
+            )
+            n += concurrency
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(req, timeout=60) as r:
+                    r.read()
+                local.append(time.perf_counter() - started)
+            except urllib.error.HTTPError as e:
+                e.read()
+                if e.code == 503:
+                    local_shed += 1
+                else:
+                    local_err += 1
+            except OSError:
+                local_err += 1
+        with lock:
+            latencies.extend(local)
+            shed[0] += local_shed
+            errors[0] += local_err
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+
+    def ms(q):
+        v = percentile(latencies, q)
+        return round(v * 1000, 2) if v is not None else None
+
+    return {
+        "concurrency": concurrency,
+        "ok": len(latencies),
+        "shed_503": shed[0],
+        "errors": errors[0],
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "p50_ms": ms(0.50),
+        "p95_ms": ms(0.95),
+        "p99_ms": ms(0.99),
+    }
+
+
+def run_mode(args):
+    """Child process: boot the stack with the hashing env already set."""
+    import run_bench
+
+    base_url, servers = run_bench.start_stack(args.seed, tempfile.mkdtemp(prefix="krishi-login-"))
+    emails = [f"farmer{i}@bench.local" for i in range(run_bench.N_FARMERS)]
+
+    from services import passwords
+    passwords.warmup()
+    storm(base_url, emails, run_bench.BENCH_PASSWORD, 1, 1, args.seed)  # untimed
+
+    levels = [storm(base_url, emails, run_bench.BENCH_PASSWORD, c, args.duration, args.seed + c)
+              for c in args.concurrency]
+    for s in servers:
+        s.shutdown()
+    print(json.dumps(levels))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--modes", nargs="*", choices=["inline", "pool"], default=["inline", "pool"])
+    parser.add_argument("--concurrency", nargs="*", type=int, default=[8, 32, 64])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per level")
+    parser.add_argument("--hash-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--hash-method", default=None, help="KRISHI_PASSWORD_HASH for the run")
+    parser.add_argument("--seed", type=int, default=20240611)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_mode(args)
+        sys.exit(0)
+
+    results = {}
+    for mode in args.modes:
+        env = dict(os.environ, KRISHI_HASH_WORKERS="0" if mode == "inline" else str(args.hash_workers))
+        if args.hash_method:
+            env["KRISHI_PASSWORD_HASH"] = args.hash_method
+        cmd = [sys.executable, os.path.abspath(__file__), "--child", "--seed", str(args.seed),
+               "--duration", str(args.duration), "--concurrency", *map(str, args.concurrency)]
+        out = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True).stdout
+        results[mode] = json.loads(out.strip().splitlines()[-1])
+        for lvl in results[mode]:
+            print(f"{mode:7s} c={lvl['concurrency']:<4d} {lvl['throughput_rps']:>8} req/s  "
+                  f"p50 {lvl['p50_ms']}  p95 {lvl['p95_ms']}  p99 {lvl['p99_ms']} ms  "
+                  f"503 {lvl['shed_503']}  errors {lvl['errors']}")
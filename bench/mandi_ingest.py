@@ -0,0 +1,134 @@
+"""
+Mandi snapshot ingestion: whole-body json vs the streaming parser.
+
+    python bench/mandi_ingest.py                         # xyz.json + 1M-record synthetic file
+    python bench/mandi_ingest.py --records 200000 --chunk-kb 16
+
+Each file is parsed in a fresh interpreter per mode so peak RSS is that
+parse alone:
+
+  json     read the whole body, json.loads it, keep data["records"]
+           (what requests' r.json() did in fetch_raw_records)
+  stream   services.mandi_stream.iter_records over --chunk-kb reads
+           (what fetch_raw_records does now with iter_content)
+
+Reports parse time, peak RSS over the interpreter's baseline and the RSS
+still held by the parsed records afterwards. The synthetic file fans
+xyz.json out over extra markets and arrival dates with jittered prices,
+the way bench/snapshot_diff.py builds its snapshots.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+sys.path.insert(0, BENCH_DIR)
+
+from load_test import memory_kb  # noqa: E402
+from services import mandi_stream  # noqa: E402
+
+
+def write_synthetic(path, rows, seed):
+    with open(os.path.join(ROOT, "xyz.json")) as f:
+        snapshot = json.load(f)
+    templates = snapshot.pop("records")
+    rng = random.Random(seed)
+    with open(path, "w") as out:
+        head = json.dumps(dict(snapshot, total=rows, count=rows, limit=rows), indent=2)
+        out.write(head[:-2] + ',\n  "records": [\n')
+        for i in range(rows):
+            t = templates[i % len(templates)]
+            modal = int(t["modal_price"] or 0)
+            modal = max(1, modal + rng.randint(-modal // 10 - 1, modal // 10 + 1))
+            r = dict(
+                t,
+                market=f"{t['market']} {(i // len(templates)) % 20}",
+                arrival_date=f"{1 + (i // (20 * len(templates))) % 28:02d}/{1 + i % 12:02d}/2024",
+                min_price=str(max(1, modal - rng.randint(0, 500))),
+                max_price=str(modal + rng.randint(0, 500)),
+                modal_price=str(modal),
+            )
+            out.write(("    " if i == 0 else ",\n    ") + json.dumps(r))
+        out.write("\n  ]\n}\n")
+
+
+def rss_mb():
+    return memory_kb(os.getpid()).get("VmRSS", 0) / 1024
+
+
+def child(mode, path, chunk):
+    gc.collect()
+    baseline = rss_mb()
+    started = time.perf_counter()
+    if mode == "json":
+        with open(path, "rb") as f:
+            body = f.read()
+        data = json.loads(body)
+        records = data.get("records", [])
+        del body, data
+    else:
+        with open(path, "rb") as f:
+            records = list(mandi_stream.iter_records(mandi_stream.read_chunks(f, chunk)))
+    seconds = time.perf_counter() - started
+    gc.collect()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({
+        "records": len(records),
+        "seconds": round(seconds, 3),
+        "peak_mb": round(peak - baseline, 1),
+        "held_mb": round(rss_mb() - baseline, 1),
+    }))
+
+
+def run(mode, path, chunk):
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", mode, path, "--chunk-kb", str(chunk // 1024)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--records", type=int, default=1_000_000, help="synthetic file size (0 = skip)")
+    parser.add_argument("--chunk-kb", type=int, default=mandi_stream.CHUNK_SIZE // 1024)
+    parser.add_argument("--seed", type=int, default=20240611)
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    chunk = args.chunk_kb * 1024
+
+    if args.child:
+        child(*args.child, chunk)
+        sys.exit(0)
+
+    files = [("xyz.json", os.path.join(ROOT, "xyz.json"))]
+    workdir = tempfile.mkdtemp(prefix="krishi-ingest-")
+    if args.records:
+        path = os.path.join(workdir, "synthetic.json")
+        write_synthetic(path, args.records, args.seed)
+        files.append((f"synthetic {args.records:,}", path))
+
+    try:
+        for name, path in files:
+            print(f"\n{name} ({os.path.getsize(path) / 2**20:.1f} MB)")
+            rows = {mode: run(mode, path, chunk) for mode in ("json", "stream")}
+            for mode, row in rows.items():
+                print(f"  {mode:6s} {row['records']:9,d} records  {row['seconds']:7.2f} s  "
+                      f"{row['records'] / row['seconds']:10,.0f} rec/s  "
+                      f"peak +{row['peak_mb']:7.1f} MB  held +{row['held_mb']:7.1f} MB")
+            if rows["json"]["records"] != rows["stream"]["records"]:
+                print("  record counts differ")
+                sys.exit(1)
+    finally:
+        for name, path in files[1:]:
+            os.remove(path)
+        os.rmdir(workdir)
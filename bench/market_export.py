@@ -0,0 +1,139 @@
+"""
+/market/export throughput and memory: rows/s and RSS growth while streaming.
+
+    python bench/market_export.py                         # 1M-row snapshot, every format, gzip on/off
+    python bench/market_export.py --rows 200000 --fields commodity,market,modal_price
+    python bench/market_export.py --url http://127.0.0.1:5000 --format csv
+
+Builds a synthetic snapshot by fanning xyz.json out over extra markets and
+arrival dates (as bench/snapshot_diff.py does) and slims it the way
+fetch_raw_records does. It then drains services.mandi_export.stream for
+each format, with and without gzip, sampling RSS every chunk. "rss +"
+is the peak growth over the RSS before the export started; with the
+snapshot already held it should stay at a few MB however many rows go
+out.
+
+--url measures a running server instead: it streams GET /market/export
+and counts the rows as they arrive (the server exports its own snapshot).
+"""
+import argparse
+import http.client
+import os
+import random
+import sys
+import time
+import zlib
+from urllib.parse import urlencode, urlparse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+sys.path.insert(0, BENCH_DIR)
+
+import json  # noqa: E402
+
+from load_test import memory_kb  # noqa: E402
+from services import mandi_export  # noqa: E402
+from services.mandi_stream import Slimmer  # noqa: E402
+from snapshot_diff import synth_snapshot  # noqa: E402
+
+
+def rss_mb():
+    return memory_kb(os.getpid()).get("VmRSS", 0) / 1024
+
+
+def run_local(records, fmt, fields, compress):
+    args = {"format": fmt}
+    if fields:
+        args["fields"] = fields
+    params, error = mandi_export.parse_args(args, "gzip" if compress else "")
+    if error:
+        return {"error": error[0]["error"]}
+
+    before = rss_mb()
+    peak, sent = before, 0
+    rows_before = mandi_export.EXPORT_ROWS.value(fmt)
+    started = time.perf_counter()
+    for chunk in mandi_export.stream(records, params):
+        sent += len(chunk)
+        peak = max(peak, rss_mb())
+    seconds = time.perf_counter() - started
+    rows = mandi_export.EXPORT_ROWS.value(fmt) - rows_before
+    return {
+        "rows": int(rows),
+        "seconds": round(seconds, 2),
+        "rows_per_s": round(rows / seconds),
+        "mb_out": round(sent / 2**20, 1),
+        "rss_growth_mb": round(peak - before, 1),
+    }
+
+
+def run_http(url, fmt, fields, compress):
+    parsed = urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=300)
+    query = {"format": fmt}
+    if fields:
+        query["fields"] = fields
+    headers = {"Accept-Encoding": "gzip"} if compress else {}
+    started = time.perf_counter()
+    conn.request("GET", f"{parsed.path.rstrip('/')}/market/export?{urlencode(query)}", headers=headers)
+    response = conn.getresponse()
+    if response.status != 200:
+        return {"error": f"HTTP {response.status}: {response.read()[:200]!r}"}
+    inflate = zlib.decompressobj(31) if response.getheader("Content-Encoding") == "gzip" else None
+    received = lines = 0
+    while True:
+        chunk = response.read(64 * 1024)
+        if not chunk:
+            break
+        received += len(chunk)
+        if fmt != "arrow":
+            lines += (inflate.decompress(chunk) if inflate else chunk).count(b"\n")
+    seconds = time.perf_counter() - started
+    rows = lines - (fmt == "csv") if fmt != "arrow" else None
+    return {
+        "rows": rows,
+        "seconds": round(seconds, 2),
+        "rows_per_s": round(rows / seconds) if rows else None,
+        "mb_out": round(received / 2**20, 1),
+        "snapshot": response.getheader("X-Mandi-Snapshot"),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", nargs="*", choices=tuple(mandi_export.FORMATS), default=list(mandi_export.FORMATS))
+    parser.add_argument("--fields", default="", help="comma-separated projection (default: every field)")
+    parser.add_argument("--url", help="measure a running server instead")
+    parser.add_argument("--seed", type=int, default=20240611)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    if args.url:
+        print(f"{args.url}/market/export")
+        run, target = run_http, args.url
+    else:
+        with open(os.path.join(ROOT, "xyz.json")) as f:
+            templates = json.load(f)["records"]
+        slim = Slimmer()
+        target = [slim(r) for r in synth_snapshot(templates, args.rows, random.Random(args.seed))]
+        print(f"{len(target):,} snapshot rows, rss {rss_mb():.0f} MB, "
+              f"{mandi_export.BATCH_ROWS} rows per chunk, gzip level {mandi_export.GZIP_LEVEL}")
+        run = run_local
+
+    results = []
+    for fmt in args.format:
+        for compress in (False, True):
+            row = dict(format=fmt, gzip=compress, **run(target, fmt, args.fields, compress))
+            results.append(row)
+            if "error" in row:
+                print(f"  {fmt:6s} gzip={'on ' if compress else 'off'}  {row['error']}")
+                continue
+            print(f"  {fmt:6s} gzip={'on ' if compress else 'off'}  {row['rows'] or 0:9,d} rows  "
+                  f"{row['seconds']:6.2f} s  {row['rows_per_s'] or 0:9,d} rows/s  {row['mb_out']:7.1f} MB out"
+                  + (f"  rss +{row['rss_growth_mb']} MB" if "rss_growth_mb" in row else ""))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
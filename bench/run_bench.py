@@ -0,0 +1,346 @@
+"""
+Reproducible benchmark of every backend endpoint against local stand-ins.
+
+    python bench/run_bench.py --out bench/results.json
+    python bench/run_bench.py --baseline bench/baseline.json      # flag regressions
+    python bench/run_bench.py --routes market chatbot --concurrency 1 8 32
+
+Starts a fake data.gov.in server (xyz.json), a fake OpenAI server and a
+SQLite database seeded with farmers and crop_scans, then boots the Flask
+app in-process on a threaded WSGI server. Every route gets the same
+seeded workload at each concurrency level; results (p50/p95/p99, req/s,
+errors) are written as JSON and optionally compared to a stored baseline.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import socket
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+BACKEND = os.path.join(ROOT, "backend")
+sys.path.insert(0, BENCH_DIR)
+
+import fake_datagov  # noqa: E402
+import fake_openai  # noqa: E402
+from load_test import LEAF_IMAGES, SOIL_IMAGES, multipart, percentile  # noqa: E402
+
+BENCH_PASSWORD = "bench-password"
+N_FARMERS = 200
+
+CHAT_MESSAGES = [
+    "What is the tomato price today in Karnataka?",
+    "best fertilizer for wheat",
+    "onion rate in Maharashtra mandi",
+    "how do I treat late blight on potatoes",
+    "Will it rain in Guntur tomorrow?",
+    "cotton price in Gujarat",
+    "how much water does sugarcane need",
+]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# ----------------------------------------------------
+# STAND-INS
+# ----------------------------------------------------
+def seed_database(path, seed):
+    from werkzeug.security import generate_password_hash
+
+    rng = random.Random(seed)
+    snapshot = fake_datagov.load_snapshot()["records"]
+    places = sorted({(r["state"], r["district"]) for r in snapshot})
+    pw_hash = generate_password_hash(BENCH_PASSWORD)
+
+    # same schema + indexes as production
+    from db.migrations import migrate
+    from db.sqlite_compat import connect
+    migrate(connect(path), backend="sqlite")
+
+    conn = sqlite3.connect(path)
+    for i in range(N_FARMERS):
+        state, district = rng.choice(places)
+        conn.execute(
+            "INSERT INTO farmers (name, email, password_hash, phone, location, state, district) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (f"Farmer {i}", f"farmer{i}@bench.local", pw_hash, f"90000{i:05d}",
+             district, state, district)
+        )
+    for i in range(N_FARMERS * 10):
+        conn.execute(
+            "INSERT INTO crop_scans (farmer_id, image_path, crop_type, disease, confidence) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (rng.randint(1, N_FARMERS), f"scan_{i}.jpg", "Tomato", "Late_blight", rng.random())
+        )
+    conn.commit()
+    conn.close()
+
+
+def synthetic_soil_images(n, seed):
+    """Noisy brown/red/black JPEGs; falls back to the bundled soil samples."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return [open(p, "rb").read() for p in SOIL_IMAGES]
+
+    rng = random.Random(seed)
+    palette = [(110, 80, 50), (150, 60, 40), (40, 35, 30), (170, 140, 100)]
+    images = []
+    for _ in range(n):
+        base = rng.choice(palette)
+        img = Image.new("RGB", (320, 320), base)
+        px = img.load()
+        for x in range(0, 320, 2):
+            for y in range(0, 320, 2):
+                d = rng.randint(-25, 25)
+                px[x, y] = tuple(max(0, min(255, c + d)) for c in base)
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=85)
+        images.append(buf.getvalue())
+    return images
+
+
+def start_stack(seed, workdir):
+    datagov_port, openai_port, app_port = free_port(), free_port(), free_port()
+    datagov = fake_datagov.serve(port=datagov_port)
+    openai = fake_openai.serve(port=openai_port, first_token_ms=200, token_ms=10)
+
+    sys.path.insert(0, BACKEND)
+    db_path = os.path.join(workdir, "farmer.db")
+
+    # before anything imports db.*, so seeding and the app both see sqlite
+    os.environ.update({
+        "DATA_GOV_API_KEY": "bench",
+        "DATA_GOV_BASE_URL": f"http://127.0.0.1:{datagov_port}/resource/mandi",
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{openai_port}/v1",
+        "KRISHI_DB_BACKEND": "sqlite",
+        "KRISHI_SQLITE_PATH": db_path,
+        "CHAT_SESSION_DB": os.path.join(workdir, "chat_sessions.db"),
+    })
+    seed_database(db_path, seed)
+
+    os.chdir(BACKEND)
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    app = create_app({"FAST_START": True})
+    server = make_server("127.0.0.1", app_port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return f"http://127.0.0.1:{app_port}", [server, datagov, openai]
+
+
+# ----------------------------------------------------
+# WORKLOADS
+# ----------------------------------------------------
+def build_workloads(seed):
+    """route name -> list of (method, path, body, content_type) requests."""
+    rng = random.Random(seed)
+    records = fake_datagov.load_snapshot()["records"]
+    pairs = sorted({(r["commodity"], r["state"]) for r in records})
+
+    def pick_pairs(n):
+        return [rng.choice(pairs) for _ in range(n)]
+
+    def q(s):
+        return urllib.request.quote(s)
+
+    soil_images = synthetic_soil_images(8, seed)
+
+    def soil_form(data):
+        fd, path = tempfile.mkstemp(suffix=".jpg")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        body = multipart(path, {"ph": f"{rng.uniform(5.5, 8.0):.1f}", "color": rng.choice(["brown", "red", "black"])})
+        os.remove(path)
+        return body
+
+    leaf_forms = [multipart(p, {}) for p in LEAF_IMAGES]
+    scan_forms = [multipart(p, {"farmer_id": str(rng.randint(1, N_FARMERS))}) for p in LEAF_IMAGES]
+
+    return {
+        "health": [("GET", "/health/live", None, None)],
+        "market": [("GET", f"/market?commodity={q(c)}&state={q(s)}", None, None) for c, s in pick_pairs(64)],
+        "market_meta": [("GET", "/market/meta", None, None)],
+        "market_history": [("GET", f"/market/history?commodity={q(c)}&state={q(s)}", None, None) for c, s in pick_pairs(64)],
+        "market_nearby": [
+            ("GET", f"/market/nearby?commodity={q(c)}&farmer_id={rng.randint(1, N_FARMERS)}&radius_km=150", None, None)
+            for c, _ in pick_pairs(64)
+        ],
+        "farmer": [("GET", f"/farmer/{rng.randint(1, N_FARMERS)}", None, None) for _ in range(64)],
+        "farmer_scans": [("GET", f"/farmer/{rng.randint(1, N_FARMERS)}/scans?limit=20", None, None) for _ in range(64)],
+        "login": [
+            ("POST", "/login", json.dumps({"email": f"farmer{rng.randrange(N_FARMERS)}@bench.local",
+                                           "password": BENCH_PASSWORD}).encode(), "application/json")
+            for _ in range(32)
+        ],
+        "chatbot": [
+            ("POST", "/chatbot", json.dumps({"message": m, "session_id": f"bench-{i}"}).encode(), "application/json")
+            for i, m in enumerate(rng.choice(CHAT_MESSAGES) for _ in range(32))
+        ],
+        "classify": [("POST", "/classify", b, ct) for b, ct in leaf_forms],
+        "scan_crop": [("POST", "/scan-crop", b, ct) for b, ct in scan_forms],
+        "scan": [("POST", "/scan", b, ct) for b, ct in scan_forms],
+        "soil": [("POST", "/soil/analyze", *soil_form(d)) for d in soil_images],
+        "wildlife": [("POST", "/wildlife/detect", b, ct) for b, ct in leaf_forms],
+    }
+
+
+MODEL_ROUTES = {"classify", "scan_crop", "scan", "soil", "wildlife"}
+
+
+def run_level(base_url, requests_, concurrency, total, seed):
+    rng = random.Random(seed)
+    plan = [requests_[rng.randrange(len(requests_))] for _ in range(total)]
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    cursor = [0]
+
+    def worker():
+        local, local_errors = [], 0
+        while True:
+            with lock:
+                if cursor[0] >= len(plan):
+                    break
+                method, path, body, ctype = plan[cursor[0]]
+                cursor[0] += 1
+            headers = {"Content-Type": ctype} if ctype else {}
+            req = urllib.request.Request(base_url + path, data=body, method=method, headers=headers)
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(req, timeout=120) as r:
+                    r.read()
+                ok = True
+            except urllib.error.HTTPError as e:
+                e.read()
+                ok = e.code < 500
+            except OSError:
+                ok = False
+            elapsed = time.perf_counter() - started
+            if ok:
+                local.append(elapsed)
+            else:
+                local_errors += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+
+    def ms(q):
+        v = percentile(latencies, q)
+        return round(v * 1000, 2) if v is not None else None
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "ok": len(latencies),
+        "errors": errors[0],
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "p50_ms": ms(0.50),
+        "p95_ms": ms(0.95),
+        "p99_ms": ms(0.99),
+    }
+
+
+# ----------------------------------------------------
+# BASELINE COMPARISON
+# ----------------------------------------------------
+def compare(results, baseline, tolerance):
+    regressions = []
+    base_index = {
+        (r["route"], lvl["concurrency"]): lvl
+        for r in baseline.get("routes", []) for lvl in r["levels"]
+    }
+    for r in results["routes"]:
+        for lvl in r["levels"]:
+            base = base_index.get((r["route"], lvl["concurrency"]))
+            if not base:
+                continue
+            if base.get("p95_ms") and lvl.get("p95_ms") and lvl["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"{r['route']} c={lvl['concurrency']}: p95 {base['p95_ms']} -> {lvl['p95_ms']} ms"
+                )
+            if base.get("throughput_rps") and lvl["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+                regressions.append(
+                    f"{r['route']} c={lvl['concurrency']}: throughput "
+                    f"{base['throughput_rps']} -> {lvl['throughput_rps']} req/s"
+                )
+            if lvl["errors"] > base.get("errors", 0):
+                regressions.append(
+                    f"{r['route']} c={lvl['concurrency']}: errors {base.get('errors', 0)} -> {lvl['errors']}"
+                )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--url", help="benchmark an already running app instead of starting one")
+    parser.add_argument("--routes", nargs="*", help="subset of route names (default: all)")
+    parser.add_argument("--concurrency", nargs="*", type=int, default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=200, help="requests per level (I/O routes)")
+    parser.add_argument("--model-requests", type=int, default=40, help="requests per level (model routes)")
+    parser.add_argument("--seed", type=int, default=20240611)
+    parser.add_argument("--out", default=os.path.join(BENCH_DIR, "results.json"))
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="krishi-bench-")
+    if args.url:
+        base_url, servers = args.url, []
+    else:
+        base_url, servers = start_stack(args.seed, workdir)
+
+    workloads = build_workloads(args.seed)
+    routes = args.routes or list(workloads)
+
+    results = {"seed": args.seed, "started_at": time.time(), "routes": []}
+    for route in routes:
+        total = args.model_requests if route in MODEL_ROUTES else args.requests
+        # one untimed request so lazy models / caches don't skew level 1
+        run_level(base_url, workloads[route], 1, 1, args.seed)
+        levels = []
+        for c in args.concurrency:
+            res = run_level(base_url, workloads[route], c, total, args.seed + c)
+            levels.append(res)
+            print(f"{route:15s} c={c:<3d} {res['throughput_rps']:>8} req/s  "
+                  f"p50 {res['p50_ms']}  p95 {res['p95_ms']}  p99 {res['p99_ms']} ms  "
+                  f"errors {res['errors']}")
+        results["routes"].append({"route": route, "levels": levels})
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {args.out}")
+
+    for s in servers:
+        s.shutdown()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        sys.exit(1 if regressions else 0)
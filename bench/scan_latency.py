@@ -0,0 +1,78 @@
+"""
+End-to-end latency of /scan versus the two calls the UI used to make.
+
+    python bench/scan_latency.py --rounds 50
+    python bench/scan_latency.py --url http://127.0.0.1:5000 --images path/to/*.jpg
+
+For every image, times one POST /scan and, back to back, POST /classify
+followed by POST /scan-crop (what CropScanner did), then prints p50/p95/p99
+for both and the share of /scan requests that skipped disease detection.
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from load_test import LEAF_IMAGES, multipart, percentile  # noqa: E402
+
+
+def post(url, body, ctype):
+    req = urllib.request.Request(url, data=body, method="POST", headers={"Content-Type": ctype})
+    started = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=120) as r:
+        payload = json.loads(r.read())
+    return time.perf_counter() - started, payload
+
+
+def summarize(values):
+    values = sorted(values)
+    return {q: round(percentile(values, p) * 1000, 1) for q, p in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--url", help="running backend (default: start the run_bench stack)")
+    parser.add_argument("--images", nargs="*", help="image globs (default: bundled PlantVillage samples)")
+    parser.add_argument("--rounds", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=20240611)
+    args = parser.parse_args()
+
+    images = [p for g in (args.images or []) for p in glob.glob(g)] or LEAF_IMAGES
+    if args.url:
+        base_url = args.url
+    else:
+        import run_bench
+        base_url, _ = run_bench.start_stack(args.seed, tempfile.mkdtemp(prefix="krishi-scan-"))
+
+    rng = random.Random(args.seed)
+    forms = [multipart(p, {"farmer_id": "1"}) for p in images]
+
+    # untimed: load both models
+    body, ctype = forms[0]
+    post(base_url + "/scan", body, ctype)
+    post(base_url + "/classify", body, ctype)
+    post(base_url + "/scan-crop", body, ctype)
+
+    combined, separate, paths = [], [], {}
+    for _ in range(args.rounds):
+        body, ctype = rng.choice(forms)
+        elapsed, payload = post(base_url + "/scan", body, ctype)
+        combined.append(elapsed)
+        path = payload.get("disease_model", payload.get("status"))
+        paths[path] = paths.get(path, 0) + 1
+
+        a, _ = post(base_url + "/classify", body, ctype)
+        b, _ = post(base_url + "/scan-crop", body, ctype)
+        separate.append(a + b)
+
+    print(f"/scan                  {summarize(combined)} ms")
+    print(f"/classify + /scan-crop {summarize(separate)} ms")
+    print("disease paths:", paths)
@@ -0,0 +1,146 @@
+"""
+Snapshot refresh cost: incremental diff + in-place update vs full rebuild.
+
+    python bench/snapshot_diff.py                      # 1M rows, 1% changed
+    python bench/snapshot_diff.py --rows 200000 --changed 0.05
+
+Builds a synthetic snapshot by fanning xyz.json records out over extra
+markets and arrival dates, then a second one where --changed of the rows
+are updated (half), inserted (a quarter) or removed (a quarter). Times:
+
+  full rebuild   fresh MandiStore + meta payload + spatial index
+  incremental    diff against the held store, apply, refresh meta and
+                 move the changed markets in the spatial index
+
+and splits the incremental time into the O(rows) key diff and the
+O(changes) apply. It then checks that the incremental store serves exactly
+what the rebuilt one does: every /market group (market order included,
+since the trend reads the last two prices), the meta payload and the
+latest quote per market. Exits 1 on any difference.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+from services import geo  # noqa: E402
+from services.mandi_store import MandiStore  # noqa: E402
+
+
+def synth_snapshot(templates, rows, rng):
+    out = []
+    i = 0
+    while len(out) < rows:
+        for t in templates:
+            if len(out) == rows:
+                break
+            # spread over 20 sister markets per district and 30 arrival days
+            out.append(dict(
+                t,
+                market=f"{t['market']} {i % 20}",
+                arrival_date=f"{1 + (i // 20) % 28:02d}/{1 + (i // 560) % 12:02d}/2024",
+            ))
+            i += 1
+    return out
+
+
+def changed_snapshot(records, fraction, rng):
+    out, n_upd, n_del = [], 0, 0
+    for r in records:
+        x = rng.random()
+        if x < fraction / 4:
+            n_del += 1
+            continue
+        if x < fraction * 3 / 4 and (r.get("modal_price") or "").isdigit():
+            r = dict(r, modal_price=str(max(1, int(r["modal_price"]) + rng.randint(-300, 300))))
+            n_upd += 1
+        out.append(r)
+    inserted = [dict(r, arrival_date="28/12/2025") for r in rng.sample(records, int(len(records) * fraction / 4))]
+    return out + inserted, (len(inserted), n_upd, n_del)
+
+
+def compare(incremental, rebuilt):
+    """Differences between two stores holding the same snapshot, as strings."""
+    problems = []
+    groups = set(incremental._groups) | set(rebuilt._groups)
+    for state, commodity in sorted(groups):
+        if incremental.group(state, commodity) != rebuilt.group(state, commodity):
+            problems.append(f"group ({state}, {commodity})")
+    if incremental.meta() != rebuilt.meta():
+        problems.append("meta")
+    quotes = lambda store: {mk: q[:2] for mk, q in store.latest_quotes().items()}  # noqa: E731
+    if quotes(incremental) != quotes(rebuilt):
+        problems.append("latest quotes")
+    return problems
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--changed", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=20240611)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with open(os.path.join(ROOT, "xyz.json")) as f:
+        templates = json.load(f)["records"]
+    before = synth_snapshot(templates, args.rows, rng)
+    after, (n_ins, n_upd, n_del) = changed_snapshot(before, args.changed, rng)
+    print(f"{len(before):,} rows -> {len(after):,} rows (+{n_ins:,} ~{n_upd:,} -{n_del:,})")
+
+    # full rebuild of everything derived from the new snapshot
+    def rebuild():
+        store = MandiStore()
+        store.load(after)
+        store.meta()
+        geo.MarketIndex(store.latest_quotes(), store.seq)
+        return store
+
+    rebuilt, full_ms = timed(rebuild)
+
+    # incremental: start from a store + index holding the old snapshot
+    store = MandiStore()
+    store.load(before)
+    store.meta()
+    index = geo.MarketIndex(store.latest_quotes(), store.seq)
+
+    (rows, diff), diff_ms = timed(lambda: store.diff(after))
+
+    def apply():
+        with store._lock:
+            store.apply(rows, diff)
+            store.source = after
+        store.meta()
+        index.apply(diff.quote_changes, diff.seq)
+
+    _, apply_ms = timed(apply)
+
+    print(f"diff: +{len(diff.inserted):,} ~{len(diff.updated):,} -{len(diff.removed):,}, "
+          f"{len(diff.quote_changes):,} market quotes changed")
+    print(f"full rebuild      {full_ms:9.1f} ms")
+    print(f"incremental       {diff_ms + apply_ms:9.1f} ms  (key diff {diff_ms:.1f} ms + apply {apply_ms:.1f} ms)")
+
+    problems = compare(store, rebuilt)
+    # and back: removed rows return, so insertion order in the held store
+    # now differs from their position in the snapshot
+    store.load(before)
+    fresh = MandiStore()
+    fresh.load(before)
+    problems += [f"{p} after reverting" for p in compare(store, fresh)]
+    if problems:
+        print(f"incremental != rebuild in {len(problems)} places: {', '.join(problems[:5])}"
+              + (" ..." if len(problems) > 5 else ""))
+        sys.exit(1)
+    print(f"incremental == rebuild ({len(rebuilt._groups):,} groups, meta, latest quotes)")
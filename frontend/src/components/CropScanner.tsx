@@ -167,7 +167,7 @@ export default function CropScanner() {
 
   const postImage = async (form: FormData) => {
     // You can also point this directly to one endpoint if you finalize your backend.
-    const endpoints = ["/classify", "/scan-crop"];
+    const endpoints = ["/scan", "/classify", "/scan-crop"];
     for (const ep of endpoints) {
       try {
         // Assume API is running on localhost:5000
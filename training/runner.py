@@ -0,0 +1,232 @@
+"""
+Shared training loop for the soil scripts.
+
+    python training/train_classifier.py --data-dir training/soil_dataset --epochs 20
+    python training/train_classifier.py --resume            # continue an interrupted run
+
+Each script builds its modules and a `step(batch)` function returning
+(loss, batch_size); the runner owns everything else: autocast (bf16 on CPU
+and on GPUs that support it, fp16 + GradScaler otherwise), cosine LR,
+train/val split, early stopping on val loss, atomic periodic checkpoints
+with --resume, optional torch.compile, and per-epoch samples/s.
+"""
+import argparse
+import contextlib
+import os
+import random
+import time
+
+import numpy as np
+import torch
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# ----------------------------------------------------
+# CLI
+# ----------------------------------------------------
+def build_parser(description, name, epochs, batch_size, lr):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--data-dir", default=os.path.join(HERE, "soil_dataset"))
+    parser.add_argument("--run-dir", default=os.path.join(HERE, "runs", name),
+                        help="checkpoints and final weights go here")
+    parser.add_argument("--epochs", type=int, default=epochs)
+    parser.add_argument("--batch-size", type=int, default=batch_size)
+    parser.add_argument("--lr", type=float, default=lr)
+    parser.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 1))
+    parser.add_argument("--val-split", type=float, default=0.15)
+    parser.add_argument("--patience", type=int, default=4,
+                        help="epochs without val improvement before stopping (0 = off)")
+    parser.add_argument("--precision", choices=["auto", "bf16", "fp16", "fp32"], default="auto")
+    parser.add_argument("--compile", action="store_true", help="torch.compile the model (torch>=2)")
+    parser.add_argument("--checkpoint-every", type=int, default=1, help="epochs between checkpoints")
+    parser.add_argument("--resume", action="store_true", help="resume from <run-dir>/last.pt")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+def pick_device():
+    return torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+
+def seed_everything(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+def split_indices(indices, val_fraction, seed=0):
+    indices = np.asarray(indices)
+    if val_fraction <= 0 or len(indices) < 2:
+        return indices, indices[:0]
+    order = np.random.default_rng(seed).permutation(len(indices))
+    n_val = max(1, int(round(len(indices) * val_fraction)))
+    return np.sort(indices[order[n_val:]]), np.sort(indices[order[:n_val]])
+
+
+def maybe_compile(module, enabled):
+    """Returns the compiled module for forward passes; checkpoint the original."""
+    if not enabled:
+        return module
+    if not hasattr(torch, "compile"):
+        print("torch.compile not available, running eagerly")
+        return module
+    try:
+        return torch.compile(module)
+    except Exception as e:
+        print("torch.compile failed, running eagerly:", e)
+        return module
+
+
+# ----------------------------------------------------
+# PRECISION
+# ----------------------------------------------------
+def resolve_precision(choice, device):
+    if choice != "auto":
+        return choice
+    if device.type == "cuda":
+        return "bf16" if torch.cuda.is_bf16_supported() else "fp16"
+    return "bf16"
+
+
+def autocast(precision, device):
+    if precision == "fp32":
+        return contextlib.nullcontext()
+    dtype = torch.bfloat16 if precision == "bf16" else torch.float16
+    return torch.autocast(device_type=device.type, dtype=dtype)
+
+
+# ----------------------------------------------------
+# CHECKPOINTS
+# ----------------------------------------------------
+def _atomic_save(obj, path):
+    tmp = path + ".tmp"
+    torch.save(obj, tmp)
+    os.replace(tmp, path)
+
+
+def _rng_state():
+    state = {
+        "python": random.getstate(),
+        "numpy": np.random.get_state(),
+        "torch": torch.get_rng_state(),
+    }
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def _set_rng_state(state):
+    random.setstate(state["python"])
+    np.random.set_state(state["numpy"])
+    torch.set_rng_state(state["torch"])
+    if "cuda" in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+
+
+# ----------------------------------------------------
+# LOOP
+# ----------------------------------------------------
+def fit(modules, step, train_loader, val_loader, args, device, tag="train"):
+    """
+    modules: dict name -> nn.Module (trainable parameters + what gets checkpointed)
+    step(batch) -> (loss tensor, batch size); called under autocast, in the
+    right train/eval mode. Returns the modules with the best val weights loaded.
+    """
+    os.makedirs(args.run_dir, exist_ok=True)
+    last_path = os.path.join(args.run_dir, "last.pt")
+    best_path = os.path.join(args.run_dir, "best.pt")
+
+    params = [p for m in modules.values() for p in m.parameters() if p.requires_grad]
+    optimizer = torch.optim.Adam(params, lr=args.lr)
+    scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(optimizer, T_max=max(1, args.epochs))
+    precision = resolve_precision(args.precision, device)
+    scaler = torch.cuda.amp.GradScaler(enabled=precision == "fp16" and device.type == "cuda")
+    print(f"[{tag}] device={device} precision={precision} compile={bool(args.compile)}")
+
+    start_epoch, best_val, bad_epochs = 0, float("inf"), 0
+    if args.resume and os.path.exists(last_path):
+        ckpt = torch.load(last_path, map_location=device)
+        for name, module in modules.items():
+            module.load_state_dict(ckpt["modules"][name])
+        optimizer.load_state_dict(ckpt["optimizer"])
+        scheduler.load_state_dict(ckpt["scheduler"])
+        scaler.load_state_dict(ckpt["scaler"])
+        _set_rng_state(ckpt["rng"])
+        start_epoch = ckpt["epoch"] + 1
+        best_val, bad_epochs = ckpt["best_val"], ckpt["bad_epochs"]
+        print(f"[{tag}] resumed from {last_path} at epoch {start_epoch + 1}")
+
+    def save_checkpoint(epoch):
+        _atomic_save({
+            "epoch": epoch,
+            "modules": {n: m.state_dict() for n, m in modules.items()},
+            "optimizer": optimizer.state_dict(),
+            "scheduler": scheduler.state_dict(),
+            "scaler": scaler.state_dict(),
+            "rng": _rng_state(),
+            "best_val": best_val,
+            "bad_epochs": bad_epochs,
+        }, last_path)
+
+    for epoch in range(start_epoch, args.epochs):
+        for m in modules.values():
+            m.train()
+        started = time.perf_counter()
+        total_loss, seen = 0.0, 0
+
+        for batch in train_loader:
+            with autocast(precision, device):
+                loss, n = step(batch)
+            optimizer.zero_grad(set_to_none=True)
+            scaler.scale(loss).backward()
+            scaler.step(optimizer)
+            scaler.update()
+            total_loss += loss.item() * n
+            seen += n
+
+        train_seconds = time.perf_counter() - started
+        scheduler.step()
+        val_loss = evaluate(modules, step, val_loader, precision, device)
+
+        rate = seen / train_seconds if train_seconds else 0.0
+        val_text = f"{val_loss:.4f}" if val_loss is not None else "-"
+        print(f"[{tag}] Epoch {epoch+1}/{args.epochs} — train loss {total_loss / max(seen, 1):.4f} — "
+              f"val loss {val_text} — {rate:.1f} samples/s — lr {scheduler.get_last_lr()[0]:.2e}")
+
+        monitored = val_loss if val_loss is not None else total_loss / max(seen, 1)
+        if monitored < best_val:
+            best_val, bad_epochs = monitored, 0
+            _atomic_save({n: m.state_dict() for n, m in modules.items()}, best_path)
+        else:
+            bad_epochs += 1
+
+        stop = args.patience and bad_epochs >= args.patience
+        if stop or (epoch + 1) % args.checkpoint_every == 0 or epoch + 1 == args.epochs:
+            save_checkpoint(epoch)
+        if stop:
+            print(f"[{tag}] early stop: no val improvement in {args.patience} epochs")
+            break
+
+    if os.path.exists(best_path):
+        best = torch.load(best_path, map_location=device)
+        for name, module in modules.items():
+            module.load_state_dict(best[name])
+    for m in modules.values():
+        m.eval()
+    return modules
+
+
+def evaluate(modules, step, loader, precision, device):
+    if loader is None or len(loader.dataset) == 0:
+        return None
+    for m in modules.values():
+        m.eval()
+    total, seen = 0.0, 0
+    with torch.no_grad():
+        for batch in loader:
+            with autocast(precision, device):
+                loss, n = step(batch)
+            total += loss.item() * n
+            seen += n
+    return total / max(seen, 1)
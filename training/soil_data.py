@@ -0,0 +1,375 @@
+"""
+Decode-once image cache and DataLoaders for the soil training scripts.
+
+The first run decodes and resizes every image in parallel into a uint8
+memory-mapped array (N, H, W, 3) next to the dataset; later epochs and
+later runs read straight from the page cache. Augmentation (flip, small
+rotation) and normalisation run on the uint8 tensors, so no JPEG decode
+happens inside the training loop.
+
+    python training/soil_data.py build  --data-dir training/soil_dataset
+    python training/soil_data.py bench  --data-dir training/soil_dataset --csv training/soil_regression_data.csv
+    python training/soil_data.py bench --baseline     # also time the old per-image loaders
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import torch
+from PIL import Image
+from torch.utils.data import DataLoader, Dataset
+
+IMG_SIZE = 224
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+COLOR_CATS = ["brown", "light-brown", "red", "yellow", "black", "gray"]
+
+MEAN = torch.tensor([0.485, 0.456, 0.406]).view(1, 3, 1, 1)
+STD = torch.tensor([0.229, 0.224, 0.225]).view(1, 3, 1, 1)
+
+
+# ----------------------------------------------------
+# CACHE BUILD
+# ----------------------------------------------------
+def _decode_chunk(args):
+    cache_path, start, paths, size = args
+    images = np.load(cache_path, mmap_mode="r+")
+    ok = []
+    for offset, path in enumerate(paths):
+        try:
+            img = Image.open(path)
+            img.draft("RGB", (size, size))  # JPEG: decode at reduced scale
+            img = img.convert("RGB").resize((size, size), Image.BILINEAR)
+            images[start + offset] = np.asarray(img)
+            ok.append(True)
+        except Exception as e:
+            print(f"Skipping unreadable image {path}: {e}")
+            ok.append(False)
+    images.flush()
+    return start, ok
+
+
+def _manifest(paths, size):
+    entries = []
+    for p in paths:
+        st = os.stat(p)
+        entries.append([p, st.st_size, int(st.st_mtime)])
+    digest = hashlib.sha1(json.dumps([size, entries]).encode()).hexdigest()
+    return digest
+
+
+def build_image_cache(paths, cache_dir, name, size=IMG_SIZE, workers=None):
+    """
+    Decode + resize `paths` into cache_dir/<name>.npy (uint8, N x size x size x 3).
+    Reuses the cache when the file list, sizes and mtimes are unchanged.
+    Returns (memmap, valid_mask).
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = os.path.join(cache_dir, f"{name}.npy")
+    meta_path = os.path.join(cache_dir, f"{name}.json")
+    digest = _manifest(paths, size)
+
+    if os.path.exists(cache_path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("digest") == digest:
+            return np.load(cache_path, mmap_mode="r"), np.array(meta["valid"], dtype=bool)
+
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    images = np.lib.format.open_memmap(
+        cache_path, mode="w+", dtype=np.uint8, shape=(len(paths), size, size, 3)
+    )
+    del images
+
+    chunk = max(1, len(paths) // (workers * 4) or 1)
+    jobs = [
+        (cache_path, i, paths[i:i + chunk], size)
+        for i in range(0, len(paths), chunk)
+    ]
+    valid = np.zeros(len(paths), dtype=bool)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for start, ok in pool.map(_decode_chunk, jobs):
+            valid[start:start + len(ok)] = ok
+
+    with open(meta_path, "w") as f:
+        json.dump({"digest": digest, "size": size, "count": len(paths),
+                   "valid": valid.tolist()}, f)
+    print(f"Cached {int(valid.sum())}/{len(paths)} images in "
+          f"{time.perf_counter() - started:.1f}s -> {cache_path}")
+
+    return np.load(cache_path, mmap_mode="r"), valid
+
+
+def scan_image_folder(root):
+    """ImageFolder-compatible scan: sorted class dirs, sorted files."""
+    # dot-directories are not classes; the default cache dir lives in here
+    classes = sorted(
+        d for d in os.listdir(root) if not d.startswith(".") and os.path.isdir(os.path.join(root, d))
+    )
+    paths, labels = [], []
+    for idx, cls in enumerate(classes):
+        cls_dir = os.path.join(root, cls)
+        for fname in sorted(os.listdir(cls_dir)):
+            if os.path.splitext(fname)[1].lower() in IMAGE_EXTS:
+                paths.append(os.path.join(cls_dir, fname))
+                labels.append(idx)
+    return classes, paths, np.array(labels, dtype=np.int64)
+
+
+# ----------------------------------------------------
+# GPU-FREE AUGMENTATION ON UINT8 BATCHES
+# ----------------------------------------------------
+def to_float_batch(batch_uint8):
+    """(B, H, W, 3) uint8 numpy/tensor -> normalised (B, 3, H, W) float32."""
+    x = torch.as_tensor(batch_uint8).permute(0, 3, 1, 2).float().div_(255.0)
+    return (x - MEAN) / STD
+
+
+def augment_batch(x, generator=None, max_degrees=10.0, flip_p=0.5):
+    """Random horizontal flip + small rotation, batched with affine_grid."""
+    b = x.shape[0]
+    flip = torch.rand(b, generator=generator) < flip_p
+    if flip.any():
+        x[flip] = x[flip].flip(-1)
+
+    angles = (torch.rand(b, generator=generator) * 2 - 1) * max_degrees
+    theta = torch.deg2rad(angles)
+    cos, sin = torch.cos(theta), torch.sin(theta)
+    zeros = torch.zeros_like(cos)
+    affine = torch.stack([
+        torch.stack([cos, -sin, zeros], dim=1),
+        torch.stack([sin, cos, zeros], dim=1),
+    ], dim=1)
+    grid = torch.nn.functional.affine_grid(affine, x.shape, align_corners=False)
+    return torch.nn.functional.grid_sample(x, grid, align_corners=False, padding_mode="zeros")
+
+
+# ----------------------------------------------------
+# DATASETS (batched __getitems__ -> one fancy-index per batch)
+# ----------------------------------------------------
+class _CachedImages(Dataset):
+    """
+    Holds where the image cache lives (path, offset, shape, dtype) rather
+    than the memmap itself. Each process maps the file on its first batch,
+    so spawn/forkserver workers don't pickle the array (np.memmap pickles
+    as a full in-memory copy) and every worker shares the page cache.
+    """
+
+    def __init__(self, images):
+        if isinstance(images, np.memmap):
+            self._source = (images.filename, images.offset, images.shape, images.dtype)
+            self._images = None
+        else:  # an in-memory array: nothing to reopen
+            self._source = None
+            self._images = images
+
+    @property
+    def images(self):
+        if self._images is None:
+            path, offset, shape, dtype = self._source
+            self._images = np.memmap(path, dtype=dtype, mode="r", shape=shape, offset=offset)
+        return self._images
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self._source is not None:
+            state["_images"] = None
+        return state
+
+
+class CachedImageDataset(_CachedImages):
+    def __init__(self, images, labels, indices, augment=False):
+        super().__init__(images)
+        self.labels = torch.as_tensor(labels)
+        self.indices = np.asarray(indices)
+        self.augment = augment
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitems__(self, batch):
+        rows = np.sort(self.indices[np.asarray(batch)])
+        x = to_float_batch(np.ascontiguousarray(self.images[rows]))
+        if self.augment:
+            x = augment_batch(x)
+        return x, self.labels[rows]
+
+    def __getitem__(self, i):
+        x, y = self.__getitems__([i])
+        return x[0], y[0]
+
+
+class CachedRegressionDataset(_CachedImages):
+    def __init__(self, images, ph, color_idx, targets, indices, augment=False):
+        super().__init__(images)
+        self.ph = torch.as_tensor(ph, dtype=torch.float32).view(-1, 1)
+        self.color_idx = torch.as_tensor(color_idx, dtype=torch.long)
+        self.targets = torch.as_tensor(targets, dtype=torch.float32)
+        self.indices = np.asarray(indices)
+        self.augment = augment
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitems__(self, batch):
+        rows = np.sort(self.indices[np.asarray(batch)])
+        x = to_float_batch(np.ascontiguousarray(self.images[rows]))
+        if self.augment:
+            x = augment_batch(x)
+        return x, self.ph[rows], self.color_idx[rows], self.targets[rows]
+
+    def __getitem__(self, i):
+        return tuple(t[0] for t in self.__getitems__([i]))
+
+
+def identity_collate(batch):
+    # __getitems__ already returns stacked tensors
+    return batch
+
+
+def make_loader(dataset, batch_size, shuffle=True, workers=None, device=None):
+    workers = os.cpu_count() // 2 if workers is None else workers
+    return DataLoader(
+        dataset,
+        batch_size=batch_size,
+        shuffle=shuffle,
+        num_workers=workers,
+        pin_memory=device is not None and device.type == "cuda",
+        persistent_workers=workers > 0,
+        prefetch_factor=4 if workers > 0 else None,
+        collate_fn=identity_collate,
+    )
+
+
+# ----------------------------------------------------
+# ENTRY POINTS USED BY THE TRAINING SCRIPTS
+# ----------------------------------------------------
+def default_cache_dir(data_dir):
+    return os.path.join(data_dir, ".cache")
+
+
+def load_classification_data(data_dir, cache_dir=None, size=IMG_SIZE, workers=None):
+    classes, paths, labels = scan_image_folder(data_dir)
+    images, valid = build_image_cache(
+        paths, cache_dir or default_cache_dir(data_dir), f"classify_{size}", size, workers
+    )
+    return classes, images, labels, np.flatnonzero(valid)
+
+
+def load_regression_data(csv_path, img_dir, cache_dir=None, size=IMG_SIZE, workers=None):
+    """
+    Returns (images, ph, color_idx, targets, valid_idx). The tabular arrays
+    are aligned with the cache rows; rows whose image is missing or
+    unreadable are left out of valid_idx.
+    """
+    import pandas as pd
+
+    df = pd.read_csv(csv_path)
+    df = df[[os.path.exists(os.path.join(img_dir, p)) for p in df["image"]]]
+    paths = [os.path.join(img_dir, p) for p in df["image"]]
+
+    # columns to numpy once; rows are then plain array indexing, no iloc
+    # (copies: pandas may hand back read-only views, which torch won't wrap)
+    ph = df["ph"].to_numpy(np.float32, copy=True)
+    color_idx = df["color"].map({c: i for i, c in enumerate(COLOR_CATS)}).fillna(0).to_numpy(np.int64, copy=True)
+    targets = df[["N", "P", "K", "moisture", "organic_matter"]].to_numpy(np.float32, copy=True)
+
+    images, valid = build_image_cache(
+        paths, cache_dir or default_cache_dir(img_dir), f"regress_{size}", size, workers
+    )
+    return images, ph, color_idx, targets, np.flatnonzero(valid)
+
+
+def benchmark_loader(loader, max_batches=50):
+    """Samples/s over max_batches, going round as many epochs as that takes."""
+    started = time.perf_counter()
+    seen = batches = 0
+    while batches < max_batches:
+        for batch in loader:
+            seen += batch[0].shape[0]
+            batches += 1
+            if batches >= max_batches:
+                break
+    elapsed = time.perf_counter() - started
+    return seen / elapsed if elapsed else 0.0
+
+
+def baseline_loaders(data_dir, csv_path, size, batch_size):
+    """
+    The loaders the training scripts used before the cache: PIL decode +
+    torchvision transforms per image, DataFrame.iloc per regression row,
+    num_workers=0. Only for `bench --baseline`.
+    """
+    import pandas as pd
+    from torchvision import datasets, transforms
+
+    normalize = transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+    # allow_empty: the cache directory sits next to the class folders
+    classify = datasets.ImageFolder(data_dir, allow_empty=True, transform=transforms.Compose([
+        transforms.Resize((size, size)),
+        transforms.RandomHorizontalFlip(),
+        transforms.RandomRotation(10),
+        transforms.ToTensor(),
+        normalize,
+    ]))
+    to_tensor = transforms.Compose([transforms.Resize((size, size)), transforms.ToTensor(), normalize])
+
+    class IlocRegression(Dataset):
+        def __init__(self):
+            df = pd.read_csv(csv_path)
+            self.df = df[[os.path.exists(os.path.join(data_dir, p)) for p in df["image"]]]
+
+        def __len__(self):
+            return len(self.df)
+
+        def __getitem__(self, idx):
+            row = self.df.iloc[idx]
+            img = to_tensor(Image.open(os.path.join(data_dir, row["image"])).convert("RGB"))
+            targets = torch.tensor([row["N"], row["P"], row["K"], row["moisture"], row["organic_matter"]],
+                                   dtype=torch.float32)
+            return img, torch.tensor([row["ph"]], dtype=torch.float32), COLOR_CATS.index(row["color"]), targets
+
+    return (DataLoader(classify, batch_size=batch_size, shuffle=True),
+            DataLoader(IlocRegression(), batch_size=batch_size, shuffle=True))
+
+
+if __name__ == "__main__":
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("command", choices=["build", "bench"])
+    parser.add_argument("--data-dir", default=os.path.join(here, "soil_dataset"))
+    parser.add_argument("--csv", default=os.path.join(here, "soil_regression_data.csv"))
+    parser.add_argument("--size", type=int, default=IMG_SIZE)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--batches", type=int, default=50, help="batches per loader for bench")
+    parser.add_argument("--baseline", action="store_true",
+                        help="bench also runs the old per-image PIL, num_workers=0 loaders")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    classes, images, labels, valid_idx = load_classification_data(
+        args.data_dir, size=args.size, workers=args.workers
+    )
+    reg_images, ph, color_idx, targets, reg_idx = load_regression_data(
+        args.csv, args.data_dir, size=args.size, workers=args.workers
+    )
+    print(f"{len(valid_idx)} images, classes: {classes} (cache ready in {time.perf_counter() - started:.1f}s)")
+
+    if args.command == "bench":
+        loaders = {
+            "cached classify": make_loader(CachedImageDataset(images, labels, valid_idx, augment=True),
+                                           args.batch_size, workers=args.workers),
+            "cached regress": make_loader(CachedRegressionDataset(reg_images, ph, color_idx, targets, reg_idx),
+                                          args.batch_size, workers=args.workers),
+        }
+        if args.baseline:
+            old_classify, old_regress = baseline_loaders(args.data_dir, args.csv, args.size, args.batch_size)
+            loaders["baseline classify"] = old_classify
+            loaders["baseline regress"] = old_regress
+        for name, loader in loaders.items():
+            print(f"{name:18s} {benchmark_loader(loader, args.batches):8.1f} samples/s")
@@ -0,0 +1,206 @@
+"""
+Frozen-backbone training for the soil heads.
+
+Serving (backend/routes/soil_routes.py) always runs the stock ImageNet
+EfficientNet-B0 backbone and only loads the heads from disk, so fine-tuning
+the backbone during training is thrown away. This mode runs that exact
+serving backbone once over the cached images, stores the 1280-d features
+as .npy, and trains the classifier / regressor heads on them.
+
+    python training/soil_features.py --out-dir backend/models/soil
+
+Writes, in the layout try_load_weights() loads:
+    soil_class.pth   classifier head state_dict (Linear-ReLU-Dropout-Linear)
+    npk_reg.pth      regressor head state_dict
+    color_emb.pth    colour embedding state_dict
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from soil_data import (
+    IMG_SIZE,
+    load_classification_data,
+    load_regression_data,
+    to_float_batch,
+)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(os.path.dirname(HERE), "backend")
+
+
+def serving_modules(device):
+    """Build backbone + heads with the serving code itself so layouts can't drift."""
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    from routes.soil_routes import SOIL_CLASSES, SOIL_COLOR_CATS, build_backbone_and_heads
+
+    backbone, classifier, regressor, color_emb = build_backbone_and_heads(device)
+    return SOIL_CLASSES, SOIL_COLOR_CATS, backbone, classifier, regressor, color_emb
+
+
+# ----------------------------------------------------
+# FEATURE PRECOMPUTE
+# ----------------------------------------------------
+def _cache_digest(cache_dir, name):
+    with open(os.path.join(cache_dir, f"{name}.json")) as f:
+        return json.load(f)["digest"]
+
+
+def extract_features(images, backbone, device, cache_dir, name, batch_size=64):
+    """
+    Run the frozen backbone over every cached image once.
+    Reused while the underlying image cache is unchanged.
+    """
+    feat_path = os.path.join(cache_dir, f"{name}_features.npy")
+    meta_path = os.path.join(cache_dir, f"{name}_features.json")
+    digest = _cache_digest(cache_dir, name)
+
+    if os.path.exists(feat_path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            if json.load(f).get("digest") == digest:
+                return np.load(feat_path, mmap_mode="r")
+
+    started = time.perf_counter()
+    backbone.eval()
+    feats = np.lib.format.open_memmap(
+        feat_path, mode="w+", dtype=np.float32, shape=(len(images), 1280)
+    )
+    with torch.inference_mode():
+        for start in range(0, len(images), batch_size):
+            x = to_float_batch(np.ascontiguousarray(images[start:start + batch_size]))
+            feats[start:start + len(x)] = backbone(x.to(device)).float().cpu().numpy()
+    feats.flush()
+    del feats
+
+    with open(meta_path, "w") as f:
+        json.dump({"digest": digest}, f)
+    print(f"Extracted {len(images)} feature rows in {time.perf_counter() - started:.1f}s -> {feat_path}")
+    return np.load(feat_path, mmap_mode="r")
+
+
+# ----------------------------------------------------
+# HEAD TRAINING (features fit in memory)
+# ----------------------------------------------------
+def _batches(n, batch_size, generator):
+    order = torch.randperm(n, generator=generator)
+    for start in range(0, n, batch_size):
+        yield order[start:start + batch_size]
+
+
+def train_classifier_head(classifier, feats, labels, device, epochs, lr, batch_size=64):
+    x = torch.as_tensor(np.asarray(feats), device=device)
+    y = torch.as_tensor(labels, device=device)
+    optimizer = torch.optim.Adam(classifier.parameters(), lr=lr)
+    criterion = nn.CrossEntropyLoss()
+    gen = torch.Generator().manual_seed(0)
+
+    classifier.train()
+    for epoch in range(epochs):
+        started = time.perf_counter()
+        total_loss, correct = 0.0, 0
+        for idx in _batches(len(x), batch_size, gen):
+            idx = idx.to(device)
+            out = classifier(x[idx])
+            loss = criterion(out, y[idx])
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total_loss += loss.item()
+            correct += (out.argmax(1) == y[idx]).sum().item()
+        print(f"[classifier] Epoch {epoch+1}/{epochs} — Loss: {total_loss:.4f} — "
+              f"train acc {correct / len(x):.3f} — {time.perf_counter() - started:.2f}s")
+    classifier.eval()
+
+
+def train_regressor_head(regressor, color_emb, feats, ph, color_idx, targets, device,
+                         epochs, lr, batch_size=64):
+    x = torch.as_tensor(np.asarray(feats), device=device)
+    ph_t = torch.as_tensor(ph, device=device).view(-1, 1)
+    color_t = torch.as_tensor(color_idx, device=device)
+    y = torch.as_tensor(targets, device=device)
+    optimizer = torch.optim.Adam(list(regressor.parameters()) + list(color_emb.parameters()), lr=lr)
+    criterion = nn.MSELoss()
+    gen = torch.Generator().manual_seed(0)
+
+    regressor.train()
+    color_emb.train()
+    for epoch in range(epochs):
+        started = time.perf_counter()
+        total_loss = 0.0
+        for idx in _batches(len(x), batch_size, gen):
+            idx = idx.to(device)
+            reg_in = torch.cat([x[idx], ph_t[idx], color_emb(color_t[idx])], dim=1)
+            loss = criterion(regressor(reg_in), y[idx])
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total_loss += loss.item()
+        print(f"[regressor] Epoch {epoch+1}/{epochs} - Loss: {total_loss:.4f} - "
+              f"{time.perf_counter() - started:.2f}s")
+    regressor.eval()
+    color_emb.eval()
+
+
+def remap_labels(folder_classes, labels, serving_classes):
+    """ImageFolder indices (sorted dirs) -> serving SOIL_CLASSES indices."""
+    lookup = {c.lower(): i for i, c in enumerate(serving_classes)}
+    unknown = [c for c in folder_classes if c.lower() not in lookup]
+    if unknown:
+        raise ValueError(f"Dataset classes not in serving SOIL_CLASSES: {unknown}")
+    mapping = np.array([lookup[c.lower()] for c in folder_classes], dtype=np.int64)
+    return mapping[labels]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train soil heads on frozen serving-backbone features")
+    parser.add_argument("--data-dir", default=os.path.join(HERE, "soil_dataset"))
+    parser.add_argument("--csv", default=os.path.join(HERE, "soil_regression_data.csv"))
+    parser.add_argument("--out-dir", default=os.path.join(BACKEND_DIR, "models", "soil"))
+    parser.add_argument("--epochs", type=int, default=40)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--skip-classifier", action="store_true")
+    parser.add_argument("--skip-regressor", action="store_true")
+    args = parser.parse_args()
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    print("Using device:", device)
+    serving_classes, _, backbone, classifier, regressor, color_emb = serving_modules(device)
+    cache_dir = os.path.join(args.data_dir, ".cache")
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    if not args.skip_classifier:
+        folder_classes, images, labels, valid_idx = load_classification_data(
+            args.data_dir, cache_dir, IMG_SIZE, args.workers
+        )
+        feats = extract_features(images, backbone, device, cache_dir, f"classify_{IMG_SIZE}")
+        labels = remap_labels(folder_classes, labels, serving_classes)
+        train_classifier_head(classifier, feats[valid_idx], labels[valid_idx],
+                              device, args.epochs, args.lr)
+        path = os.path.join(args.out_dir, "soil_class.pth")
+        torch.save(classifier.state_dict(), path)
+        print(f"Saved classifier head → {path}")
+
+    if not args.skip_regressor:
+        images, ph, color_idx, targets, valid_idx = load_regression_data(
+            args.csv, args.data_dir, cache_dir, IMG_SIZE, args.workers
+        )
+        feats = extract_features(images, backbone, device, cache_dir, f"regress_{IMG_SIZE}")
+        train_regressor_head(regressor, color_emb, feats[valid_idx], ph[valid_idx],
+                             color_idx[valid_idx], targets[valid_idx],
+                             device, args.epochs, args.lr)
+        path = os.path.join(args.out_dir, "npk_reg.pth")
+        torch.save(regressor.state_dict(), path)
+        torch.save(color_emb.state_dict(), os.path.join(args.out_dir, "color_emb.pth"))
+        print(f"Saved regressor head + colour embedding → {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,77 +1,69 @@
 import os
 import torch
 import torch.nn as nn
-import torch.optim as optim
-from torchvision import datasets, transforms, models
-from torch.utils.data import DataLoader
+from torchvision import models
 
-# Paths
-DATA_DIR = r"d:\Eco-Themed Farming Platform\training\soil_dataset"
-SAVE_PATH = "D:/Eco-Themed Farming Platform/backend/models/soil/soil_class.pth"
+import runner
+from soil_data import CachedImageDataset, load_classification_data, make_loader
 
-
-# Hyperparams
+# Hyperparams (defaults; override on the command line)
 BATCH_SIZE = 16
 EPOCHS = 10
 LR = 1e-4
 
-# Device
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-print("Using device:", device)
-
-# Data augmentation + normalization
-transform = transforms.Compose([
-    transforms.Resize((224,224)),
-    transforms.RandomHorizontalFlip(),
-    transforms.RandomRotation(10),
-    transforms.ToTensor(),
-    transforms.Normalize([0.485,0.456,0.406],[0.229,0.224,0.225])
-])
-
-# Load dataset
-dataset = datasets.ImageFolder(DATA_DIR, transform=transform)
-loader = DataLoader(dataset, batch_size=BATCH_SIZE, shuffle=True)
-
-class_names = dataset.classes
-print("Soil Classes:", class_names)
 
-# Load EfficientNet-B0
-model = models.efficientnet_b0(weights=models.EfficientNet_B0_Weights.IMAGENET1K_V1)
+def main():
+    parser = runner.build_parser("Fine-tune EfficientNet-B0 on the soil dataset",
+                                 "soil_classifier", EPOCHS, BATCH_SIZE, LR)
+    parser.add_argument("--save-path", default=None,
+                        help="final weights (default: <run-dir>/soil_class_full.pth)")
+    args = parser.parse_args()
 
-# Replace classifier for your soil classes
-model.classifier = nn.Sequential(
-    nn.Dropout(0.3),
-    nn.Linear(1280, len(class_names))
-)
+    runner.seed_everything(args.seed)
+    device = runner.pick_device()
 
-model = model.to(device)
+    # Images are decoded + resized once into a memory-mapped cache;
+    # flip/rotation + normalisation run batched on the cached tensors
+    class_names, images, labels, valid_idx = load_classification_data(args.data_dir, workers=args.workers)
+    train_idx, val_idx = runner.split_indices(valid_idx, args.val_split, args.seed)
+    train_loader = make_loader(CachedImageDataset(images, labels, train_idx, augment=True),
+                               args.batch_size, shuffle=True, workers=args.workers, device=device)
+    val_loader = make_loader(CachedImageDataset(images, labels, val_idx),
+                             args.batch_size, shuffle=False, workers=args.workers, device=device)
 
-criterion = nn.CrossEntropyLoss()
-optimizer = optim.Adam(model.parameters(), lr=LR)
+    print("Soil Classes:", class_names)
+    print(f"{len(train_idx)} train / {len(val_idx)} val images")
 
-print("Training model...")
+    # Load EfficientNet-B0
+    model = models.efficientnet_b0(weights=models.EfficientNet_B0_Weights.IMAGENET1K_V1)
 
-for epoch in range(EPOCHS):
-    model.train()
-    total_loss = 0
+    # Replace classifier for your soil classes
+    model.classifier = nn.Sequential(
+        nn.Dropout(0.3),
+        nn.Linear(1280, len(class_names))
+    )
 
-    for imgs, labels in loader:
-        imgs, labels = imgs.to(device), labels.to(device)
+    model = model.to(device)
+    forward = runner.maybe_compile(model, args.compile)
+    criterion = nn.CrossEntropyLoss()
 
-        optimizer.zero_grad()
-        out = model(imgs)
-        loss = criterion(out, labels)
-        loss.backward()
-        optimizer.step()
+    def step(batch):
+        imgs, targets = batch
+        imgs = imgs.to(device, non_blocking=True)
+        targets = targets.to(device, non_blocking=True)
+        return criterion(forward(imgs), targets), imgs.shape[0]
 
-        total_loss += loss.item()
+    print("Training model...")
+    runner.fit({"model": model}, step, train_loader, val_loader, args, device, tag="classifier")
 
-    print(f"Epoch {epoch+1}/{EPOCHS} — Loss: {total_loss:.4f}")
+    # Full fine-tuned network. Serving only loads a head on top of the stock
+    # backbone; use soil_features.py to produce backend/models/soil weights.
+    save_path = args.save_path or os.path.join(args.run_dir, "soil_class_full.pth")
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    torch.save(model.state_dict(), save_path)
 
-# Create folder automatically
-os.makedirs(os.path.dirname(SAVE_PATH), exist_ok=True)
+    print(f"Saved model → {save_path}")
 
-# Save model (full model state_dict)
-torch.save(model.state_dict(), SAVE_PATH)
 
-print(f"Saved model → {SAVE_PATH}")
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,19 @@
 import os
-import pandas as pd
 import torch
 import torch.nn as nn
-import torch.optim as optim
-from torchvision import models, transforms
-from PIL import Image
-from torch.utils.data import Dataset, DataLoader
-
-CSV_PATH = "D:/Eco-Themed Farming Platform/training/soil_regression_data.csv"
-SAVE_PATH = "D:/Eco-Themed Farming Platform/backend/models/soil/npk_reg.pth"
-IMG_DIR = "D:/Eco-Themed Farming Platform/training/soil_dataset"
+from torchvision import models
+
+import runner
+from soil_data import COLOR_CATS, CachedRegressionDataset, load_regression_data, make_loader
+
+# Hyperparams (defaults; override on the command line)
 BATCH_SIZE = 8
 EPOCHS = 8
 LR = 1e-4
 
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-
-COLOR_CATS = ["brown","light-brown","red","yellow","black","gray"]
 IMG_SIZE = 224
 
-transform = transforms.Compose([
-    transforms.Resize((IMG_SIZE, IMG_SIZE)),
-    transforms.ToTensor(),
-    transforms.Normalize([0.485,0.456,0.406],[0.229,0.224,0.225])
-])
-
-class SoilRegressionDataset(Dataset):
-    def __init__(self):
-        self.df = pd.read_csv(CSV_PATH)
-
-    def __len__(self):
-        return len(self.df)
-
-    def __getitem__(self, idx):
-        row = self.df.iloc[idx]
-        img_path = os.path.join(IMG_DIR, row["image"])
-        img = Image.open(img_path).convert("RGB")
-        img = transform(img)
-
-        ph = torch.tensor([row["ph"]], dtype=torch.float32)
-        color_idx = COLOR_CATS.index(row["color"])
-        targets = torch.tensor([
-            row["N"], row["P"], row["K"],
-            row["moisture"], row["organic_matter"]
-        ], dtype=torch.float32)
-        return img, ph, color_idx, targets
-
-dataset = SoilRegressionDataset()
-loader = DataLoader(dataset, batch_size=BATCH_SIZE, shuffle=True)
-
-# Backbone
-eff = models.efficientnet_b0(pretrained=True)
+
 class FeatureExtractor(nn.Module):
     def __init__(self, eff):
         super().__init__()
@@ -62,55 +25,68 @@ class FeatureExtractor(nn.Module):
         x = self.pool(x)
         return torch.flatten(x, 1)
 
-backbone = FeatureExtractor(eff).to(device)
-
-# Regressor
-color_emb = nn.Embedding(len(COLOR_CATS), 8)
-regressor = nn.Sequential(
-    nn.Linear(1280+1+8, 512),
-    nn.ReLU(),
-    nn.Dropout(0.2),
-    nn.Linear(512, 128),
-    nn.ReLU(),
-    nn.Linear(128, 5)
-)
-
-color_emb = color_emb.to(device)
-regressor = regressor.to(device)
-
-criterion = nn.MSELoss()
-optimizer = optim.Adam(list(backbone.parameters()) + 
-                       list(color_emb.parameters()) + 
-                       list(regressor.parameters()), lr=LR)
-
-print("Training NPK regressor...")
-
-for epoch in range(EPOCHS):
-    total_loss = 0
-    for img, ph, color_idx, target in loader:
-        img = img.to(device)
-        ph = ph.to(device)
-        color_idx = color_idx.to(device)
-        target = target.to(device)
-
-        feat = backbone(img)
-        color_vec = color_emb(color_idx)
-        x = torch.cat([feat, ph, color_vec], dim=1)
-
-        out = regressor(x)
-        loss = criterion(out, target)
-
-        optimizer.zero_grad()
-        loss.backward()
-        optimizer.step()
-
-        total_loss += loss.item()
-
-    print(f"Epoch {epoch+1}/{EPOCHS} - Loss: {total_loss:.4f}")
-
-torch.save({
-    "regressor": regressor.state_dict(),
-    "embedding": color_emb.state_dict()
-}, SAVE_PATH)
 
-print(f"Saved regressor model → {SAVE_PATH}")
+def main():
+    parser = runner.build_parser("Train the NPK / moisture / organic-matter regressor",
+                                 "npk_regressor", EPOCHS, BATCH_SIZE, LR)
+    parser.add_argument("--csv", default=os.path.join(runner.HERE, "soil_regression_data.csv"))
+    parser.add_argument("--save-path", default=None,
+                        help="final weights (default: <run-dir>/npk_reg_full.pth)")
+    args = parser.parse_args()
+
+    runner.seed_everything(args.seed)
+    device = runner.pick_device()
+
+    # Decoded + resized once into a memory-mapped cache; the CSV columns are
+    # turned into arrays up front so batches are plain fancy-indexing
+    images, ph, color_idx, targets, valid_idx = load_regression_data(
+        args.csv, args.data_dir, size=IMG_SIZE, workers=args.workers
+    )
+    train_idx, val_idx = runner.split_indices(valid_idx, args.val_split, args.seed)
+    train_loader = make_loader(CachedRegressionDataset(images, ph, color_idx, targets, train_idx),
+                               args.batch_size, shuffle=True, workers=args.workers, device=device)
+    val_loader = make_loader(CachedRegressionDataset(images, ph, color_idx, targets, val_idx),
+                             args.batch_size, shuffle=False, workers=args.workers, device=device)
+    print(f"{len(train_idx)} train / {len(val_idx)} val rows")
+
+    # Backbone
+    eff = models.efficientnet_b0(pretrained=True)
+    backbone = FeatureExtractor(eff).to(device)
+
+    # Regressor
+    color_emb = nn.Embedding(len(COLOR_CATS), 8).to(device)
+    regressor = nn.Sequential(
+        nn.Linear(1280+1+8, 512),
+        nn.ReLU(),
+        nn.Dropout(0.2),
+        nn.Linear(512, 128),
+        nn.ReLU(),
+        nn.Linear(128, 5)
+    ).to(device)
+
+    backbone_fwd = runner.maybe_compile(backbone, args.compile)
+    criterion = nn.MSELoss()
+
+    def step(batch):
+        img, ph_b, color_b, target = (t.to(device, non_blocking=True) for t in batch)
+        feat = backbone_fwd(img)
+        x = torch.cat([feat, ph_b, color_emb(color_b)], dim=1)
+        return criterion(regressor(x).float(), target), img.shape[0]
+
+    print("Training NPK regressor...")
+    runner.fit({"backbone": backbone, "embedding": color_emb, "regressor": regressor},
+               step, train_loader, val_loader, args, device, tag="regressor")
+
+    save_path = args.save_path or os.path.join(args.run_dir, "npk_reg_full.pth")
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    torch.save({
+        "backbone": backbone.state_dict(),
+        "regressor": regressor.state_dict(),
+        "embedding": color_emb.state_dict()
+    }, save_path)
+
+    print(f"Saved regressor model → {save_path}")
+
+
+if __name__ == "__main__":
+    main()